@@ -0,0 +1,42 @@
+import gzip
+import os
+import re
+from glob import glob
+
+# Raw stats pages, gzipped, as raw_pages/{competition}/season_{season_id}/{stats_type}_w{weeks}_p{page}.html.gz
+archive_dir = "raw_pages"
+page_pattern = re.compile(r'(?P<stats_type>\w+?)_w(?P<weeks>[\d-]+)_p(?P<page>\d+)\.html\.gz$')
+
+def page_file_name(stats_type, weeks, page):
+    """{stats_type}_w{weeks}_p{page}.html, the name both the archive and the recorded mock pages use."""
+    return f"{stats_type}_w{'-'.join(str(week) for week in weeks)}_p{page}.html"
+
+def season_dir(partition, archive_dir=archive_dir):
+    return os.path.join(archive_dir, partition.competition, f"season_{partition.season_id}")
+
+def page_path(partition, weeks, stats_type, page, archive_dir=archive_dir):
+    return os.path.join(season_dir(partition, archive_dir), f"{page_file_name(stats_type, weeks, page)}.gz")
+
+def save_page(html, partition, weeks, stats_type, page, archive_dir=archive_dir):
+    """Stores one raw page; written to a temporary file first so a crash never leaves a truncated page."""
+    path = page_path(partition, weeks, stats_type, page, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def load_page(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+def archived_tables(partition, archive_dir=archive_dir):
+    """{(weeks, stats_type): [page paths in page order]} for one partition; weeks is a tuple of ints."""
+    tables = {}
+    for path in glob(os.path.join(season_dir(partition, archive_dir), "*.html.gz")):
+        match = page_pattern.search(os.path.basename(path))
+        if match is None:
+            continue
+        weeks = tuple(int(week) for week in match['weeks'].split('-'))
+        tables.setdefault((weeks, match['stats_type']), []).append((int(match['page']), path))
+    return {key: [path for _, path in sorted(pages)] for key, pages in tables.items()}
@@ -0,0 +1,53 @@
+import logging
+import os
+import re
+import pandas as pd
+
+from euroleague_profiling import profile_stage
+
+# File paths
+injuries_file = "euroleague_data_players_injuries.xlsx"
+
+def name_keys(name):
+    """Lookup keys for a player name: the normalized full name and its 'initial. surname' form.
+
+    The injuries file mixes 'Tamir Blatt' and 'W. Baldwin IV' while the stats
+    tables use 'T. Blatt' and 'W. Baldwin Iv', so both sides are reduced to
+    lower-case keys before matching.
+    """
+    name = re.sub(r'\s+', ' ', str(name)).strip().lower()
+    parts = name.split(' ')
+    keys = [name]
+    if len(parts) > 1 and not parts[0].endswith('.'):
+        keys.append(f"{parts[0][0]}. {' '.join(parts[1:])}")
+    return keys
+
+def load_injuries(path=injuries_file):
+    """Maps name keys to the PLAYS flag (1 = available, 0 = out); later rows win."""
+    if not os.path.exists(path):
+        logging.info(f"No injuries file found at {path}; treating every player as available.")
+        return {}
+    injuries = pd.read_excel(path)
+    status = {}
+    for name, plays in zip(injuries['Player Name'], injuries['PLAYS']):
+        for key in name_keys(name):
+            status[key] = int(plays)
+    return status
+
+def availability_index(df, injuries=None):
+    """Boolean Series aligned with df: False when the PLAYS flag or the injuries file rules a player out."""
+    if injuries is None:
+        injuries = load_injuries()
+    available = pd.Series(True, index=df.index)
+    if 'PLAYS' in df.columns:
+        available &= pd.to_numeric(df['PLAYS'], errors='coerce').fillna(1).ne(0)
+    injured = df['Player'].map(lambda name: name_keys(name)[0]).map(injuries).eq(0)
+    return available & ~injured
+
+@profile_stage()
+def apply_availability(df, injuries=None):
+    """Drops unavailable players so the top-N selection backfills with available ones."""
+    available = availability_index(df, injuries)
+    if (~available).any():
+        logging.info(f"Dropping {(~available).sum()} unavailable players: {df.loc[~available, 'Player'].tolist()}")
+    return df[available]
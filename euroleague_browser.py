@@ -0,0 +1,86 @@
+import logging
+import os
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service
+from selenium.webdriver.edge.options import Options
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+# Cached location of the downloaded msedgedriver binary
+driver_path_file = "edgedriver_path.txt"
+
+# Requests the stats table does not need
+blocked_url_patterns = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*adservice.google.*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*cookiebot.com*",
+    "*onesignal.com*", "*taboola.com*", "*outbrain.com*", "*criteo.*", "*amazon-adsystem.com*",
+]
+
+def edge_driver_path():
+    """Returns the msedgedriver path, downloading it only when the cached path is missing."""
+    if os.path.exists(driver_path_file):
+        with open(driver_path_file, 'r') as f:
+            path = f.read().strip()
+        if os.path.exists(path):
+            return path
+    logging.info("Downloading Edge WebDriver...")
+    path = EdgeChromiumDriverManager().install()
+    with open(driver_path_file, 'w') as f:
+        f.write(path)
+    return path
+
+def headless_options(headless=True):
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--window-size=1280,1024")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    # Return from driver.get() once the DOM is ready; the scraper waits for the table itself
+    options.page_load_strategy = 'eager'
+    return options
+
+class BrowserSession:
+    """One headless Edge instance reused across pages and weeks, closed on exit.
+
+    Usage:
+        with BrowserSession() as driver:
+            scrape(driver, 1)
+            scrape(driver, 2)
+    """
+
+    def __init__(self, headless=True, block_resources=True):
+        self.headless = headless
+        self.block_resources = block_resources
+        self.driver = None
+
+    def start(self):
+        if self.driver is None:
+            logging.info("Starting headless Edge session...")
+            self.driver = webdriver.Edge(service=Service(edge_driver_path()), options=headless_options(self.headless))
+            if self.block_resources:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns})
+        return self.driver
+
+    def close(self):
+        if self.driver is not None:
+            logging.info("Closing Edge session...")
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,15 +1,15 @@
 import logging
-import time
 import pandas as pd
 import glob
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+from euroleague_archive import save_page
+from euroleague_browser import BrowserSession
+from euroleague_partitions import current_partition
+from euroleague_profiling import configure_profiling, profile_stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,12 +18,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 timestamp_file = "data_timestamp.txt"
 data_file = "EL_data_players_w_"
 
-# Set up WebDriver
-logging.info("Setting up the WebDriver for scraping...")
-options = Options()
-options.add_argument("start-maximized")
-options.add_experimental_option("detach", True)
-driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()), options=options)
+# Season and table the URL below requests, used to key the archived pages
+partition = current_partition
+stats_type = 'avg'
 
 # Open the webpage
 # url = "https://www.dunkest.com/en/euroleague/stats/players/table?season_id=17&mode=dunkest&stats_type=tot&weeks[]=10&rounds[]=1&rounds[]=2&teams[]=31&teams[]=32&teams[]=33&teams[]=34&teams[]=35&teams[]=36&teams[]=37&teams[]=38&teams[]=39&teams[]=40&teams[]=41&teams[]=42&teams[]=43&teams[]=44&teams[]=45&teams[]=47&teams[]=48&teams[]=60&positions[]=1&positions[]=2&positions[]=3&player_search=&min_cr=4&max_cr=35&sort_by=pdk&sort_order=desc&iframe=yes&noadv=yes"
@@ -31,12 +28,14 @@ driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()),
 # driver.get(url)
 # WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#statsPagination")))
 
-players_data = []
-
-start_part = 'https://www.dunkest.com/en/euroleague/stats/players/table?season_id=17&mode=dunkest&stats_type=avg&'
-last_part = '&rounds[]=1&rounds[]=2&rounds[]=3&teams[]=31&teams[]=32&teams[]=33&teams[]=34&teams[]=35&teams[]=36&teams[]=37&teams[]=38&teams[]=39&teams[]=40&teams[]=41&teams[]=42&teams[]=43&teams[]=44&teams[]=45&teams[]=47&teams[]=48&teams[]=60&positions[]=1&positions[]=2&positions[]=3&player_search=&min_cr=4&max_cr=35&sort_by=pdk&sort_order=desc&iframe=yes&noadv=yes'
+start_part = f'{partition.base_url}?season_id={partition.season_id}&mode=dunkest&stats_type={stats_type}&'
+last_part = ('&rounds[]=1&rounds[]=2&rounds[]=3' + ''.join(f'&teams[]={team}' for team in partition.teams) +
+             '&positions[]=1&positions[]=2&positions[]=3&player_search=&min_cr=4&max_cr=35&sort_by=pdk&sort_order=desc&iframe=yes&noadv=yes')
 
-def scrape(week):
+@profile_stage()
+def scrape(driver, week):
+    """Scrapes every page of one week into EL_data_players_w_{week}.xlsx using an open browser session."""
+    players_data = []
 
     variable_part = '&weeks[]=' + str(week)
     url = start_part + variable_part + last_part
@@ -63,6 +62,9 @@ def scrape(week):
             WebDriverWait(driver, 10).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".table-stats__container tbody tr")))
             player_rows = driver.find_elements(By.CSS_SELECTOR, ".table-stats__container tbody tr")
 
+            # Keep the rendered page so parsing can be re-run without the browser
+            save_page(driver.page_source, partition, [week], stats_type, page + 1)
+
             for row in player_rows:
                 try:
                     player_name = row.find_element(By.CSS_SELECTOR, ".table__col--player-link").text
@@ -89,7 +91,6 @@ def scrape(week):
                     EC.element_to_be_clickable((By.CSS_SELECTOR, "#statsPagination .paginationjs-next.J-paginationjs-next"))
                 )
                 next_button.click()
-                time.sleep(1)  # Small delay for page load
                 WebDriverWait(driver, 10).until(EC.staleness_of(player_rows[0]))  # Wait until rows are reloaded
         except Exception as e:
             logging.error(f"Error loading page {page + 1}: {e}")
@@ -102,19 +103,7 @@ def scrape(week):
     # Save DataFrame
     logging.info("Creating DataFrame from collected data and saving to Excel...")
     df_initial.to_excel(f'{data_file}{week}.xlsx', index=False)
-    # driver.quit()
-
 
-scrape(1)
-scrape(2)
-# scrape(3)
-# scrape(4)
-# scrape(5)
-# scrape(6)
-# scrape(7)
-# scrape(8)
-# scrape(9)
-# scrape(10)
 
 # file_paths = glob.glob('euroleague_data_players_week_*.xlsx')  # Adjust path and file extension if necessary
 
@@ -143,4 +132,19 @@ def merge():
             # Write the DataFrame to a new sheet in the output file
             df.to_excel(writer, sheet_name=sheet_name, index=False)
 
-# merge()
\ No newline at end of file
+# merge()
+
+if __name__ == "__main__":
+    configure_profiling()
+    # One headless browser for all weeks, closed even if a week fails
+    with BrowserSession() as driver:
+        scrape(driver, 1)
+        scrape(driver, 2)
+        # scrape(driver, 3)
+        # scrape(driver, 4)
+        # scrape(driver, 5)
+        # scrape(driver, 6)
+        # scrape(driver, 7)
+        # scrape(driver, 8)
+        # scrape(driver, 9)
+        # scrape(driver, 10)
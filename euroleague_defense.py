@@ -0,0 +1,166 @@
+import logging
+import os
+import pickle
+from glob import glob
+import pandas as pd
+
+from euroleague_profiling import profile_stage
+from euroleague_store import data_mapping, save_pickle
+
+# File paths; the hand-maintained workbook is only read, the tables derived from the weekly files go to their own file
+player_data_path = "euroleague_data_players_week_*.xlsx"
+defense_data_file = "euroleague_data_def_vs_pos_all.xlsx"
+derived_defense_file = "euroleague_data_def_vs_pos_derived.xlsx"
+defense_state_file = "euroleague_defense_state.pkl"
+
+# The FPT in week w's file were scored against the Upcoming_Opponent listed in week w - 1's file
+opponent_lag = 1
+
+# Sheet per position and the rolling windows reported next to the season average
+position_sheets = {'G': 'Guards', 'F': 'Forwards', 'C': 'Centers'}
+recent_windows = [3, 5, 10]
+
+team_names = {abbreviation: name for name, abbreviation in data_mapping.items()}
+
+def week_number(path):
+    return int(path.split('_')[-1].split('.')[0])
+
+def empty_state():
+    return {
+        'sources': {},
+        'fixtures': {},
+        'allowed': pd.DataFrame({'Week': pd.Series(dtype='int64'), 'Team': pd.Series(dtype=object), 'Pos': pd.Series(dtype=object),
+                                 'Sum': pd.Series(dtype=float), 'Count': pd.Series(dtype=float)}),
+        'totals': pd.DataFrame({'Sum': [], 'Count': []}, index=pd.MultiIndex.from_tuples([], names=['Team', 'Pos']), dtype=float),
+    }
+
+def played_rows(df):
+    """Rows of players who played; the weekly files list a player who did not play with 0 FPT."""
+    return df[pd.to_numeric(df['FPT'], errors='coerce').fillna(0).ne(0)]
+
+def week_allowed(week_df, week, opponents):
+    """FPT allowed per (defending team, position) in one week: sum and count over players who played."""
+    played = played_rows(week_df[week_df['Pos'].isin(list(position_sheets))])
+    played = played.assign(FPT=pd.to_numeric(played['FPT'], errors='coerce'), Opponent=played['Team'].map(opponents)).dropna(subset=['Opponent'])
+    allowed = played.groupby(['Opponent', 'Pos'])['FPT'].agg(Sum='sum', Count='count').reset_index()
+    return allowed.rename(columns={'Opponent': 'Team'}).assign(Week=week)[['Week', 'Team', 'Pos', 'Sum', 'Count']]
+
+def add_week(state, week, week_df):
+    """Folds one week into the running sums/counts; costs O(rows of that week)."""
+    state['fixtures'][week] = week_df.dropna(subset=['Upcoming_Opponent']).drop_duplicates('Team').set_index('Team')['Upcoming_Opponent'].to_dict()
+    opponents = state['fixtures'].get(week - opponent_lag)
+    if opponents is None:
+        logging.info(f"No fixtures for week {week - opponent_lag}; week {week} adds fixtures only.")
+        return state
+    allowed = week_allowed(week_df, week, opponents)
+    state['allowed'] = allowed if state['allowed'].empty else pd.concat([state['allowed'], allowed], ignore_index=True)
+    state['totals'] = state['totals'].add(allowed.set_index(['Team', 'Pos'])[['Sum', 'Count']], fill_value=0)
+    return state
+
+def defense_tables_from_state(state):
+    """{sheet: DataFrame} in the layout of euroleague_data_def_vs_pos_all.xlsx (full team names, Last N and Average)."""
+    allowed = state['allowed'].sort_values('Week')
+    tables = {}
+    for pos, sheet in position_sheets.items():
+        if pos not in state['totals'].index.get_level_values('Pos'):
+            tables[sheet] = pd.DataFrame(columns=['Team Name'] + [f'Last {n}' for n in recent_windows] + ['Average'])
+            continue
+        totals = state['totals'].xs(pos, level='Pos')
+        table = pd.DataFrame(index=totals.index)
+        games = allowed[allowed['Pos'] == pos].groupby('Team')
+        for n in recent_windows:
+            recent = games.tail(n).groupby('Team')[['Sum', 'Count']].sum()
+            table[f'Last {n}'] = (recent['Sum'] / recent['Count']).round(1)
+        table['Average'] = (totals['Sum'] / totals['Count']).round(1)
+        table = table.sort_values('Average', ascending=False).reset_index()
+        teams = table.pop('Team')
+        table.insert(0, 'Team Name', teams.map(team_names).fillna(teams))
+        tables[sheet] = table
+    return tables
+
+def season_defense_tables(history):
+    """Defense tables of one season from its long weekly table (with 'Week'), built in memory."""
+    state = empty_state()
+    for week, week_df in sorted(history.groupby('Week')):
+        state = add_week(state, week, week_df)
+    return defense_tables_from_state(state)
+
+def save_defense_tables(tables, path=derived_defense_file):
+    """Writes the tables as one workbook with a sheet per position."""
+    with pd.ExcelWriter(path) as writer:
+        for sheet, table in tables.items():
+            table.to_excel(writer, sheet_name=sheet, index=False)
+    logging.info(f"Saved defense vs position tables to {path}")
+
+def read_defense_tables(path=defense_data_file):
+    return {sheet: pd.read_excel(path, sheet_name=sheet) for sheet in position_sheets.values()}
+
+@profile_stage()
+def refresh_defense_state(path=player_data_path, state_file=defense_state_file):
+    """Defense state with every weekly file folded in; only weeks not seen before are read.
+
+    A changed or back-filled earlier week invalidates the running sums, so the
+    state is then rebuilt from all weekly files.
+    """
+    files = {week_number(file): file for file in glob(path)}
+    stamps = {week: os.path.getmtime(file) for week, file in files.items()}
+    state = empty_state()
+    if os.path.exists(state_file):
+        with open(state_file, 'rb') as f:
+            state = pickle.load(f)
+    seen = state['sources']
+    new_weeks = sorted(week for week in stamps if week not in seen)
+    if any(stamps.get(week) != stamp for week, stamp in seen.items()) or (seen and new_weeks and new_weeks[0] < max(seen)):
+        logging.info("Weekly files changed; rebuilding the defense state.")
+        state, new_weeks = empty_state(), sorted(stamps)
+    if not new_weeks:
+        return state
+    for week in new_weeks:
+        state = add_week(state, week, pd.read_excel(files[week], usecols=['Pos', 'Team', 'FPT', 'Upcoming_Opponent']))
+        state['sources'][week] = stamps[week]
+    save_pickle(state, state_file)
+    logging.info(f"Defense state updated with weeks {new_weeks}.")
+    return state
+
+def load_defense_tables(path=player_data_path, state_file=defense_state_file, output_file=derived_defense_file):
+    """Defense vs position tables derived from the weekly player files, saved to output_file when they change.
+
+    The derived averages count only players who played, so they sit on a
+    different scale than the hand-maintained defense_data_file; that
+    workbook is never overwritten and is read instead when there are no
+    weekly files.
+    """
+    if not glob(path):
+        logging.info(f"No weekly player files; reading defense tables from {defense_data_file}.")
+        return read_defense_tables(defense_data_file)
+    previous = os.path.getmtime(state_file) if os.path.exists(state_file) else None
+    state = refresh_defense_state(path, state_file)
+    tables = defense_tables_from_state(state)
+    if output_file and (previous is None or os.path.getmtime(state_file) != previous or not os.path.exists(output_file)):
+        save_defense_tables(tables, output_file)
+    return tables
+
+@profile_stage()
+def load_defense_data(player_df, tables=None):
+    """{sheet: {'data': {team abbreviation: average allowed}, 'alpha': impact}} for adjust_fantasy_points.
+
+    alpha scales the opponent's deviation from the league average by the
+    spread of the table relative to the position's mean FPT in player_df.
+    """
+    if tables is None:
+        tables = load_defense_tables()
+    defense_data = {}
+    for pos, sheet in position_sheets.items():
+        df = tables[sheet].copy()
+        df['Team Name'] = df['Team Name'].map(data_mapping)
+        avg_defense = df['Average'].mean()
+        std_defense = df['Average'].std()
+        avg_fantasy_points = player_df[player_df['Pos'] == pos]['FPT'].mean()
+        alpha = (3 * std_defense / avg_defense) / avg_fantasy_points
+        defense_data[sheet] = {'data': df.set_index('Team Name')['Average'].to_dict(), 'alpha': alpha}
+    logging.info(f"Defense data: {defense_data}")
+    return defense_data
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_defense_tables()
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import os
+import random
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlencode
+import aiohttp
+import pandas as pd
+
+from euroleague_archive import archived_tables, load_page, save_page
+from euroleague_partitions import current_partition, parse_partition, save_partition
+from euroleague_profiling import add_profile_arguments, configure_profiling, profile_stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Fixed part of the query; the endpoint, season and teams come from the Partition
+rounds = [1, 2, 3]
+positions = [1, 2, 3]
+
+# File paths; the weekly tables are written straight to the week files the pipeline reads
+week_data_file = "euroleague_data_players_week_{}.xlsx"
+average_data_file = "euroleague_data_players_average.xlsx"
+
+table_columns = ['Player', 'Pos', 'Team', 'FPT', 'CR', 'PLUS']
+
+# Per-team columns added to the week files by hand; a refetched week keeps them
+fixture_columns = ['Upcoming_Opponent', 'Home_Away']
+
+# Fetch settings
+max_concurrency = 4
+max_parallel_seasons = 2
+max_retries = 5
+backoff_base = 0.5
+request_timeout = 30
+
+def build_url(weeks, stats_type='tot', page=1, base_url=None, partition=current_partition):
+    """Same query the Selenium scraper builds from start_part/last_part, with an explicit page."""
+    params = [('season_id', partition.season_id), ('mode', 'dunkest'), ('stats_type', stats_type)]
+    params += [('weeks[]', week) for week in weeks]
+    params += [('rounds[]', r) for r in rounds]
+    params += [('teams[]', team) for team in partition.teams]
+    params += [('positions[]', position) for position in positions]
+    params += [('player_search', ''), ('min_cr', 4), ('max_cr', 35), ('sort_by', 'pdk'), ('sort_order', 'desc'),
+               ('iframe', 'yes'), ('noadv', 'yes'), ('page', page)]
+    return f"{base_url or partition.base_url}?{urlencode(params)}"
+
+class StatsTableParser(HTMLParser):
+    """Extracts Player/Pos/Team/FPT/CR/PLUS rows and the page count from a stats page."""
+
+    columns = {'position': 'Pos', 'team': 'Team', 'pdk': 'FPT', 'cr': 'CR', 'plus': 'PLUS'}
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.number_of_pages = 1
+        self._in_tbody = False
+        self._row = None
+        self._field = None
+        self._field_tag = None
+        self._in_last_page = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'tbody':
+            self._in_tbody = True
+        elif tag == 'tr' and self._in_tbody:
+            self._row = {}
+        elif self._row is not None and 'table__col--player-link' in classes:
+            self._field, self._field_tag = 'Player', tag
+        elif tag == 'td' and self._row is not None and attrs.get('data-sort-by') in self.columns:
+            self._field, self._field_tag = self.columns[attrs['data-sort-by']], tag
+        elif 'paginationjs-last' in classes:
+            self._in_last_page = True
+
+    def handle_endtag(self, tag):
+        if tag == 'tbody':
+            self._in_tbody = False
+        elif tag == 'tr' and self._row is not None:
+            if 'Player' in self._row:
+                self.rows.append(self._row)
+            self._row = None
+        elif tag == self._field_tag:
+            self._field = self._field_tag = None
+
+    def handle_data(self, data):
+        text = data.strip()
+        if not text:
+            return
+        if self._field is not None and self._row is not None:
+            self._row[self._field] = (self._row.get(self._field, '') + ' ' + text).strip()
+        elif self._in_last_page:
+            if re.fullmatch(r'\d+', text):
+                self.number_of_pages = int(text)
+            self._in_last_page = False
+
+def parse_stats_page(html):
+    parser = StatsTableParser()
+    parser.feed(html)
+    return parser.rows, parser.number_of_pages
+
+def stats_frame(rows):
+    """Parsed rows as a table, with FPT and CR typed as the player store types them."""
+    df = pd.DataFrame(rows, columns=table_columns)
+    for col in ['FPT', 'CR']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return df
+
+async def fetch_page(session, url, semaphore, retries=max_retries):
+    """GET with bounded concurrency and exponential backoff on network errors, 429 and 5xx."""
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                async with session.get(url) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                          status=response.status, message=response.reason)
+                    response.raise_for_status()
+                    return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries or (isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429):
+                raise
+            delay = backoff_base * 2 ** attempt * (1 + random.random())
+            logging.warning(f"Request failed ({e}); retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
+
+async def fetch_table(session, weeks, stats_type, semaphore, base_url=None, archive=True, partition=current_partition):
+    """All pages of one stats table; page 1 tells how many more to request concurrently.
+
+    With `archive` every raw page is also kept in the page archive, so the
+    table can be re-parsed later without fetching it again.
+    """
+    html = await fetch_page(session, build_url(weeks, stats_type, 1, base_url, partition), semaphore)
+    rows, number_of_pages = parse_stats_page(html)
+    logging.info(f"{stats_type} weeks={weeks}: {number_of_pages} pages")
+    pages = await asyncio.gather(*(
+        fetch_page(session, build_url(weeks, stats_type, page, base_url, partition), semaphore)
+        for page in range(2, number_of_pages + 1)
+    ))
+    if archive:
+        for page, page_html in enumerate([html] + pages, start=1):
+            save_page(page_html, partition, weeks, stats_type, page)
+    for page_html in pages:
+        rows.extend(parse_stats_page(page_html)[0])
+    return stats_frame(rows)
+
+async def fetch_season(weeks, include_average=True, concurrency=max_concurrency, base_url=None, archive=True,
+                       partition=current_partition):
+    """Per-week 'tot' tables plus the season 'avg' table of one partition, over one pooled HTTP session.
+
+    Returns {week: DataFrame} and the average DataFrame (or None).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=request_timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [fetch_table(session, [week], 'tot', semaphore, base_url, archive, partition) for week in weeks]
+        if include_average:
+            tasks.append(fetch_table(session, list(weeks), 'avg', semaphore, base_url, archive, partition))
+        tables = await asyncio.gather(*tasks)
+    weekly = dict(zip(weeks, tables[:len(weeks)]))
+    average = tables[len(weeks)] if include_average else None
+    return weekly, average
+
+async def backfill(shards, max_parallel_seasons=max_parallel_seasons, concurrency=max_concurrency, base_url=None, archive=True):
+    """Fetches {Partition: weeks} into the partitioned store, at most max_parallel_seasons seasons at a time.
+
+    Each season runs on its own session with `concurrency` requests, so at
+    most max_parallel_seasons * concurrency requests are in flight. Returns
+    {Partition: rows fetched}.
+    """
+    season_slots = asyncio.Semaphore(max_parallel_seasons)
+
+    async def fetch_shard(partition, weeks):
+        async with season_slots:
+            logging.info(f"Backfilling {partition} weeks {list(weeks)}...")
+            weekly, average = await fetch_season(weeks, True, concurrency, base_url, archive, partition)
+            await asyncio.to_thread(save_partition, partition, weekly, average)
+            return partition, sum(len(df) for df in weekly.values())
+
+    return dict(await asyncio.gather(*(fetch_shard(partition, weeks) for partition, weeks in shards.items())))
+
+def parse_weeks(text):
+    """'1-10' or '1,3,5' -> list of weeks."""
+    weeks = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        weeks.extend(range(int(first), int(last or first) + 1))
+    return weeks
+
+def parse_archived_table(paths):
+    """Rows of one table from its archived pages (runs in a worker process)."""
+    rows = []
+    for path in paths:
+        rows.extend(parse_stats_page(load_page(path))[0])
+    return stats_frame(rows)
+
+@profile_stage()
+def parse_archive(partition=current_partition, max_workers=None):
+    """Re-parses every archived table of a partition in worker processes, without network access.
+
+    Returns the same ({week: DataFrame}, average DataFrame or None) pair as
+    fetch_season. Single-week 'tot' tables are the weeks; the Selenium scraper
+    requests single weeks as 'avg' (the same numbers for one game), so those
+    fill the weeks without a 'tot' table. The average is the remaining 'avg'
+    table over the most weeks.
+    """
+    tables = archived_tables(partition)
+    if not tables:
+        raise FileNotFoundError(f"No archived pages for partition {partition}.")
+    logging.info(f"Parsing {sum(len(paths) for paths in tables.values())} archived pages in {len(tables)} tables...")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        parsed = dict(zip(tables, executor.map(parse_archived_table, tables.values())))
+    weekly = {weeks[0]: df for (weeks, stats_type), df in sorted(parsed.items()) if stats_type == 'tot' and len(weeks) == 1}
+    scraped = {weeks[0]: df for (weeks, stats_type), df in sorted(parsed.items())
+               if stats_type == 'avg' and len(weeks) == 1 and weeks[0] not in weekly}
+    weekly = dict(sorted({**weekly, **scraped}.items()))
+    averages = [(weeks, df) for (weeks, stats_type), df in parsed.items()
+                if stats_type == 'avg' and not (len(weeks) == 1 and weeks[0] in scraped)]
+    average = max(averages, key=lambda item: len(item[0]))[1] if averages else None
+    return weekly, average
+
+def week_table(df, existing):
+    """The fetched week with the fixture columns of the existing week file, matched by team."""
+    kept = [col for col in fixture_columns if existing is not None and col in existing.columns]
+    if not kept:
+        return df
+    fixtures = existing.dropna(subset=['Team']).drop_duplicates('Team').set_index('Team')[kept]
+    return df.join(fixtures, on='Team')
+
+@profile_stage()
+def save_tables(weekly, average=None):
+    """Writes the week files (only those whose contents changed, so unchanged weeks keep their mtime) and the averages."""
+    for week, df in weekly.items():
+        path = week_data_file.format(week)
+        existing = pd.read_excel(path) if os.path.exists(path) else None
+        df = week_table(df, existing)
+        if existing is not None and list(existing.columns) == list(df.columns) and \
+                existing.astype(str).equals(df.reset_index(drop=True).astype(str)):
+            logging.info(f"Week {week} unchanged; keeping {path}")
+            continue
+        logging.info(f"Saving week {week} ({len(df)} players) to {path}")
+        df.to_excel(path, index=False)
+    if average is not None:
+        logging.info(f"Saving season averages ({len(average)} players) to {average_data_file}")
+        average.to_excel(average_data_file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the Dunkest stats tables, or rebuild them from the page archive.")
+    parser.add_argument('--from-archive', action='store_true', help="Re-parse the archived pages instead of fetching")
+    parser.add_argument('--backfill', nargs='+', metavar='COMPETITION:SEASON',
+                        help="Fetch these seasons into the partitioned store, e.g. euroleague:16 euroleague:17")
+    parser.add_argument('--weeks', default='1-2', help="Weeks to fetch, e.g. 1-34 or 1,2,5")
+    parser.add_argument('--max-seasons', type=int, default=max_parallel_seasons, help="Seasons fetched concurrently")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_profiling(args)
+
+    if args.backfill:
+        shards = {parse_partition(text): parse_weeks(args.weeks) for text in args.backfill}
+        with profile_stage('backfill') as stage:
+            rows = asyncio.run(backfill(shards, args.max_seasons))
+            stage.rows = sum(rows.values())
+        return
+    if args.from_archive:
+        weekly, average = parse_archive()
+    else:
+        with profile_stage('fetch_season') as stage:
+            weekly, average = asyncio.run(fetch_season(parse_weeks(args.weeks)))
+            stage.rows = sum(len(df) for df in weekly.values())
+    save_tables(weekly, average)
+
+if __name__ == "__main__":
+    main()
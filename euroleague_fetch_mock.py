@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+
+from euroleague_archive import page_file_name
+
+# Recorded pages are stored as {stats_type}_w{weeks}_p{page}.html; the directory is not shipped, and
+# tables without a recording are rendered from the local week and average files instead
+recorded_pages_dir = "recorded_pages"
+week_data_file = "euroleague_data_players_week_{}.xlsx"
+average_data_file = "euroleague_data_players_average.xlsx"
+rows_per_page = 25
+
+def render_stats_page(df, page, rows_per_page=rows_per_page):
+    """Renders a player table with the same markup the Dunkest stats iframe uses."""
+    number_of_pages = max(1, -(-len(df) // rows_per_page))
+    rows = df.iloc[(page - 1) * rows_per_page:page * rows_per_page]
+    body = ''.join(
+        "<tr>"
+        f"<td><a class=\"table__col--player-link\">{escape(str(row.Player))}</a></td>"
+        f"<td data-sort-by=\"position\">{escape(str(row.Pos))}</td>"
+        f"<td data-sort-by=\"team\">{escape(str(row.Team))}</td>"
+        f"<td data-sort-by=\"pdk\">{row.FPT}</td>"
+        f"<td data-sort-by=\"cr\">{row.CR}</td>"
+        f"<td data-sort-by=\"plus\">{escape(str(row.PLUS))}</td>"
+        "</tr>"
+        for row in rows.itertuples(index=False)
+    )
+    return (
+        "<html><body><div class=\"table-stats__container\"><table><tbody>"
+        f"{body}</tbody></table></div>"
+        "<div id=\"statsPagination\"><ul>"
+        f"<li class=\"paginationjs-page paginationjs-last J-paginationjs-page\"><a>{number_of_pages}</a></li>"
+        "</ul></div></body></html>"
+    )
+
+class MockDunkestHandler(BaseHTTPRequestHandler):
+    """Serves recorded pages, falling back to rendering the local week/average files."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        stats_type = query.get('stats_type', ['tot'])[0]
+        weeks = [int(week) for week in query.get('weeks[]', [])]
+        page = int(query.get('page', ['1'])[0])
+
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            failing = server.failures_remaining > 0
+            if failing:
+                server.failures_remaining -= 1
+        if failing:
+            self.send_error(503, "Injected failure")
+            return
+
+        html = self.load_page(stats_type, weeks, page)
+        if html is None:
+            self.send_error(404, "No recorded page")
+            return
+        payload = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def load_page(self, stats_type, weeks, page):
+        path = os.path.join(self.server.pages_dir, page_file_name(stats_type, weeks, page))
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        if stats_type == 'avg':
+            source = average_data_file
+        elif len(weeks) == 1:
+            source = week_data_file.format(weeks[0])
+        else:
+            return None
+        if not os.path.exists(source):
+            return None
+        df = pd.read_excel(source, usecols=['Player', 'Pos', 'Team', 'FPT', 'CR', 'PLUS'])
+        return render_stats_page(df, page)
+
+    def log_message(self, format, *args):
+        logging.debug(f"mock server: {format % args}")
+
+class MockDunkestServer:
+    """Local stand-in for the Dunkest stats endpoint, run on a background thread.
+
+    Usage:
+        with MockDunkestServer(failures=2) as server:
+            asyncio.run(fetch_season([1], base_url=server.url))
+    """
+
+    def __init__(self, pages_dir=recorded_pages_dir, port=0, failures=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), MockDunkestHandler)
+        self.httpd.pages_dir = pages_dir
+        self.httpd.failures_remaining = failures
+        self.httpd.request_count = 0
+        self.httpd.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/en/euroleague/stats/players/table"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = MockDunkestServer(port=8765)
+    logging.info(f"Serving mock Dunkest pages at {server.url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,145 @@
+import logging
+import os
+import pickle
+from glob import glob
+import numpy as np
+import pandas as pd
+
+from euroleague_defense import played_rows, week_number
+from euroleague_profiling import profile_stage
+from euroleague_store import save_pickle
+
+# File paths
+player_data_path = "euroleague_data_players_week_*.xlsx"
+form_state_file = "euroleague_form_state.pkl"
+
+# A player's history is keyed by name and team (two 'D. Hall's play in the league)
+form_keys = ['Player', 'Team']
+
+# Windows in games, and the EWMA smoothing (weight of the newest game)
+short_window = 3
+long_window = 5
+ewm_alpha = 0.4
+
+form_columns = ['FPT_last3', 'FPT_last5', 'FPT_ewm', 'FPT_trend', 'FPT_std5']
+
+# Points the adjustment stages start from: the EWMA of recent games rather than the last game alone
+adjustment_base_column = 'FPT_ewm'
+
+def read_week(path, week):
+    """One week's games; did-not-play rows (0 FPT) are left out, as the defense tables leave them out."""
+    df = pd.read_excel(path, usecols=['Player', 'Pos', 'Team', 'FPT'])
+    df['FPT'] = pd.to_numeric(df['FPT'], errors='coerce')
+    return played_rows(df.dropna(subset=['FPT'])).drop_duplicates(form_keys).assign(Week=week)
+
+def rolling_form(history):
+    """Form after every game of a long (Player, Team, Week, FPT) table, that game included.
+
+    Last-3/last-5 means, the standard deviation and the least-squares slope
+    of FPT per game over the last 5 games, and the EWMA, all as grouped
+    rolling operations over the whole table.
+    """
+    history = history.sort_values(form_keys + ['Week']).reset_index(drop=True)
+    groups = history.groupby(form_keys, sort=False)
+    levels = list(range(len(form_keys)))
+    form = history[form_keys + ['Week']].copy()
+    form['Games'] = groups.cumcount() + 1
+    fpt = groups['FPT']
+    form['FPT_last3'] = fpt.rolling(short_window, min_periods=1).mean().reset_index(level=levels, drop=True)
+    form['FPT_last5'] = fpt.rolling(long_window, min_periods=1).mean().reset_index(level=levels, drop=True)
+    form['FPT_ewm'] = fpt.ewm(alpha=ewm_alpha, adjust=False).mean().reset_index(level=levels, drop=True)
+    form['FPT_std5'] = fpt.rolling(long_window, min_periods=2).std().reset_index(level=levels, drop=True)
+
+    # Slope from rolling sums of x (game number), y (FPT), xy and xx
+    x = form['Games'].astype(float)
+    terms = pd.DataFrame({'x': x, 'y': history['FPT'], 'xy': x * history['FPT'], 'xx': x * x})
+    sums = terms.groupby([history[key] for key in form_keys], sort=False).rolling(long_window, min_periods=1).sum()
+    sums = sums.reset_index(level=levels, drop=True).reindex(form.index)
+    n = np.minimum(form['Games'], long_window)
+    denominator = n * sums['xx'] - sums['x'] ** 2
+    form['FPT_trend'] = ((n * sums['xy'] - sums['x'] * sums['y']) / denominator.where(n >= 2)).round(6)
+    return form
+
+def add_week(state, week_df):
+    """Appends one week's form using only each player's last games and EWMA; O(rows of that week)."""
+    if week_df.empty:
+        return state
+    tail = state['tail'][state['tail'].set_index(form_keys).index.isin(week_df.set_index(form_keys).index)]
+    form = rolling_form(pd.concat([tail, week_df], ignore_index=True))
+    form = form[form['Week'] == week_df['Week'].iloc[0]].set_index(form_keys)
+
+    last = state['last'].reindex(form.index)
+    current = week_df.set_index(form_keys)['FPT'].reindex(form.index)
+    form['Games'] = last['Games'].fillna(0).astype(int) + 1
+    form['FPT_ewm'] = np.where(last['FPT_ewm'].isna(), current, (1 - ewm_alpha) * last['FPT_ewm'] + ewm_alpha * current)
+    state['last'] = form[['Games', 'FPT_ewm']].combine_first(state['last'])
+
+    state['tail'] = pd.concat([state['tail'], week_df[form_keys + ['Week', 'FPT']]], ignore_index=True)
+    state['tail'] = state['tail'].sort_values('Week').groupby(form_keys, sort=False).tail(long_window)
+    form = form.reset_index()[state['form'].columns]
+    state['form'] = form if state['form'].empty else pd.concat([state['form'], form], ignore_index=True)
+    return state
+
+def empty_state():
+    return {
+        'sources': {},
+        'tail': pd.DataFrame({col: [] for col in form_keys + ['Week', 'FPT']}).astype({'Week': 'int64', 'FPT': float}),
+        'last': pd.DataFrame({'Games': [], 'FPT_ewm': []}, index=pd.MultiIndex.from_tuples([], names=form_keys)),
+        'form': pd.DataFrame({col: [] for col in form_keys + ['Week', 'Games'] + form_columns}).astype(
+            {'Week': 'int64', 'Games': 'int64', **{col: float for col in form_columns}}),
+    }
+
+@profile_stage()
+def load_form_features(path=player_data_path, state_file=form_state_file):
+    """Form after every (Player, Team, Week) of the weekly files; only weeks not seen before are read.
+
+    A changed or back-filled earlier week rebuilds the state from all files.
+    """
+    files = {week_number(file): file for file in glob(path)}
+    stamps = {week: os.path.getmtime(file) for week, file in files.items()}
+    state = empty_state()
+    if os.path.exists(state_file):
+        with open(state_file, 'rb') as f:
+            state = pickle.load(f)
+    seen = state['sources']
+    new_weeks = sorted(week for week in stamps if week not in seen)
+    if any(stamps.get(week) != stamp for week, stamp in seen.items()) or (seen and new_weeks and new_weeks[0] < max(seen)):
+        logging.info("Weekly files changed; rebuilding the form state.")
+        state, new_weeks = empty_state(), sorted(stamps)
+    if new_weeks:
+        for week in new_weeks:
+            state = add_week(state, read_week(files[week], week))
+            state['sources'][week] = stamps[week]
+        save_pickle(state, state_file)
+        logging.info(f"Form state updated with weeks {new_weeks}.")
+    return state['form']
+
+def join_form(rows, form, include_current=True):
+    """Adds each row's form as of its 'Week' (or, with include_current=False, before it).
+
+    Training rows whose target is that week's FPT use include_current=False,
+    so no feature sees the game being predicted.
+    """
+    rows = rows.reset_index(drop=True)
+    joined = pd.merge_asof(rows.assign(_row=np.arange(len(rows))).sort_values('Week'),
+                           form[form_keys + ['Week'] + form_columns].sort_values('Week'),
+                           on='Week', by=form_keys, allow_exact_matches=include_current)
+    return joined.sort_values('_row').drop(columns='_row').reset_index(drop=True)
+
+def latest_form(form):
+    """Each player's form after their latest game, indexed by Player and Team."""
+    return form.sort_values('Week').groupby(form_keys).last()[form_columns]
+
+def fill_form(df, fallback_column='avg_FPT'):
+    """Players without history: means fall back to `fallback_column`, trend and volatility to 0."""
+    df = df.copy()
+    missing = pd.Series(np.nan, index=df.index)
+    fallback = pd.to_numeric(df[fallback_column], errors='coerce') if fallback_column in df.columns else missing
+    for col in form_columns:
+        values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else missing
+        df[col] = (values.fillna(fallback) if col in ['FPT_last3', 'FPT_last5', 'FPT_ewm'] else values).fillna(0)
+    return df
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_form_features()
@@ -1,6 +1,5 @@
 import logging
 import os
-import pandas as pd
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service
@@ -9,9 +8,12 @@ from selenium.webdriver.common.by import By
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from itertools import combinations
-import concurrent.futures
-import heapq
+from euroleague_availability import apply_availability
+from euroleague_defense import load_defense_tables
+from euroleague_optimizer import create_optimal_fantasy_team
+from euroleague_store import load_player_store
+from euroleague_profiling import configure_profiling, profile_stage
+from euroleague_reports import LineupWriter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,21 +22,16 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 data_file = "euroleague_data_players_week_10.xlsx"
 timestamp_file = "data_timestamp.txt"
 coach_data_file = "coach.xlsx"
-defense_data_file = "euroleague_data_def_vs_pos_all.xlsx"
+output_file = "best_team.xlsx"
 
-# Constraints
+# Objective and constraints
+objective = 'Adjusted_FPT'
 credit_limit = 100
 max_players_per_team = 10
 positions_needed = {'C': 2, 'F': 4, 'G': 4, 'HC': 1}
 max_unique_teams = 7
 
-# Track unique teams
-unique_teams = set()
-
-def create_team_identifier(team):
-    """Creates a unique identifier for a team based on player names to ensure no duplicate teams."""
-    return tuple(sorted(player.Player for player in team))
-
+@profile_stage()
 def load_data():
     # Load or scrape data
     data_up_to_date = False
@@ -46,32 +43,23 @@ def load_data():
                 data_up_to_date = True
                 logging.info("Found existing, up-to-date filtered data file for today.")
 
-    if data_up_to_date:
-        df = pd.read_excel(data_file)
-    else:
+    if not data_up_to_date:
         # Web scraping logic omitted for brevity
-        pass  # Replace with actual scraping logic as needed
+        logging.info("No data file from today; using the last scraped data.")
+
+    # Players and coaches come typed and merged from the shared store
+    df = load_player_store(data_file, None, coach_data_file)
 
     # Update timestamp file
     with open(timestamp_file, 'w') as f:
         f.write(datetime.today().strftime("%Y-%m-%d"))
     logging.info("Data saved and timestamp updated.")
 
-    # Load coach data from coach.xlsx
-    if os.path.exists(coach_data_file):
-        coach_df = pd.read_excel(coach_data_file)
-        coach_df.rename(columns={'coach_name': 'Player', 'team_name': 'Team', 'fantasy_pts': 'FPT', 'quotation': 'CR', 'avg_fpt': 'FPT_avg'}, inplace=True)
-        coach_df['Pos'] = 'HC'
-        df = pd.concat([df, coach_df], ignore_index=True)
-        logging.info("Coach data added to player data.")
-
-    # Convert FPT and CR to numeric and apply filters
-    df['FPT'] = pd.to_numeric(df['FPT'], errors='coerce')
-    df['CR'] = pd.to_numeric(df['CR'], errors='coerce')
     df['FPT/CR'] = df['FPT'] / df['CR']
     print(df.head)
     return df
 
+@profile_stage()
 def filter_players(df):
     min_fpt = 8
     player_ratio_threshold = 0.2
@@ -81,12 +69,13 @@ def filter_players(df):
     logging.info(f"Initial number of players after filtering: {len(df)}")
     return df
 
+@profile_stage()
 def load_defense_data(player_df):
     """Load defense vs position data and calculate alpha values for each position dynamically."""
     defense_data = {}
+    tables = load_defense_tables()
     for position, pos_label in zip(['Guards', 'Forwards', 'Centers'], ['G', 'F', 'C']):
-        # Load defense data for each position
-        df = pd.read_excel(defense_data_file, sheet_name=position)
+        df = tables[position]
         
         # Calculate league average and standard deviation for the defensive 'Average' column
         league_avg_defense = df['Average'].mean()
@@ -126,89 +115,44 @@ def adjust_fantasy_points(player, opponent_team, defense_data):
     
     return adjusted_fpt
 
+@profile_stage()
 def select_top_players(df, defense_data):
     """Select top players based on adjusted fantasy points, considering opponent defenses."""
     top_n_per_position = 14
     top_n_per_position_coach = 8
     # Use 'Upcoming_Opponent' column in the adjustment
-    df['Adjusted FPT'] = df.apply(lambda x: adjust_fantasy_points(x, x.Upcoming_Opponent, defense_data), axis=1)
-    centers = df[df['Pos'] == 'C'].nlargest(top_n_per_position, 'Adjusted FPT')
-    forwards = df[df['Pos'] == 'F'].nlargest(top_n_per_position, 'Adjusted FPT')
-    guards = df[df['Pos'] == 'G'].nlargest(top_n_per_position, 'Adjusted FPT')
-    head_coaches = df[df['Pos'] == 'HC'].nlargest(top_n_per_position_coach, 'Adjusted FPT')
+    df['Adjusted_FPT'] = df.apply(lambda x: adjust_fantasy_points(x, x.Upcoming_Opponent, defense_data), axis=1)
+    centers = df[df['Pos'] == 'C'].nlargest(top_n_per_position, 'Adjusted_FPT')
+    forwards = df[df['Pos'] == 'F'].nlargest(top_n_per_position, 'Adjusted_FPT')
+    guards = df[df['Pos'] == 'G'].nlargest(top_n_per_position, 'Adjusted_FPT')
+    head_coaches = df[df['Pos'] == 'HC'].nlargest(top_n_per_position_coach, 'Adjusted_FPT')
     logging.info(f"Players per position after filtering: Centers={len(centers)}, Forwards={len(forwards)}, Guards={len(guards)}, Head Coaches={len(head_coaches)}")
     return centers, forwards, guards, head_coaches
 
-def create_optimal_fantasy_team(centers, forwards, guards, head_coaches):
-    logging.info("Starting team selection using optimized heuristic approach...")
-    top_teams = []
-    possible_combinations = 0
-
-    def process_combination(c_combo, f_combo, g_combo):
-        nonlocal possible_combinations
-        for hc in head_coaches.itertuples(index=False):
-            team = list(c_combo) + list(f_combo) + list(g_combo) + [hc]
-            team_id = create_team_identifier(team)
-
-            if team_id in unique_teams:
-                logging.debug("Duplicate team found, skipping...")
-                continue
-
-            unique_teams.add(team_id)
-            possible_combinations += 1
-
-            total_cr = sum(player.CR for player in team)
-            if total_cr > credit_limit:
-                logging.debug(f"Team exceeds credit limit (Total CR: {total_cr}), skipping...")
-                continue
-
-            total_fpt = sum(player.Adjusted_FPT for player in team)
-            team_counts = {}
-            for player in team:
-                team_counts[player.Team] = team_counts.get(player.Team, 0) + 1
-
-            if not all(count <= max_players_per_team for count in team_counts.values()):
-                logging.debug("Team exceeds max players per team constraint, skipping...")
-                continue
-
-            if len(top_teams) < max_unique_teams:
-                heapq.heappush(top_teams, (total_fpt, team))
-            else:
-                heapq.heappushpop(top_teams, (total_fpt, team))
-
-            logging.info(f"Combination checked: FPT={total_fpt}, CR={total_cr}")
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:  # Increase workers
-        for c_combo in combinations(centers.itertuples(index=False), positions_needed['C']):
-            for f_combo in combinations(forwards.itertuples(index=False), positions_needed['F']):
-                for g_combo in combinations(guards.itertuples(index=False), positions_needed['G']):
-                    executor.submit(process_combination, c_combo, f_combo, g_combo)
-
-    logging.info(f"Total possible team combinations checked: {possible_combinations}")
-    return [team for _, team in sorted(top_teams, reverse=True)]
-
 # Main execution
-df = load_data()
-df = filter_players(df)
-defense_data = load_defense_data(df)
-centers, forwards, guards, head_coaches = select_top_players(df, defense_data)
-
-# Generate up to 3 unique fantasy teams
-logging.info(f"Generating up to {max_unique_teams} unique optimal fantasy teams...")
-fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches)
-
-logging.info("Saving best team data to 'best_team.xlsx'")
-teams_data = []
-for idx, team in enumerate(fantasy_teams):
-    team_dict = {"Team Number": idx + 1, "Total FPT": sum(player.Adjusted_FPT for player in team)}
-    for player in team:
-        team_dict[player.Player] = {"Position": player.Pos, "Team": player.Team, "FPT": player.FPT, "Adjusted FPT": player.Adjusted_FPT, "CR": player.CR}
-    teams_data.append(team_dict)
-
-pd.DataFrame(teams_data).to_excel("best_team.xlsx", index=False)
-
-# Display the created teams
-for idx, team in enumerate(fantasy_teams, 1):
-    logging.info(f"\nFantasy Team {idx} with Total Adjusted FPT: {sum(player.Adjusted_FPT for player in team):.2f}")
-    for player in team:
-        logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.FPT:.2f} | Adjusted FPT: {player.Adjusted_FPT}")
\ No newline at end of file
+def main():
+    configure_profiling()
+    df = load_data()
+    df = filter_players(df)
+    # Drop injured / not playing players before the top-N cut so their slots are backfilled
+    df = apply_availability(df)
+    defense_data = load_defense_data(df)
+    centers, forwards, guards, head_coaches = select_top_players(df, defense_data)
+
+    # Generate up to 3 unique fantasy teams
+    logging.info(f"Generating up to {max_unique_teams} unique optimal fantasy teams...")
+    fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches, objective, credit_limit, max_unique_teams,
+                                                positions_needed, max_players_per_team)
+
+    logging.info(f"Saving best team data to '{output_file}'")
+    with LineupWriter(output_file, [objective]) as writer:
+        writer.write_all(fantasy_teams)
+
+    # Display the created teams
+    for idx, team in enumerate(fantasy_teams, 1):
+        logging.info(f"\nFantasy Team {idx} with Total Adjusted FPT: {sum(player.Adjusted_FPT for player in team):.2f}")
+        for player in team:
+            logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.FPT:.2f} | Adjusted FPT: {player.Adjusted_FPT}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,11 @@
 import logging
 
-import os
+from euroleague_availability import availability_index
+from euroleague_defense import load_defense_data
+from euroleague_form import adjustment_base_column, fill_form, form_keys, latest_form, load_form_features
 
-import pandas as pd
-
-from datetime import datetime
-
-from itertools import combinations
-
-import concurrent.futures
-
-import heapq
+from euroleague_store import load_player_store
+from euroleague_profiling import configure_profiling, profile_stage
 
 # Configure logging
 
@@ -24,138 +19,26 @@ timestamp_file = "data_timestamp.txt"
 
 coach_data_file = "coach.xlsx"
 
-defense_data_file = "euroleague_data_def_vs_pos_all.xlsx"
-
 avg_data_file = "euroleague_data_players_average.xlsx"
 
-# Constraints
-
-credit_limit = 100
-
-max_players_per_team = 11
-
-positions_needed = {'C': 2, 'F': 4, 'G': 4, 'HC': 1}
-
-max_unique_teams = 1
-
-# Track unique teams
-
-unique_teams = set()
-
-def create_team_identifier(team):
-
-    """Creates a unique identifier for a team based on player names to ensure no duplicate teams."""
+# Points the adjustment starts from: a form column ('FPT_ewm' by default, or 'FPT_last3'/'FPT_last5') or last week's 'FPT'
 
-    return tuple(sorted(player.Player for player in team))
+base_column = adjustment_base_column
 
+@profile_stage()
 def load_data():
 
-    data_mapping = {
-
-        "FC Bayern Munich": "BAY",
-
-        "FC Barcelona": "BAR",
-
-        "Zalgiris Kaunas": "ZAL",
-
-        "Panathinaikos AKTOR Athens": "PAO",
-
-        "Real Madrid": "RMB",
-
-        "ALBA Berlin": "BER",
-
-        "EA7 Emporio Armani Milan": "EA7",
-
-        "Maccabi Playtika Tel Aviv": "MTA",
-
-        "Olympiacos Piraeus": "OLY",
-
-        "Baskonia Vitoria-Gasteiz": "BKN",
-
-        "Crvena Zvezda Meridianbet Belgrade": "CZV",
-
-        "Partizan Mozzart Bet Belgrade": "PAR",
+    # Players, season averages and coaches come typed and merged from the shared store
 
-        "AS Monaco": "ASM",
-
-        "LDLC ASVEL Villeurbanne": "ASV",
-
-        "Anadolu Efes Istanbul": "EFS",
-
-        "Paris Basketball": "PBB",
-
-        "Virtus Segafredo Bologna": "VIR",
-
-        "Fenerbahce Beko Istanbul": "FBB"
-
-    }
-
-    # Load data and add coach data if available
-
-    if os.path.exists(data_file):
-
-        df = pd.read_excel(data_file)
-
-    else:
-
-        raise FileNotFoundError("Player data file is missing.")
-    # Load and add avf_FPT and avg_CR to table
-    
-    if os.path.exists(avg_data_file):
-        # Load the average data
-        avg_df = pd.read_excel(avg_data_file)
-        
-        # Rename columns for clarity
-        avg_df.rename(columns={'FPT': 'avg_FPT', 'CR': 'avg_CR', 'PLUS': 'avg_PLUS'}, inplace=True)
-        
-        # Log the contents of avg_df before merging
-        logging.info(f'Avg before adding: \n{avg_df}')
-        
-        # Select only necessary columns from avg_df
-        avg_columns_to_merge = avg_df[['Player', 'Pos', 'Team', 'avg_PLUS', 'avg_FPT']]
-        
-        # Perform the merge
-        df = pd.merge(
-            df,
-            avg_columns_to_merge,
-            on=['Player', 'Pos', 'Team'],  # Ensure these columns exist in both DataFrames
-            how='left'
-        )
-        
-        # Log the contents of df after merging
-        logging.info(f'Data after merging avg_FPT: \n{df.head()}')
-
-
-    # Load and concatenate coach data if available
-
-    if os.path.exists(coach_data_file):
-
-        coach_df = pd.read_excel(coach_data_file)
-
-        coach_df.rename(columns={'coach_name': 'Player', 'team_name': 'Team', 'fantasy_pts': 'FPT', 'quotation': 'CR', 'avg_fpt': 'avg_FPT'}, inplace=True)
-
-        coach_df['Pos'] = 'HC'
-
-        df = pd.concat([df, coach_df], ignore_index=True)
-
-        logging.info("Coach data added to player data.")
-
-    # Apply team abbreviation mapping to the 'Team' column after concatenation
-
-    df['Team'] = df['Team'].map(data_mapping).fillna(df['Team']) # Keeps original name if not in mapping
+    df = load_player_store(data_file, avg_data_file, coach_data_file)
 
     logging.info(df["Team"])
 
-    # Convert FPT and CR to numeric and filter by calculated FPT/CR
-
-    df['FPT'] = pd.to_numeric(df['FPT'], errors='coerce')
-
-    df['CR'] = pd.to_numeric(df['CR'], errors='coerce')
-
     df['FPT/CR'] = df['FPT'] / df['CR']
 
     return df
 
+@profile_stage()
 def filter_players(df):
 
     min_fpt = 10
@@ -172,84 +55,6 @@ def filter_players(df):
 
     return df
 
-def load_defense_data(player_df):
-
-    # Dynamically calculate alpha values based on league defense data
-
-    defense_data = {}
-
-    data_mapping = {
-
-        "FC Bayern Munich": "BAY",
-
-        "FC Barcelona": "BAR",
-
-        "Zalgiris Kaunas": "ZAL",
-
-        "Panathinaikos AKTOR Athens": "PAO",
-
-        "Real Madrid": "RMB",
-
-        "ALBA Berlin": "BER",
-
-        "EA7 Emporio Armani Milan": "EA7",
-
-        "Maccabi Playtika Tel Aviv": "MTA",
-
-        "Olympiacos Piraeus": "OLY",
-
-        "Baskonia Vitoria-Gasteiz": "BKN",
-
-        "Crvena Zvezda Meridianbet Belgrade": "CZV",
-
-        "Partizan Mozzart Bet Belgrade": "PAR",
-
-        "AS Monaco": "ASM",
-
-        "LDLC ASVEL Villeurbanne": "ASV",
-
-        "Anadolu Efes Istanbul": "EFS",
-
-        "Paris Basketball": "PBB",
-
-        "Virtus Segafredo Bologna": "VIR",
-
-        "Fenerbahce Beko Istanbul": "FBB"
-
-    }
-
-    for position, pos_label in zip(['Guards', 'Forwards', 'Centers'], ['G', 'F', 'C']):
-
-        # Load defense data for each position
-
-        df = pd.read_excel(defense_data_file, sheet_name=position)
-
-        # Apply the team abbreviation mapping to the "Team Name" column
-
-        df['Team Name'] = df['Team Name'].map(data_mapping)
-
-        # Calculate league average and standard deviation for the defensive 'Average' column
-
-        avg_defense = df['Average'].mean()
-
-        std_defense = df['Average'].std()
-
-        # Calculate average fantasy points for the position from player data
-
-        avg_fantasy_points = player_df[player_df['Pos'] == pos_label]['FPT'].mean()
-
-        # Estimate the impact ratio dynamically
-
-        alpha = (3 * std_defense / avg_defense) / avg_fantasy_points
-
-        # Store the alpha value and team-based defense data for the position
-
-        defense_data[position] = {'data': df.set_index('Team Name')['Average'].to_dict(), 'alpha': alpha}
-
-    logging.info(f"Defense data: {defense_data}")
-
-    return defense_data
-
 def adjust_fantasy_points(player, opponent_team, defense_data):
 
     # Adjust FPT based on the opponent's defensive strength against the player's position
@@ -260,7 +65,7 @@ def adjust_fantasy_points(player, opponent_team, defense_data):
 
     home_away = player.Home_Away
 
-    raw_fpt = player.FPT
+    raw_fpt = getattr(player, base_column)
 
     if home_away == 'home':
 
@@ -316,6 +121,7 @@ def adjust_fantasy_points(player, opponent_team, defense_data):
 
 # Save dataframe with Adjusted FPT and adjusted FPT/CR and added average FPT and CR columns
 
+@profile_stage()
 def select_top_players(df, defense_data):
 
     max_player_per_pos = 8
@@ -328,13 +134,17 @@ def select_top_players(df, defense_data):
 
     df['Adj_FPT/CR'] = df['Adjusted_FPT'] / df['CR']
 
-    centers = df[df['Pos'] == 'C'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
+    # Only available players compete for the top-N slots
+
+    available = df[df['PLAYS'] == 1]
+
+    centers = available[available['Pos'] == 'C'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
 
-    forwards = df[df['Pos'] == 'F'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
+    forwards = available[available['Pos'] == 'F'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
 
-    guards = df[df['Pos'] == 'G'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
+    guards = available[available['Pos'] == 'G'].nlargest(max_player_per_pos, 'Adj_FPT/CR')
 
-    head_coaches = df[df['Pos'] == 'HC'].nlargest(max_coach_per_pos, 'Adj_FPT/CR')
+    head_coaches = available[available['Pos'] == 'HC'].nlargest(max_coach_per_pos, 'Adj_FPT/CR')
 
     logging.info(f"Players after filtering: Centers={len(centers)}, Forwards={len(forwards)}, Guards={len(guards)}, Coaches={len(head_coaches)}")
 
@@ -346,10 +156,27 @@ def select_top_players(df, defense_data):
 
 # Main script execution
 
-df = load_data()
+def main():
+
+    configure_profiling()
+
+    df = load_data()
+
+    # df = filter_players(df)
+
+    # Availability from the PLAYS flag and the injuries file, kept in the saved table
+
+    df['PLAYS'] = availability_index(df).astype(int)
+
+    # Rolling form per player, updated incrementally from the weekly files; coaches fall back to FPT
+
+    df = fill_form(df.join(latest_form(load_form_features()), on=form_keys), fallback_column='FPT')
+
+    defense_data = load_defense_data(df)
+
+    centers, forwards, guards, head_coaches = select_top_players(df, defense_data)
 
-# df = filter_players(df)
 
-defense_data = load_defense_data(df)
+if __name__ == "__main__":
 
-centers, forwards, guards, head_coaches = select_top_players(df, defense_data)
\ No newline at end of file
+    main()
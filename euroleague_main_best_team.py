@@ -21,11 +21,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 from selenium.webdriver.support import expected_conditions as EC
 
-from itertools import combinations
-
-import concurrent.futures
-
-import heapq
+from euroleague_availability import apply_availability
+from euroleague_optimizer import (Constraints, LineupSearch, build_pool, create_optimal_fantasy_team, dominance_mask,
+                                  iter_lineup_portfolio, lineup_frontier)
+from euroleague_simulation import simulate_lineups
+from euroleague_profiling import configure_profiling, profile_stage
+from euroleague_reports import LineupWriter
 
 # Configure logging
 
@@ -39,7 +40,11 @@ timestamp_file = "data_timestamp.txt"
 
 coach_data_file = "coach.xlsx"
 
-# Constraints
+output_file = "best_team_original_reformatted.xlsx"
+
+# Objective and constraints
+
+objective = 'Adjusted_FPT'
 
 credit_limit = 103.6
 
@@ -49,16 +54,40 @@ positions_needed = {'C': 2, 'F': 4, 'G': 4, 'HC': 1}
 
 max_unique_teams = 3
 
-# Track unique teams
+# Exact candidate pool (dominance pruning) instead of the top-N by Adj_FPT/CR cut
+
+exact_pool = True
+
+# Anytime mode: search the best lineup heuristically for this many ms instead of exhaustively (None = exact)
+
+time_budget_ms = None
+
+# Lineup portfolio mode: diverse lineups instead of the K best
+
+portfolio_mode = False
+
+max_shared_players = 7
+
+max_player_exposure = 0.6
+
+# Transfer mode: improve the current 11-man roster with at most max_transfers swaps
+
+current_roster = []
 
-unique_teams = set()
+max_transfers = 2
 
-def create_team_identifier(team):
+# Frontier mode: best lineup for every budget from frontier_min_credits up to credit_limit
 
-    """Creates a unique identifier for a team based on player names to ensure no duplicate teams."""
+frontier_mode = False
 
-    return tuple(sorted(player.Player for player in team))
+frontier_min_credits = 80
 
+frontier_file = "euroleague_frontier.xlsx"
+
+# Monte Carlo risk report for the selected teams
+simulation_threshold = 250
+
+@profile_stage()
 def load_data():
 
     # Load data
@@ -67,6 +96,7 @@ def load_data():
     
     return df
 
+@profile_stage()
 def filter_players(df):
 
     # Define thresholds for players and coaches separately
@@ -76,16 +106,12 @@ def filter_players(df):
     player_ratio_threshold = 0.8
 
     coach_ratio_threshold = 0.3
-    
-    # Filter if players are playing PLAYS == 1
-    playing = 1
 
     # Apply filtering with separate thresholds
 
     df = df[((df['Pos'] != 'HC') & (df['Adjusted_FPT'] >= min_fpt) & (df['CR'] >= 4) & (df['Adj_FPT/CR'] > player_ratio_threshold)) |
 
-            ((df['Pos'] == 'HC') & (df['Adjusted_FPT'] >= min_fpt) & (df['CR'] >= 4) & (df['Adj_FPT/CR'] > coach_ratio_threshold)) |
-            (df['PLAYS'] == playing)]
+            ((df['Pos'] == 'HC') & (df['Adjusted_FPT'] >= min_fpt) & (df['CR'] >= 4) & (df['Adj_FPT/CR'] > coach_ratio_threshold))]
 
     # Log the current player pool size
 
@@ -93,8 +119,17 @@ def filter_players(df):
 
     return df
 
+@profile_stage()
 def select_top_players(df):
 
+    if exact_pool:
+
+        # Keep every player that can still be in one of the best lineups
+
+        df = df[dominance_mask(df, objective, positions_needed, max_players_per_team, max_unique_teams)]
+
+        return tuple(df[df['Pos'] == pos] for pos in ['C', 'F', 'G', 'HC'])
+
     # Further filter by selecting top N players in each position based on FPT/CR
 
     top_n_per_position = 8
@@ -113,156 +148,99 @@ def select_top_players(df):
 
     return centers, forwards, guards, head_coaches
 
-def create_optimal_fantasy_team(centers, forwards, guards, head_coaches):
-
-    logging.info("Starting team selection using optimized heuristic approach...")
-
-    # Use a heap to maintain the top 3 teams
-
-    top_teams = []
-
-    possible_combinations = 0
-
-    def process_combination(c_combo, f_combo, g_combo):
-
-        nonlocal possible_combinations
-
-        for hc in head_coaches.itertuples(index=False):
-
-            team = list(c_combo) + list(f_combo) + list(g_combo) + [hc]
-
-            team_id = create_team_identifier(team)
-
-            if team_id in unique_teams:
-
-                continue
-
-            unique_teams.add(team_id)
-
-            possible_combinations += 1
-
-            total_cr = sum(player.CR for player in team)
-
-            if total_cr > credit_limit:
-
-                continue
-
-            total_fpt = sum(player.FPT for player in team)
-
-            total_adj_fpt = sum(player.Adjusted_FPT for player in team)
-
-            team_counts = {}
-
-            for player in team:
-
-                team_counts[player.Team] = team_counts.get(player.Team, 0) + 1
-
-            if all(count <= max_players_per_team for count in team_counts.values()):
-
-                # Use a heap to keep only the top 3 teams
-
-                if len(top_teams) < max_unique_teams:
-
-                    heapq.heappush(top_teams, (total_fpt, team))
-
-                else:
-
-                    heapq.heappushpop(top_teams, (total_fpt, team))
-
-                logging.info(f"Combination checked: AdjFP:{total_adj_fpt} FPT={total_fpt}, CR={total_cr}")
+# Main execution
 
-    # Parallel processing with a ThreadPoolExecutor
+def main():
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    configure_profiling()
 
-        for c_combo in combinations(centers.itertuples(index=False), positions_needed['C']):
+    all_players = load_data()
 
-            for f_combo in combinations(forwards.itertuples(index=False), positions_needed['F']):
+    df = filter_players(all_players)
 
-                for g_combo in combinations(guards.itertuples(index=False), positions_needed['G']):
+    # Drop injured / not playing players before the top-N cut so their slots are backfilled
 
-                    executor.submit(process_combination, c_combo, f_combo, g_combo)
+    df = apply_availability(df)
 
-    logging.info(f"Total possible team combinations checked: {possible_combinations}")
+    centers, forwards, guards, head_coaches = select_top_players(df)
 
-    return [team for _, team in sorted(top_teams, reverse=True)]
+    if frontier_mode:
 
-# Main execution
+        frontier = lineup_frontier(build_pool(centers, forwards, guards, head_coaches),
 
-df = load_data()
+                                   Constraints(objective, credit_limit, positions_needed=positions_needed, max_players_per_team=max_players_per_team),
 
-df = filter_players(df)
+                                   frontier_min_credits)
 
-centers, forwards, guards, head_coaches = select_top_players(df)
+        with LineupWriter(frontier_file, [objective]) as writer:
 
-# Generate up to 3 unique fantasy teams
+            writer.write_all(result.players for result in frontier)
 
-logging.info("Generating up to 3 unique optimal fantasy teams...")
+        logging.info("Budget frontier:\n" + "\n".join(f"CR {result.credits:.1f}: {objective}={result.value:.2f}" for result in frontier))
 
-fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches)
+        return
 
-# Save best teams to file
+    # Generate up to 3 unique fantasy teams
 
-teams_data = {}
+    if current_roster:
 
-for idx, team in enumerate(fantasy_teams, start=1):
+        roster = all_players[all_players['Player'].isin(current_roster)]
 
-    team_name = f"Team {idx}"
+        fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches, objective, credit_limit, max_unique_teams,
 
-    team_details = []
+                                                    positions_needed, max_players_per_team, roster=roster, max_transfers=max_transfers)
 
-    for player in team:
+        with LineupWriter(output_file, [objective]) as writer:
 
-        team_details.append({
+            writer.write_all(fantasy_teams)
 
-            "Player": player.Player,
+    elif portfolio_mode:
 
-            "Position": player.Pos,
+        logging.info(f"Generating a portfolio of up to {max_unique_teams} lineups sharing at most {max_shared_players} players...")
 
-            "Team": player.Team,
+        search = LineupSearch(build_pool(centers, forwards, guards, head_coaches), objective, credit_limit, positions_needed, max_players_per_team)
 
-            "FPT": player.FPT,
+        # Each lineup is written as soon as it is solved
 
-            "CR": player.CR,
+        fantasy_teams = []
 
-            "Adjusted FPT": player.Adjusted_FPT
+        with LineupWriter(output_file, [objective]) as writer:
 
-        })
+            for lineup in iter_lineup_portfolio(search, max_unique_teams, max_shared_players, max_player_exposure):
 
-    # Convert team details to a DataFrame for this team
+                writer.write(lineup)
 
-    team_df = pd.DataFrame(team_details).set_index("Player")
+                fantasy_teams.append(lineup)
 
-    team_df.loc["Totals"] = {
+    else:
 
-        "Position": "N/A",
+        logging.info(f"Generating up to {max_unique_teams} unique optimal fantasy teams...")
 
-        "Team": "N/A",
+        fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches, objective, credit_limit, max_unique_teams,
 
-        "FPT": sum(player.FPT for player in team),
+                                                    positions_needed, max_players_per_team, time_budget_ms=time_budget_ms)
 
-        "CR": sum(player.CR for player in team),
+        with LineupWriter(output_file, [objective]) as writer:
 
-        "Adjusted FPT": sum(player.Adjusted_FPT for player in team)
+            writer.write_all(fantasy_teams)
 
-    }
+    # Risk profile of the selected teams
 
-    teams_data[team_name] = team_df
+    risk_report = simulate_lineups(fantasy_teams, df, center_column=objective, threshold=simulation_threshold)
 
-# Write each team to a separate sheet in the Excel file
+    logging.info(f"Lineup risk profile:\n{risk_report.to_string(index=False)}")
 
-with pd.ExcelWriter("best_team_original_reformatted.xlsx") as writer:
+    # Display the created teams
 
-    for team_name, team_df in teams_data.items():
+    for idx, team in enumerate(fantasy_teams, 1):
 
-        team_df.to_excel(writer, sheet_name=team_name)
+        logging.info(f"\nFantasy Team {idx} with Total FPT: {sum(player.FPT for player in team):.2f} and Total adj_FPT {sum(player.Adjusted_FPT for player in team):.2f}")
 
-# Display the created teams
+        for player in team:
 
-for idx, team in enumerate(fantasy_teams, 1):
+            logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.FPT:.2f} | CR: {player.CR}")
 
-    logging.info(f"\nFantasy Team {idx} with Total FPT: {sum(player.FPT for player in team):.2f} and Total adj_FPT {sum(player.Adjusted_FPT for player in team):.2f}")
 
-    for player in team:
+if __name__ == "__main__":
 
-        logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.FPT:.2f} | CR: {player.CR}")
\ No newline at end of file
+    main()
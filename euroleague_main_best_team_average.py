@@ -21,11 +21,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 from selenium.webdriver.support import expected_conditions as EC
 
-from itertools import combinations
+from euroleague_availability import apply_availability
 
-import concurrent.futures
-
-import heapq
+from euroleague_optimizer import create_optimal_fantasy_team
+from euroleague_profiling import configure_profiling, profile_stage
+from euroleague_reports import LineupWriter
 
 # Configure logging
 
@@ -39,7 +39,11 @@ timestamp_file = "data_timestamp.txt"
 
 coach_data_file = "coach.xlsx"
 
-# Constraints
+output_file = "euroleague_best_team_original_average.xlsx"
+
+# Objective and constraints
+
+objective = 'avg_FPT'
 
 credit_limit = 97.5
 
@@ -49,16 +53,7 @@ positions_needed = {'C': 2, 'F': 4, 'G': 4, 'HC': 1}
 
 max_unique_teams = 3
 
-# Track unique teams
-
-unique_teams = set()
-
-def create_team_identifier(team):
-
-    """Creates a unique identifier for a team based on player names to ensure no duplicate teams."""
-
-    return tuple(sorted(player.Player for player in team))
-
+@profile_stage()
 def load_data():
 
     # Load or scrape data
@@ -79,6 +74,7 @@ def load_data():
 
     return df
 
+@profile_stage()
 def filter_players(df):
 
     # Define thresholds for players and coaches separately
@@ -102,6 +98,7 @@ def filter_players(df):
 
     return df
 
+@profile_stage()
 def select_top_players(df):
 
     # Further filter by selecting top N players in each position based on FPT/CR
@@ -122,159 +119,47 @@ def select_top_players(df):
 
     return centers, forwards, guards, head_coaches
 
-def create_optimal_fantasy_team(centers, forwards, guards, head_coaches):
-
-    logging.info("Starting team selection using optimized heuristic approach...")
-
-
-    # Use a heap to maintain the top 3 teams
-
-    top_teams = []
-
-    possible_combinations = 0
-
-
-    def process_combination(c_combo, f_combo, g_combo):
-
-        nonlocal possible_combinations
-
-        for hc in head_coaches.itertuples(index=False):
-
-            team = list(c_combo) + list(f_combo) + list(g_combo) + [hc]
-
-            team_id = create_team_identifier(team)
-
-            if team_id in unique_teams:
-
-                continue
-
-
-            unique_teams.add(team_id)
-
-            possible_combinations += 1
-
-            total_cr = sum(player.CR for player in team)
-
-            if total_cr > credit_limit:
-
-                continue
-
-            total_fpt = sum(player.FPT for player in team)
-
-            total_adj_fpt = sum(player.Adjusted_FPT for player in team)
-
-            team_counts = {}
-
-            for player in team:
-
-                team_counts[player.Team] = team_counts.get(player.Team, 0) + 1
-
-            if all(count <= max_players_per_team for count in team_counts.values()):
-
-                # Use a heap to keep only the top 3 teams
-
-                if len(top_teams) < max_unique_teams:
-
-                    heapq.heappush(top_teams, (total_fpt, team))
-
-                else:
-
-                    heapq.heappushpop(top_teams, (total_fpt, team))
-
-                logging.info(f"Combination checked: AdjFP:{total_adj_fpt} FPT={total_fpt}, CR={total_cr}")
-
-    # Parallel processing with a ThreadPoolExecutor
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-
-        for c_combo in combinations(centers.itertuples(index=False), positions_needed['C']):
-
-            for f_combo in combinations(forwards.itertuples(index=False), positions_needed['F']):
-
-                for g_combo in combinations(guards.itertuples(index=False), positions_needed['G']):
-
-                    executor.submit(process_combination, c_combo, f_combo, g_combo)
-
-    logging.info(f"Total possible team combinations checked: {possible_combinations}")
-
-    return [team for _, team in sorted(top_teams, reverse=True)]
-
 # Main execution
 
-df = load_data()
-
-df = filter_players(df)
-
-centers, forwards, guards, head_coaches = select_top_players(df)
-
-# Generate up to 3 unique fantasy teams
-
-logging.info("Generating up to 3 unique optimal fantasy teams...")
-
-fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches)
-
-# Save best teams to file
-
-teams_data = {}
-
-for idx, team in enumerate(fantasy_teams, start=1):
-
-    team_name = f"Team {idx}"
-
-    team_details = []
-
-    for player in team:
-
-        team_details.append({
-
-            "Player": player.Player,
-
-            "Position": player.Pos,
-
-            "Team": player.Team,
-
-            "FPT": player.FPT,
-
-            "CR": player.CR,
+def main():
 
-            "avg_FPT": player.avg_FPT
+    configure_profiling()
 
-        })
+    df = load_data()
 
-    # Convert team details to a DataFrame for this team
+    df = filter_players(df)
 
-    team_df = pd.DataFrame(team_details).set_index("Player")
+    # Drop injured / not playing players before the top-N cut so their slots are backfilled
 
-    team_df.loc["Totals"] = {
+    df = apply_availability(df)
 
-        "Position": "N/A",
+    centers, forwards, guards, head_coaches = select_top_players(df)
 
-        "Team": "N/A",
+    # Generate up to 3 unique fantasy teams
 
-        "FPT": sum(player.FPT for player in team),
+    logging.info(f"Generating up to {max_unique_teams} unique optimal fantasy teams...")
 
-        "CR": sum(player.CR for player in team),
+    fantasy_teams = create_optimal_fantasy_team(centers, forwards, guards, head_coaches, objective, credit_limit, max_unique_teams,
 
-        "avg_FPT": sum(player.avg_FPT for player in team)
+                                                positions_needed, max_players_per_team)
 
-    }
+    # Save best teams to file
 
-    teams_data[team_name] = team_df
+    with LineupWriter(output_file, [objective]) as writer:
 
-# Write each team to a separate sheet in the Excel file
+        writer.write_all(fantasy_teams)
 
-with pd.ExcelWriter("euroleague_best_team_original_average.xlsx") as writer:
+    # Display the created teams
 
-    for team_name, team_df in teams_data.items():
+    for idx, team in enumerate(fantasy_teams, 1):
 
-        team_df.to_excel(writer, sheet_name=team_name)
+        logging.info(f"\nFantasy Team {idx} with Total FPT: {sum(player.FPT for player in team):.2f} and Total avg_FPT {sum(player.avg_FPT for player in team):.2f}")
 
-# Display the created teams
+        for player in team:
 
-for idx, team in enumerate(fantasy_teams, 1):
+            logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.avg_FPT:.2f} | CR: {player.CR}")
 
-    logging.info(f"\nFantasy Team {idx} with Total FPT: {sum(player.FPT for player in team):.2f} and Total avg_FPT {sum(player.avg_FPT for player in team):.2f}")
 
-    for player in team:
+if __name__ == "__main__":
 
-        logging.info(f"{player.Player} | Position: {player.Pos} | Team: {player.Team} | FPT: {player.avg_FPT:.2f} | CR: {player.CR}")
\ No newline at end of file
+    main()
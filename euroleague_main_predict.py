@@ -1,3 +1,4 @@
+import argparse
 import logging
 import os
 import pandas as pd
@@ -6,74 +7,91 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import GradientBoostingRegressor
 from glob import glob
 import joblib
+from euroleague_defense import played_rows, season_defense_tables, week_number
+from euroleague_predictor import (FPTPredictor, build_defense_lookup, defense_data_from_tables, encoders_file, features,
+                                  load_defense_data, load_model_params, lookup_defense, model_file, parse_plus,
+                                  save_model_params, scaled_features, scaler_file)
+from euroleague_partitions import load_season, parse_partition
+from euroleague_form import fill_form, form_keys, join_form, load_form_features, rolling_form
+from euroleague_model_tuning import tune_model
+from euroleague_profiling import add_profile_arguments, configure_profiling, profile_stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # File paths and configurations
 player_data_path = "euroleague_data_players_week_*.xlsx"
-defense_data_file = "euroleague_data_def_vs_pos_{}.xlsx"
 latest_week = 10
 upcoming_week = 11
-model_file = "euroleague_model.pkl"
-scaler_file = "scaler.pkl"
 output_file = f"euroleague_predictions_week_{upcoming_week}.xlsx"
 
-# Team mapping
-data_mapping = {
-    "FC Bayern Munich": "BAY", "FC Barcelona": "BAR", "Zalgiris Kaunas": "ZAL",
-    "Panathinaikos AKTOR Athens": "PAO", "Real Madrid": "RMB", "ALBA Berlin": "BER",
-    "EA7 Emporio Armani Milan": "EA7", "Maccabi Playtika Tel Aviv": "MTA",
-    "Olympiacos Piraeus": "OLY", "Baskonia Vitoria-Gasteiz": "BKN",
-    "Crvena Zvezda Meridianbet Belgrade": "CZV", "Partizan Mozzart Bet Belgrade": "PAR",
-    "AS Monaco": "ASM", "LDLC ASVEL Villeurbanne": "ASV", "Anadolu Efes Istanbul": "EFS",
-    "Paris Basketball": "PBB", "Virtus Segafredo Bologna": "VIR", "Fenerbahce Beko Istanbul": "FBB"
-}
+# Columns a stored season needs to yield training rows
+required_columns = ['Player', 'Pos', 'Team', 'FPT', 'PLUS', 'avg_FPT', 'avg_PLUS', 'Home_Away', 'Upcoming_Opponent']
 
 # Helper functions
-def load_historical_data():
+@profile_stage()
+def load_historical_data(path=player_data_path, weeks=None):
+    """The weekly player files (only `weeks`, when given) as one table with a 'Week' column."""
     logging.info("Loading historical player data...")
-    player_files = glob(player_data_path)
+    player_files = {week_number(file): file for file in glob(path)}
     all_data = []
-    for file in player_files:
-        week = int(file.split('_')[-1].split('.')[0])
+    for week, file in sorted(player_files.items()):
+        if weeks is not None and week not in weeks:
+            continue
         df = pd.read_excel(file)
         df['Week'] = week
         all_data.append(df)
+    if not all_data:
+        raise FileNotFoundError(f"No weekly player files for weeks {weeks} at {path}.")
     return pd.concat(all_data, ignore_index=True)
 
-def load_defense_data():
-    logging.info("Loading defense data...")
-    defense_data = {}
-    for position in ['Guards', 'Forwards', 'Centers']:
-        df = pd.read_excel(defense_data_file.format(position))
-        df.rename(columns={'Team Name': 'Team'}, inplace=True)
-        df['Team'] = df['Team'].map(data_mapping)
-        defense_data[position] = df.set_index('Team')['Average'].to_dict()
-    return defense_data
-
-def map_defense_value(row, defense_data):
-    position_map = {'G': 'Guards', 'F': 'Forwards', 'C': 'Centers'}
-    position = position_map.get(row['Pos'], None)
-    if position and row['Upcoming_Opponent'] in defense_data[position]:
-        return defense_data[position][row['Upcoming_Opponent']]
-    return 0
-
-def preprocess_data(df, defense_data, predict=False, scaler=None):
+def feature_rows(df, defense_data):
+    """Rows with every model feature in place (parsed, defense looked up, form filled), before encoding and scaling."""
     df = df.dropna(subset=['PLUS', 'avg_PLUS', 'avg_FPT', 'Team', 'Home_Away', 'Upcoming_Opponent']).copy()
 
-    df.loc[:, 'PLUS'] = df['PLUS'].replace({'\+': '', '−': '-'}, regex=True).astype(float)
-    df.loc[:, 'avg_PLUS'] = df['avg_PLUS'].replace({'\+': '', '−': '-'}, regex=True).astype(float)
-    df.loc[:, 'Home_Away'] = df['Home_Away'].map({'home': 1, 'away': 0}).astype(int)
-    df.loc[:, 'Position_Defense_Avg'] = df.apply(lambda x: map_defense_value(x, defense_data), axis=1)
-
+    df['PLUS'] = parse_plus(df['PLUS'])
+    df['avg_PLUS'] = parse_plus(df['avg_PLUS'])
+    df['Home_Away'] = df['Home_Away'].map({'home': 1, 'away': 0}).astype(int)
+    df['Position_Defense_Avg'] = lookup_defense(df['Pos'], df['Upcoming_Opponent'], build_defense_lookup(defense_data))
+    return fill_form(df)
+
+@profile_stage()
+def season_training_rows(partition):
+    """Compact training rows of one stored season: float32 features, target and week, plus the encoded columns.
+
+    Defense tables and form are derived from that season alone, and only
+    these columns are kept, so several seasons never sit in memory as full
+    tables at once.
+    """
+    history = load_season(partition, columns=required_columns)
+    missing = [col for col in required_columns if col not in history.columns]
+    if missing:
+        logging.warning(f"Skipping {partition}: stored weeks lack {missing}.")
+        return None
+    history['FPT'] = pd.to_numeric(history['FPT'], errors='coerce')
+    history = history.dropna(subset=['FPT']).drop_duplicates(form_keys + ['Week'])
+    defense_data = defense_data_from_tables(season_defense_tables(history))
+    rows = feature_rows(join_form(history, rolling_form(played_rows(history)), include_current=False), defense_data)
+    compact = rows[features + ['FPT', 'Week']].astype('float32')
+    compact[['Team', 'Upcoming_Opponent']] = rows[['Team', 'Upcoming_Opponent']].to_numpy()
+    compact['Season'] = str(partition)
+    compact['Season_Id'] = partition.season_id
+    logging.info(f"{partition}: {len(compact)} training rows")
+    return compact
+
+def load_training_seasons(partitions):
+    frames = [rows for rows in map(season_training_rows, partitions) if rows is not None]
+    if not frames:
+        raise ValueError("None of the requested seasons has training rows.")
+    return pd.concat(frames, ignore_index=True)
+
+def encode_and_scale(df, predict=False, scaler=None):
     label_encoders = {}
     for col in ['Team', 'Upcoming_Opponent']:
         le = LabelEncoder()
         df.loc[:, col] = le.fit_transform(df[col])
         label_encoders[col] = le
 
-    scaled_features = ['avg_FPT', 'avg_PLUS', 'Position_Defense_Avg']
     if not predict:
         scaler = StandardScaler()
         df.loc[:, scaled_features] = scaler.fit_transform(df[scaled_features])
@@ -89,42 +107,76 @@ def preprocess_data(df, defense_data, predict=False, scaler=None):
 
     return df, label_encoders, scaler
 
-# Load data
-historical_data = load_historical_data()
-defense_data = load_defense_data()
-
-train_data = historical_data[historical_data['Week'] < latest_week]
-logging.info("Preprocessing training data...")
-train_data, label_encoders, scaler = preprocess_data(train_data, defense_data)
-
-features = ['avg_FPT', 'avg_PLUS', 'Position_Defense_Avg', 'Home_Away']
-target = 'FPT'
-
-X_train, y_train = train_data[features], train_data[target]
-
-if os.path.exists(model_file):
-    logging.info("Loading saved model...")
-    model = joblib.load(model_file)
-else:
-    logging.info("Training the prediction model...")
-    model = GradientBoostingRegressor(n_estimators=500, learning_rate=0.01, max_depth=5, random_state=42)
-    model.fit(X_train, y_train)
-    joblib.dump(model, model_file)
-
-# Prepare data for predictions
-latest_week_data = historical_data[historical_data['Week'] == latest_week]
-
-logging.info("Preparing data for predictions...")
-latest_week_data, _, scaler = preprocess_data(latest_week_data, defense_data, predict=True, scaler=scaler)
-
-X_pred = latest_week_data[features]
-
-# Predict
-logging.info("Predicting for upcoming week...")
-latest_week_data['Predicted_FPT'] = model.predict(X_pred)
-
-logging.info(f"Saving predictions to {output_file}...")
-latest_week_data.to_excel(output_file, index=False)
-
-comparison = latest_week_data[['Player', 'Reference_FPT', 'Predicted_FPT']]
-print(comparison.head())
+@profile_stage()
+def preprocess_data(df, defense_data, predict=False, scaler=None):
+    return encode_and_scale(feature_rows(df, defense_data), predict, scaler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the FPT model and predict the upcoming week.")
+    parser.add_argument('--tune', action='store_true', help="Run time-series CV hyperparameter search before training")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid', help="Search strategy used with --tune")
+    parser.add_argument('--retrain', action='store_true', help="Retrain even when a saved model exists")
+    parser.add_argument('--seasons', nargs='+', metavar='COMPETITION:SEASON',
+                        help="Train on these stored seasons (see euroleague_fetch.py --backfill) instead of the weekly files")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_profiling(args)
+
+    # Load data; with --seasons the training rows come from the stored seasons, so only the week predicted from is read
+    historical_data = load_historical_data(weeks=[latest_week] if args.seasons else None)
+    defense_data = load_defense_data()
+    form = load_form_features()
+
+    logging.info("Preprocessing training data...")
+    if args.seasons:
+        train_data, label_encoders, scaler = encode_and_scale(load_training_seasons([parse_partition(text) for text in args.seasons]))
+    else:
+        # Training rows only see form from before the week whose FPT they target
+        train_data = join_form(historical_data[historical_data['Week'] < latest_week], form, include_current=False)
+        train_data, label_encoders, scaler = preprocess_data(train_data, defense_data)
+    joblib.dump(label_encoders, encoders_file)
+
+    target = 'FPT'
+
+    X_train, y_train = train_data[features], train_data[target]
+
+    if args.tune:
+        logging.info(f"Tuning model hyperparameters ({args.search} search)...")
+        # Rows from several seasons are folded by (season, week), so no fold trains on a later season
+        seasons = train_data['Season_Id'] if 'Season_Id' in train_data.columns else None
+        best_params, cv_rmse = tune_model(X_train, y_train, train_data['Week'], search=args.search, seasons=seasons)
+        save_model_params(best_params, cv_rmse, args.search)
+
+    model = None
+    if os.path.exists(model_file) and not args.tune and not args.retrain:
+        logging.info("Loading saved model...")
+        model = joblib.load(model_file)
+        if list(getattr(model, 'feature_names_in_', [])) != features:
+            logging.info("Saved model was trained on other features; retraining.")
+            model = None
+    if model is None:
+        logging.info("Training the prediction model...")
+        model = GradientBoostingRegressor(**load_model_params())
+        with profile_stage('model_fit') as stage:
+            model.fit(X_train, y_train)
+            stage.rows = len(X_train)
+        joblib.dump(model, model_file)
+
+    # Prepare data for predictions
+    latest_week_data = join_form(historical_data[historical_data['Week'] == latest_week], form, include_current=True)
+    latest_week_data = latest_week_data.dropna(subset=['PLUS', 'avg_PLUS', 'avg_FPT', 'Team', 'Home_Away', 'Upcoming_Opponent']).copy()
+    latest_week_data.rename(columns={'FPT': 'Reference_FPT'}, inplace=True)
+
+    # Predict
+    logging.info("Predicting for upcoming week...")
+    predictor = FPTPredictor(model, scaler, defense_data, label_encoders=label_encoders)
+    latest_week_data['Predicted_FPT'] = predictor.predict(latest_week_data)
+
+    logging.info(f"Saving predictions to {output_file}...")
+    latest_week_data.to_excel(output_file, index=False)
+
+    comparison = latest_week_data[['Player', 'Reference_FPT', 'Predicted_FPT']]
+    print(comparison.head())
+
+if __name__ == "__main__":
+    main()
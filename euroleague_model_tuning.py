@@ -0,0 +1,104 @@
+import logging
+import math
+from itertools import product
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingRegressor
+
+from euroleague_profiling import profile_stage
+
+# Search space for the FPT model
+param_grid = {
+    'n_estimators': [200, 500, 1000],
+    'learning_rate': [0.005, 0.01, 0.05],
+    'max_depth': [3, 4, 5],
+    'subsample': [0.8, 1.0],
+}
+
+# Time-series cross-validation settings
+min_train_weeks = 3
+halving_factor = 3
+
+def chronological_periods(weeks, seasons=None):
+    """Rank of each row's (season, week) in time, so week 1 of a later season comes after every earlier week."""
+    if seasons is None:
+        return np.asarray(weeks)
+    keys = np.rec.fromarrays([np.asarray(seasons), np.asarray(weeks)], names=['season', 'week'])
+    return np.unique(keys, return_inverse=True)[1]
+
+def week_folds(weeks, min_train_weeks=min_train_weeks, seasons=None):
+    """Expanding-window folds: train on all weeks before w, validate on week w.
+
+    With `seasons` the weeks of several seasons are ordered by (season, week).
+    """
+    weeks = chronological_periods(weeks, seasons)
+    unique_weeks = np.sort(np.unique(weeks))
+    folds = []
+    for week in unique_weeks[min_train_weeks:]:
+        folds.append((np.flatnonzero(weeks < week), np.flatnonzero(weeks == week)))
+    if not folds:
+        raise ValueError(f"Need more than {min_train_weeks} weeks of data for time-series cross-validation.")
+    return folds
+
+def cache_folds(X, y, folds):
+    """Materializes each fold's train/validation matrices once so every candidate reuses them."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    return [(X[train_idx], y[train_idx], X[test_idx], y[test_idx]) for train_idx, test_idx in folds]
+
+def expand_grid(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in product(*(grid[key] for key in keys))]
+
+def _fold_rmse(params, fold):
+    X_train, y_train, X_test, y_test = fold
+    model = GradientBoostingRegressor(**{'random_state': 42, **params})
+    model.fit(X_train, y_train)
+    return math.sqrt(np.mean((model.predict(X_test) - y_test) ** 2))
+
+def evaluate_candidates(candidates, fold_cache, n_jobs=-1):
+    """Scores every (candidate, fold) pair in parallel and returns the mean RMSE per candidate."""
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_fold_rmse)(params, fold) for params in candidates for fold in fold_cache
+    )
+    scores = np.asarray(scores).reshape(len(candidates), len(fold_cache))
+    return scores.mean(axis=1)
+
+def grid_search(fold_cache, grid=param_grid, n_jobs=-1):
+    candidates = expand_grid(grid)
+    logging.info(f"Grid search over {len(candidates)} candidates x {len(fold_cache)} folds...")
+    scores = evaluate_candidates(candidates, fold_cache, n_jobs)
+    best = int(np.argmin(scores))
+    return candidates[best], float(scores[best])
+
+def successive_halving(fold_cache, grid=param_grid, factor=halving_factor, n_jobs=-1):
+    """Successive halving with n_estimators as the resource.
+
+    Every round trains the surviving candidates with a larger share of their
+    n_estimators and keeps the best 1/factor of them.
+    """
+    candidates = expand_grid(grid)
+    n_rounds = max(1, math.ceil(math.log(len(candidates), factor)))
+    for round_number in range(n_rounds):
+        budget = factor ** (round_number - n_rounds + 1)
+        scaled = [{**params, 'n_estimators': max(10, int(params['n_estimators'] * budget))} for params in candidates]
+        logging.info(f"Halving round {round_number + 1}/{n_rounds}: {len(candidates)} candidates at {budget:.0%} of n_estimators")
+        scores = evaluate_candidates(scaled, fold_cache, n_jobs)
+        order = np.argsort(scores)
+        if round_number == n_rounds - 1 or len(candidates) <= 1:
+            return candidates[order[0]], float(scores[order[0]])
+        keep = max(1, len(candidates) // factor)
+        candidates = [candidates[i] for i in order[:keep]]
+
+@profile_stage()
+def tune_model(X, y, weeks, search='grid', grid=param_grid, n_jobs=-1, seasons=None):
+    """Runs time-series cross-validation over the grid and returns (best_params, cv_rmse)."""
+    fold_cache = cache_folds(X, y, week_folds(weeks, seasons=seasons))
+    if search == 'grid':
+        best_params, best_score = grid_search(fold_cache, grid, n_jobs)
+    elif search == 'halving':
+        best_params, best_score = successive_halving(fold_cache, grid, n_jobs=n_jobs)
+    else:
+        raise ValueError(f"Unknown search mode: {search}")
+    logging.info(f"Best parameters: {best_params} (CV RMSE={best_score:.3f})")
+    return best_params, best_score
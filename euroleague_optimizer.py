@@ -0,0 +1,963 @@
+import logging
+import heapq
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+from euroleague_profiling import profile_stage
+
+# Constraints
+positions_needed = {'C': 2, 'F': 4, 'G': 4, 'HC': 1}
+max_players_per_team = 11
+
+# The lineup is split into two halves that are enumerated separately and
+# joined on credits (meet in the middle)
+position_halves = (('C', 'F'), ('G', 'HC'))
+
+def objective_values(pool, objective):
+    """Objective per row: a column name or a vectorized callable taking the pool DataFrame."""
+    values = objective(pool) if callable(objective) else pool[objective]
+    return pd.to_numeric(pd.Series(values, index=pool.index), errors='coerce')
+
+def to_tenths(values):
+    """Credits are quoted with one decimal, so they are handled as exact integer tenths."""
+    return np.rint(np.asarray(values, dtype=float) * 10).astype(np.int64)
+
+def dominance_mask(pool, objective, positions_needed=positions_needed, max_players_per_team=max_players_per_team, k=1):
+    """Rows that can still appear in one of the k best lineups.
+
+    A player is dropped when at least slots + k - 1 others at the same
+    position cost no more and score no less (ties broken by row order, so
+    equal players never remove each other): any lineup using them can swap in
+    an unused dominator without losing value or credits. For the per-team cap,
+    dominators from the teams that could already be full in such a lineup
+    (the largest per-team counts other than the player's own team) are not
+    counted, so the pruned pool provably keeps the top-k lineup values.
+    """
+    pool = pool.reset_index(drop=True)
+    value = objective_values(pool, objective).fillna(-np.inf).to_numpy(dtype=float)
+    cr = to_tenths(pool['CR'])
+    teams = pd.factorize(pool['Team'])[0]
+    positions = pool['Pos'].to_numpy()
+    # Teams that can hold max_players_per_team of the other lineup members
+    full_teams = (sum(positions_needed.values()) - 1) // max_players_per_team
+
+    keep = np.ones(len(pool), dtype=bool)
+    for pos, slots in positions_needed.items():
+        rows = np.flatnonzero(positions == pos)
+        v, c, order = value[rows], cr[rows], np.arange(len(rows))
+        # dominates[i, j]: row j dominates row i
+        dominates = (c[None, :] <= c[:, None]) & (v[None, :] >= v[:, None]) & (
+            (c[None, :] < c[:, None]) | (v[None, :] > v[:, None]) | (order[None, :] < order[:, None]))
+        count = dominates.sum(axis=1)
+        if full_teams:
+            team_codes = teams[rows]
+            per_team = dominates.astype(np.int32) @ np.eye(teams.max() + 1, dtype=np.int32)[team_codes]
+            per_team[order, team_codes] = 0
+            count = count - np.sort(per_team, axis=1)[:, ::-1][:, :full_teams].sum(axis=1)
+        keep[rows] = count < slots + k - 1
+    return keep
+
+class CombinationTable:
+    """All ways to fill a group of slots: member rows, credit cost (tenths), objective value
+    and, for transfer searches, the number of swaps versus the current roster."""
+
+    def __init__(self, members, cr, value, swaps=None):
+        self.members = members
+        self.cr = cr
+        self.value = value
+        self.swaps = np.zeros(len(cr), dtype=np.int8) if swaps is None else swaps
+
+    def __len__(self):
+        return len(self.cr)
+
+    @classmethod
+    def empty(cls, slots):
+        return cls(np.empty((0, slots), dtype=np.int32), np.empty(0, dtype=np.int64), np.empty(0))
+
+    @classmethod
+    def for_position(cls, rows, slots, cr, value):
+        rows = np.asarray(rows, dtype=np.int32)
+        if len(rows) < slots:
+            return cls.empty(slots)
+        combos = np.array(list(combinations(range(len(rows)), slots)), dtype=np.int32).reshape(-1, slots) if slots else np.empty((1, 0), dtype=np.int32)
+        members = rows[combos]
+        return cls(members, cr[members].sum(axis=1), value[members].sum(axis=1))
+
+    @classmethod
+    def concat(cls, tables, slots):
+        tables = [table for table in tables if len(table)]
+        if not tables:
+            return cls.empty(slots)
+        return cls(np.vstack([table.members for table in tables]), np.concatenate([table.cr for table in tables]),
+                   np.concatenate([table.value for table in tables]), np.concatenate([table.swaps for table in tables]))
+
+    def join(self, other):
+        """Cartesian product of two tables."""
+        a, b = np.divmod(np.arange(len(self) * len(other)), len(other))
+        members = np.hstack([self.members[a], other.members[b]])
+        return CombinationTable(members, self.cr[a] + other.cr[b], self.value[a] + other.value[b],
+                                self.swaps[a] + other.swaps[b])
+
+    def take(self, order):
+        return CombinationTable(self.members[order], self.cr[order], self.value[order], self.swaps[order])
+
+    def rows_without(self, banned):
+        """Mask of combinations that use none of the banned player rows."""
+        if not banned.any():
+            return np.ones(len(self), dtype=bool)
+        return ~banned[self.members].any(axis=1)
+
+class TableCache:
+    """Combination tables shared between searches over the same pool, possibly on several threads.
+
+    Each key has its own lock, so a table is built once, by the first search
+    that needs it, while different tables are still built in parallel.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self.tables:
+                self.tables[key] = build()
+            return self.tables[key]
+
+class LineupSearch:
+    """Exact top-K lineup search over a player pool.
+
+    `objective` is a column name or a vectorized callable (pool -> values);
+    callables are materialized once into an 'Objective' column. Each entry
+    of `constraints` is a callable (search, members) -> bool checked on
+    candidate lineups alongside the per-team cap.
+
+    Per-position combination tables are joined into two halves; the right
+    half is sorted by credits with a running best value so the best feasible
+    completion of any left half is a binary search. Left halves are visited
+    in order of that bound, and the search stops as soon as no remaining
+    left half can beat the K-th best lineup found so far.
+    """
+
+    def __init__(self, pool, objective, credit_limit, positions_needed=positions_needed,
+                 max_players_per_team=max_players_per_team, eligible=None, table_cache=None, constraints=()):
+        self.pool = pool.reset_index(drop=True)
+        if callable(objective):
+            self.pool['Objective'] = objective_values(self.pool, objective)
+            objective = 'Objective'
+        self.objective = objective
+        self.constraints = list(constraints)
+        self.credit_limit = credit_limit
+        self.positions_needed = positions_needed
+        self.max_players_per_team = max_players_per_team
+        # Optional row mask over the pool, and a TableCache shared between searches over the
+        # same pool and objective so identical position/half tables are built only once
+        self.eligible = None if eligible is None else np.asarray(eligible, dtype=bool)
+        self.table_cache = table_cache
+        self.value = objective_values(self.pool, objective).fillna(-np.inf).to_numpy(dtype=float)
+        self.cr = to_tenths(self.pool['CR'])
+        self.team_codes = pd.factorize(self.pool['Team'])[0]
+        positions = self.pool['Pos'].to_numpy()
+        self.position_index = {pos: np.flatnonzero(positions == pos).astype(np.int32) for pos in positions_needed}
+        self.left, self.right = self._build_halves()
+        self._sort_right()
+
+    def position_rows(self, pos):
+        rows = self.position_index[pos]
+        return rows if self.eligible is None else rows[self.eligible[rows]]
+
+    def _cached(self, key, build):
+        return build() if self.table_cache is None else self.table_cache.get(key, build)
+
+    def _build_halves(self):
+        keys = {pos: (pos, slots, tuple(self.position_rows(pos))) for pos, slots in self.positions_needed.items()}
+        self.position_tables = {
+            pos: self._cached(key, lambda key=key: CombinationTable.for_position(np.array(key[2], dtype=np.int32), key[1], self.cr, self.value))
+            for pos, key in keys.items()
+        }
+        return tuple(self._cached(tuple(keys[pos] for pos in half), lambda half=half: self._join_half(half)) for half in position_halves)
+
+    def _join_half(self, half):
+        table = None
+        for pos in half:
+            table = self.position_tables[pos] if table is None else table.join(self.position_tables[pos])
+        return table
+
+    def _sort_right(self):
+        self.right = self.right.take(np.argsort(self.right.cr, kind='stable'))
+        self.right_best = np.maximum.accumulate(self.right.value) if len(self.right) else self.right.value
+
+    def team_cap_ok(self, members):
+        return np.bincount(self.team_codes[members]).max() <= self.max_players_per_team
+
+    def is_valid(self, members):
+        return self.team_cap_ok(members) and all(constraint(self, members) for constraint in self.constraints)
+
+    def lineup(self, members):
+        """Lineup as a list of pool rows (namedtuples), in C, F, G, HC order."""
+        return list(self.pool.iloc[members].itertuples(index=False))
+
+    def bounds(self, budget):
+        """Best achievable value for every left half, ignoring all but the credit constraint."""
+        room = budget - self.left.cr
+        cut = np.searchsorted(self.right.cr, room, side='right')
+        bound = np.full(len(self.left), -np.inf)
+        has_room = cut > 0
+        bound[has_room] = self.left.value[has_room] + self.right_best[cut[has_room] - 1]
+        return bound, cut
+
+    def top_k(self, k=1, budget=None, left_mask=None, right_mask=None, pair_mask=None):
+        """Returns up to k (value, members) pairs, best first.
+
+        `left_mask`/`right_mask` exclude half-lineups outright; `pair_mask`
+        maps a left row to an extra mask over right rows (e.g. overlap limits).
+        """
+        budget = to_tenths(self.credit_limit if budget is None else budget).item()
+        bound, cut = self.bounds(budget)
+        if left_mask is not None:
+            bound[~left_mask] = -np.inf
+        order = np.argsort(-bound, kind='stable')
+        best = []
+        for left_row in order:
+            if bound[left_row] == -np.inf:
+                break
+            if len(best) == k and bound[left_row] <= best[0][0]:
+                break
+            values = self.left.value[left_row] + self.right.value[:cut[left_row]]
+            feasible = np.isfinite(values)
+            if right_mask is not None:
+                feasible &= right_mask[:cut[left_row]]
+            if pair_mask is not None:
+                feasible &= pair_mask(left_row)[:cut[left_row]]
+            if len(best) == k:
+                feasible &= values > best[0][0]
+            candidates = np.flatnonzero(feasible)
+            for right_row in candidates[np.argsort(-values[candidates], kind='stable')]:
+                value = values[right_row]
+                if len(best) == k and value <= best[0][0]:
+                    break
+                members = np.concatenate([self.left.members[left_row], self.right.members[right_row]])
+                if not self.is_valid(members):
+                    continue
+                entry = (value, int(left_row), int(right_row), members)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heappushpop(best, entry)
+        return [(value, members) for value, _, _, members in sorted(best, key=lambda entry: entry[:3], reverse=True)]
+
+def player_key(entry):
+    """(Player, Team or None) of a roster or delta entry: a bare name or a (Player, Team) pair."""
+    if isinstance(entry, (tuple, list)):
+        return entry[0], entry[1]
+    return entry, None
+
+def delta_player(delta):
+    """The player a delta dict names: 'Player', paired with 'Team' when given."""
+    return (delta['Player'], delta['Team']) if delta.get('Team') is not None else delta['Player']
+
+def player_rows(pool, entries):
+    """Pool row of every entry; each must match exactly one row, so a shared name needs its team."""
+    names, teams = pool['Player'].to_numpy(), pool['Team'].to_numpy()
+    rows = []
+    for entry in entries:
+        player, team = player_key(entry)
+        found = np.flatnonzero((names == player) & ((teams == team) if team is not None else True))
+        if len(found) != 1:
+            detail = "is not in the pool" if not len(found) else f"matches {len(found)} rows; give (Player, Team)"
+            raise ValueError(f"Player {entry!r} {detail}.")
+        rows.append(int(found[0]))
+    return np.array(rows, dtype=np.int64)
+
+class TransferSearch(LineupSearch):
+    """Best lineups reachable from the current roster within `max_transfers` swaps.
+
+    For every position only the variants of the current group with up to
+    max_transfers swaps are enumerated, and halves are only joined when their
+    combined swap count stays within the limit, so the searched space is the
+    transfer neighborhood rather than every possible lineup. Credits are the
+    current prices in 'CR' (which already carry each player's PLUS movement).
+    Roster entries are names, or (Player, Team) pairs where a name is shared.
+    """
+
+    def __init__(self, pool, roster_names, max_transfers, objective, credit_limit, positions_needed=positions_needed,
+                 max_players_per_team=max_players_per_team, constraints=()):
+        self.roster_names = list(roster_names)
+        self.max_transfers = max_transfers
+        self.roster_rows = player_rows(pool.reset_index(drop=True), self.roster_names)
+        super().__init__(pool, objective, credit_limit, positions_needed, max_players_per_team, constraints=constraints)
+
+    def _position_variants(self, pos, slots):
+        """Per swap count s, every way to replace s of the current players at `pos`."""
+        rows = self.position_rows(pos)
+        in_roster = np.isin(rows, self.roster_rows)
+        current, candidates = rows[in_roster], rows[~in_roster]
+        if len(current) != slots:
+            raise ValueError(f"Current roster has {len(current)} players at {pos}, expected {slots}.")
+        variants = {}
+        for swaps in range(min(self.max_transfers, slots) + 1):
+            ins = CombinationTable.for_position(candidates, swaps, self.cr, self.value)
+            tables = []
+            for outs in combinations(range(slots), swaps):
+                keep = np.delete(current, list(outs))
+                members = np.hstack([np.broadcast_to(keep, (len(ins), len(keep))), ins.members]).astype(np.int32)
+                tables.append(CombinationTable(members, ins.cr + self.cr[keep].sum(), ins.value + self.value[keep].sum(),
+                                               np.full(len(ins), swaps, dtype=np.int8)))
+            variants[swaps] = CombinationTable.concat(tables, slots)
+        return variants
+
+    def _build_halves(self):
+        variants = {pos: self._position_variants(pos, slots) for pos, slots in self.positions_needed.items()}
+        halves = []
+        for first, second in position_halves:
+            tables = [
+                variants[first][s_first].join(variants[second][s_second])
+                for s_first in variants[first] for s_second in variants[second]
+                if s_first + s_second <= self.max_transfers
+            ]
+            halves.append(CombinationTable.concat(tables, self.positions_needed[first] + self.positions_needed[second]))
+        return tuple(halves)
+
+    def top_k(self, k=1, budget=None, left_mask=None, right_mask=None, pair_mask=None):
+        def swap_mask(left_row):
+            mask = self.right.swaps <= self.max_transfers - self.left.swaps[left_row]
+            return mask if pair_mask is None else mask & pair_mask(left_row)
+        return super().top_k(k, budget, left_mask, right_mask, swap_mask)
+
+class OptimizerSession(LineupSearch):
+    """Long-lived search that keeps its tables in memory and absorbs player deltas.
+
+    A change to one player's objective value or CR is applied in place to the
+    half-lineup rows containing that player (re-sorting the right half only
+    when its credits change); removed players are masked out. The cached
+    top-K is only recomputed when a delta can actually change it. Players
+    are named as in a roster: a name, or (Player, Team) where it is shared.
+    With `eligible` only those rows enter the tables, and covers() tells
+    whether they still hold every player a changed pool may need.
+    """
+
+    def __init__(self, pool, objective, credit_limit, k=1, positions_needed=positions_needed,
+                 max_players_per_team=max_players_per_team, constraints=(), eligible=None):
+        super().__init__(pool, objective, credit_limit, positions_needed, max_players_per_team, eligible=eligible,
+                         constraints=constraints)
+        self.k = k
+        self.removed = np.zeros(len(self.pool), dtype=bool)
+        self._results = None
+
+    def _row(self, player):
+        try:
+            return int(player_rows(self.pool, [player])[0])
+        except ValueError as error:
+            raise KeyError(str(error))
+
+    def covers(self, rows):
+        """Whether every pool row an answer may need (e.g. those dominance_mask keeps after the deltas) is in the tables."""
+        return self.eligible is None or bool(self.eligible[np.asarray(rows, dtype=np.int64)].all())
+
+    def _in_results(self, row):
+        return self._results is not None and any(row in members for _, members in self._results)
+
+    def update_player(self, player, value=None, cr=None):
+        """Sets a new objective value and/or CR for one player."""
+        self._update_row(self._row(player), value, cr)
+
+    def _update_row(self, row, value=None, cr=None):
+        value_delta = 0.0 if value is None else value - self.value[row]
+        cr_delta = 0 if cr is None else to_tenths(cr).item() - self.cr[row]
+        if value_delta == 0 and cr_delta == 0:
+            return
+        self.value[row] += value_delta
+        self.cr[row] += cr_delta
+        self.pool.at[row, self.objective] = self.value[row]
+        self.pool.at[row, 'CR'] = self.cr[row] / 10
+
+        for table in (self.left, self.right):
+            rows = (table.members == row).any(axis=1)
+            table.value[rows] += value_delta
+            table.cr[rows] += cr_delta
+        if cr_delta and (self.right.members == row).any():
+            self._sort_right()
+        else:
+            self.right_best = np.maximum.accumulate(self.right.value) if len(self.right) else self.right.value
+
+        # A worse or pricier player who is in none of the kept lineups cannot change them
+        if value_delta <= 0 and cr_delta >= 0 and not self._in_results(row):
+            return
+        self._results = None
+
+    def remove_player(self, player):
+        row = self._row(player)
+        self.removed[row] = True
+        if self._in_results(row):
+            self._results = None
+
+    def apply(self, deltas):
+        """Applies a batch of deltas: dicts with 'Player' (and 'Team' for a shared name) and any of objective/'CR'/'removed'."""
+        for delta in deltas:
+            player = delta_player(delta)
+            if delta.get('removed'):
+                self.remove_player(player)
+            else:
+                self.update_player(player, delta.get(self.objective), delta.get('CR'))
+        return self.results()
+
+    def scenario(self, deltas):
+        """(value, members) of the top-K with the deltas applied, leaving the session as it was.
+
+        Lets one warm session answer independent what-if queries: the touched
+        players' values, credits and removal flags are put back afterwards,
+        along with the top-K they had.
+        """
+        rows = [self._row(delta_player(delta)) for delta in deltas]
+        saved = [(row, self.value[row], self.cr[row] / 10, self.removed[row]) for row in rows]
+        results = self._results
+        try:
+            self.apply(deltas)
+            return list(self._results)
+        finally:
+            for row, value, cr, removed in reversed(saved):
+                self._update_row(row, value, cr)
+                self.removed[row] = removed
+            self._results = results
+
+    def results(self):
+        """Current top-K lineups, recomputed only after a delta invalidated them."""
+        if self._results is None:
+            left_mask = right_mask = None
+            if self.removed.any():
+                left_mask = self.left.rows_without(self.removed)
+                right_mask = self.right.rows_without(self.removed)
+            self._results = self.top_k(self.k, left_mask=left_mask, right_mask=right_mask)
+        return [self.lineup(members) for _, members in self._results]
+
+def pareto_frontier(search, min_credits=0, max_credits=None):
+    """Best lineup for every budget from min_credits to max_credits, as Pareto breakpoints.
+
+    Returns (value, credits in tenths, members) triples, cheapest first; each
+    lineup is optimal for every budget from its own credits up to the next
+    breakpoint. Budgets are whole tenths, so for the halves a max-plus
+    convolution of "best left half at exactly c" with "best right half at or
+    below b" gives the uncapped optimum of every budget at once. Walking down
+    from the top budget, each breakpoint lineup is rebuilt from that table
+    and only re-solved exactly when it breaks the team cap or a custom
+    constraint.
+    """
+    max_budget = to_tenths(search.credit_limit if max_credits is None else max_credits).item()
+    min_budget = to_tenths(min_credits).item()
+    left, right = search.left, search.right
+    usable = np.flatnonzero((left.cr <= max_budget) & np.isfinite(left.value))
+    if not len(usable) or not len(right):
+        return []
+
+    # Best left row for each exact cost
+    usable = usable[np.lexsort((-left.value[usable], left.cr[usable]))]
+    left_costs, first = np.unique(left.cr[usable], return_index=True)
+    left_rows = usable[first]
+
+    # Best right row within each budget 0..max_budget (right is sorted by cost)
+    budgets = np.arange(max_budget + 1)
+    cut = np.searchsorted(right.cr, budgets, side='right')
+    running_row = np.maximum.accumulate(np.where(right.value == search.right_best, np.arange(len(right)), 0))
+    right_value = np.where(cut > 0, search.right_best[np.maximum(cut - 1, 0)], -np.inf)
+    right_rows = running_row[np.maximum(cut - 1, 0)]
+
+    # totals[i, b]: best lineup of budget b whose left half costs exactly left_costs[i]
+    rest = budgets[None, :] - left_costs[:, None]
+    totals = np.where(rest >= 0, left.value[left_rows][:, None] + right_value[np.maximum(rest, 0)], -np.inf)
+    best_cost_index = totals.argmax(axis=0)
+    best_value = totals[best_cost_index, budgets]
+
+    frontier = []
+    budget = max_budget
+    while budget >= min_budget and np.isfinite(best_value[budget]):
+        i = best_cost_index[budget]
+        members = np.concatenate([left.members[left_rows[i]], right.members[right_rows[budget - left_costs[i]]]])
+        value = best_value[budget]
+        if not search.is_valid(members):
+            result = search.top_k(1, budget=budget / 10)
+            if not result:
+                break
+            value, members = result[0]
+        credits = int(search.cr[members].sum())
+        if frontier and frontier[-1][0] == value:
+            # Same value for fewer credits: the pricier lineup is not a breakpoint
+            frontier.pop()
+        frontier.append((value, credits, members))
+        budget = credits - 1
+    return frontier[::-1]
+
+def lineup_upper_bound(value, cr, positions, positions_needed, budget):
+    """Best lineup value within `budget` tenths ignoring the team cap, by DP over credits.
+
+    Per position, best[s][c] is the top value of s players costing exactly c;
+    positions are then combined by max-plus convolution. Exact when the team
+    cap does not bind, and an upper bound otherwise.
+    """
+    total = np.zeros(1)
+    for pos, slots in positions_needed.items():
+        best = np.full((slots + 1, budget + 1), -np.inf)
+        best[0, 0] = 0
+        for row in np.flatnonzero((positions == pos) & np.isfinite(value) & (cr <= budget)):
+            for s in range(slots, 0, -1):
+                shifted = best[s - 1, :budget + 1 - cr[row]] + value[row]
+                best[s, cr[row]:] = np.maximum(best[s, cr[row]:], shifted)
+        position_best = best[slots]
+        spent = np.arange(budget + 1)
+        rest = spent[None, :] - np.arange(len(total))[:, None]
+        total = np.where(rest >= 0, total[:, None] + position_best[np.maximum(rest, 0)], -np.inf).max(axis=0)
+    return total.max()
+
+class AnytimeSearch:
+    """Simulated-annealing lineup search for pools too large to enumerate.
+
+    Starts from a greedy lineup by objective/CR (keeping enough credits for
+    the cheapest fill of the open slots) and explores one- and two-player
+    swaps among the undominated players of each position. Every move is
+    scored from the running value, credits and per-team counts, so it costs
+    O(1) regardless of pool size. Moves that break the credit limit or team
+    cap are never taken, and custom constraints (called with this search in
+    place of a LineupSearch) are checked before a move is accepted.
+    """
+
+    def __init__(self, pool, objective, credit_limit, positions_needed=positions_needed,
+                 max_players_per_team=max_players_per_team, constraints=(), seed=None):
+        self.pool = pool.reset_index(drop=True)
+        if callable(objective):
+            self.pool['Objective'] = objective_values(self.pool, objective)
+            objective = 'Objective'
+        self.objective = objective
+        self.constraints = list(constraints)
+        self.budget = to_tenths(credit_limit).item()
+        self.positions_needed = positions_needed
+        self.max_players_per_team = max_players_per_team
+        self.value = objective_values(self.pool, objective).fillna(-np.inf).to_numpy(dtype=float)
+        self.cr = to_tenths(self.pool['CR'])
+        self.team_codes = pd.factorize(self.pool['Team'])[0]
+        positions = self.pool['Pos'].to_numpy()
+        usable = np.isfinite(self.value)
+        if not self.constraints:
+            # An optimal lineup exists among the undominated players, so moves only draw from them
+            usable &= dominance_mask(self.pool, objective, positions_needed, max_players_per_team)
+        self.candidates = {pos: np.flatnonzero((positions == pos) & usable).tolist() for pos in positions_needed}
+        self.rng = random.Random(seed)
+
+    def greedy(self):
+        """Lineup filled by descending objective/CR, skipping players that would leave too few credits."""
+        ratio = self.value / np.maximum(self.cr, 1)
+        chosen = {pos: [] for pos in self.positions_needed}
+        team_count = np.zeros(self.team_codes.max() + 1, dtype=int)
+        spent = 0
+        for row in np.argsort(-ratio, kind='stable'):
+            pos = self.pool['Pos'].iat[row]
+            if pos not in chosen or len(chosen[pos]) >= self.positions_needed[pos] or not np.isfinite(self.value[row]):
+                continue
+            if team_count[self.team_codes[row]] >= self.max_players_per_team:
+                continue
+            chosen[pos].append(row)
+            reserve = 0
+            for other, slots in self.positions_needed.items():
+                free = sorted(self.cr[r] for r in self.candidates[other] if r not in chosen[other])
+                reserve += sum(free[:slots - len(chosen[other])])
+            if spent + self.cr[row] + reserve > self.budget:
+                chosen[pos].pop()
+                continue
+            spent += self.cr[row]
+            team_count[self.team_codes[row]] += 1
+        if any(len(chosen[pos]) < slots for pos, slots in self.positions_needed.items()):
+            return None
+        return [row for pos in self.positions_needed for row in chosen[pos]]
+
+    def run(self, time_budget_ms, initial=None):
+        """Best (value, members) found within time_budget_ms, or None when no lineup fits.
+
+        The budget is split into annealing cycles (about one per 250 ms), each
+        restarting from the best lineup so far and cooling geometrically; the
+        result is finished with a single-swap hill climb, which stops at the
+        deadline too.
+        """
+        members = list(initial) if initial is not None else self.greedy()
+        if members is None:
+            return None
+        value, cr, team_codes = self.value.tolist(), self.cr.tolist(), self.team_codes.tolist()
+        slot_positions = [pos for pos, slots in self.positions_needed.items() for _ in range(slots)]
+        movable = [i for i, pos in enumerate(slot_positions) if len(self.candidates[pos]) > self.positions_needed[pos]]
+        best_value = sum(value[row] for row in members) if self.satisfies_rules(members) else -np.inf
+        best_members = list(members)
+
+        spread = float(np.std([value[row] for pos in self.candidates for row in self.candidates[pos]])) or 1.0
+        start_temperature, end_temperature = spread * 0.1, spread * 1e-3
+        cap, budget, rng = self.max_players_per_team, self.budget, self.rng
+        started = time.perf_counter()
+        deadline = started + time_budget_ms / 1000
+        cycles = max(1, int(time_budget_ms // 250))
+        iterations = 0
+        for cycle in range(cycles if movable else 0):
+            cycle_start = time.perf_counter()
+            cycle_end = started + (deadline - started) * (cycle + 1) / cycles
+            if best_value > -np.inf:
+                members = list(best_members)
+            in_lineup = set(members)
+            team_count = [0] * (max(team_codes) + 1)
+            for row in members:
+                team_count[team_codes[row]] += 1
+            total_value = sum(value[row] for row in members)
+            total_cr = sum(cr[row] for row in members)
+            temperature = start_temperature
+            while True:
+                iterations += 1
+                if iterations % 256 == 0:
+                    now = time.perf_counter()
+                    if now >= cycle_end:
+                        break
+                    progress = (now - cycle_start) / max(cycle_end - cycle_start, 1e-9)
+                    temperature = start_temperature * (end_temperature / start_temperature) ** progress
+
+                # One swap, or two swaps (any two slots) so credits can move between positions
+                slots = [rng.choice(movable)]
+                if rng.random() < 0.5:
+                    other = rng.choice(movable)
+                    if other != slots[0]:
+                        slots.append(other)
+                incoming = []
+                for i in slots:
+                    row = rng.choice(self.candidates[slot_positions[i]])
+                    if row in in_lineup or row in incoming:
+                        break
+                    incoming.append(row)
+                if len(incoming) != len(slots):
+                    continue
+
+                outgoing = [members[i] for i in slots]
+                delta_value = sum(value[row] for row in incoming) - sum(value[row] for row in outgoing)
+                delta_cr = sum(cr[row] for row in incoming) - sum(cr[row] for row in outgoing)
+                if total_cr + delta_cr > budget:
+                    continue
+                if delta_value < 0 and rng.random() >= math.exp(delta_value / temperature):
+                    continue
+                for row in outgoing:
+                    team_count[team_codes[row]] -= 1
+                for row in incoming:
+                    team_count[team_codes[row]] += 1
+                candidate = list(members)
+                for i, row in zip(slots, incoming):
+                    candidate[i] = row
+                if any(team_count[team_codes[row]] > cap for row in incoming) or not self.satisfies_rules(candidate):
+                    for row in incoming:
+                        team_count[team_codes[row]] -= 1
+                    for row in outgoing:
+                        team_count[team_codes[row]] += 1
+                    continue
+                members = candidate
+                in_lineup.difference_update(outgoing)
+                in_lineup.update(incoming)
+                total_value += delta_value
+                total_cr += delta_cr
+                if total_value > best_value + 1e-9:
+                    best_value, best_members = total_value, list(members)
+
+        if best_value == -np.inf:
+            logging.info(f"Anytime search: {iterations} moves in {time_budget_ms:.0f} ms found no lineup satisfying the constraints")
+            return None
+        best_value, best_members = self.polish(best_value, best_members, deadline)
+        logging.info(f"Anytime search: {iterations} moves in {time_budget_ms:.0f} ms, best {self.objective}={best_value:.2f}")
+        return best_value, np.array(best_members, dtype=np.int32)
+
+    def polish(self, best_value, members, deadline=None):
+        """Applies the best single swap until no swap improves the lineup or the deadline passes."""
+        team_count = np.bincount(self.team_codes[members], minlength=self.team_codes.max() + 1)
+        total_cr = self.cr[members].sum()
+        slot_positions = [pos for pos, slots in self.positions_needed.items() for _ in range(slots)]
+        while deadline is None or time.perf_counter() < deadline:
+            best_move = None
+            for i, pos in enumerate(slot_positions):
+                out = members[i]
+                rows = np.array([row for row in self.candidates[pos] if row not in members], dtype=np.int64)
+                if not len(rows):
+                    continue
+                gain = self.value[rows] - self.value[out]
+                fits = (total_cr + self.cr[rows] - self.cr[out] <= self.budget) & (
+                    (team_count[self.team_codes[rows]] < self.max_players_per_team) | (self.team_codes[rows] == self.team_codes[out]))
+                for j in np.argsort(-np.where(fits, gain, -np.inf)):
+                    if not fits[j] or gain[j] <= 1e-9 or (best_move and gain[j] <= best_move[0]):
+                        break
+                    candidate = list(members)
+                    candidate[i] = int(rows[j])
+                    if self.satisfies_rules(candidate):
+                        best_move = (gain[j], i, int(rows[j]))
+                        break
+            if best_move is None:
+                return best_value, members
+            gain, i, row = best_move
+            team_count[self.team_codes[members[i]]] -= 1
+            team_count[self.team_codes[row]] += 1
+            total_cr += self.cr[row] - self.cr[members[i]]
+            members = list(members)
+            members[i] = row
+            best_value += gain
+        return best_value, members
+
+    def satisfies_rules(self, members):
+        members = np.asarray(members, dtype=np.int32)
+        return all(constraint(self, members) for constraint in self.constraints)
+
+    def lineup(self, members):
+        return list(self.pool.iloc[members].itertuples(index=False))
+
+    def upper_bound(self):
+        return lineup_upper_bound(self.value, self.cr, self.pool['Pos'].to_numpy(), self.positions_needed, self.budget)
+
+def describe_transfers(roster_names, lineup):
+    """(players out, players in) needed to go from the roster (names or (Player, Team) pairs) to `lineup`, by name."""
+    keys = [player_key(entry) for entry in roster_names]
+
+    def matches(player, key):
+        return player.Player == key[0] and key[1] in (None, player.Team)
+    return ([name for name, team in keys if not any(matches(player, (name, team)) for player in lineup)],
+            [player.Player for player in lineup if not any(matches(player, key) for key in keys)])
+
+@dataclass(frozen=True)
+class Constraints:
+    """Lineup rules for optimize(). Frozen and hashable, so equal constraints can key a result cache.
+
+    `objective` is a column name or a vectorized callable; `rules` are extra
+    callables (search, members) -> bool. With `roster` (names of the current
+    11 players) only lineups within `max_transfers` swaps are returned; with
+    `portfolio` the lineups are diversified by `max_shared_players` and
+    `max_exposure` instead of being the K best. `prune_dominated` searches
+    only the players dominance_mask keeps; it is exact for plain top-K
+    searches and is skipped for transfer, portfolio and custom-rule searches.
+    With `time_budget_ms` the single best lineup is searched heuristically
+    (AnytimeSearch) within that time instead of exhaustively.
+    """
+    objective: object = 'Adjusted_FPT'
+    credit_limit: float = 100
+    max_lineups: int = 1
+    positions_needed: tuple = tuple(positions_needed.items())
+    max_players_per_team: int = max_players_per_team
+    rules: tuple = ()
+    roster: tuple = ()
+    max_transfers: int = None
+    portfolio: bool = False
+    max_shared_players: int = 7
+    max_exposure: float = 1.0
+    prune_dominated: bool = True
+    time_budget_ms: int = None
+
+    def __post_init__(self):
+        if isinstance(self.positions_needed, dict):
+            object.__setattr__(self, 'positions_needed', tuple(self.positions_needed.items()))
+        object.__setattr__(self, 'rules', tuple(self.rules))
+        object.__setattr__(self, 'roster', tuple(self.roster))
+        if self.roster and self.max_transfers is None:
+            raise ValueError("A roster needs max_transfers.")
+        if self.roster and self.portfolio:
+            raise ValueError("Transfer and portfolio searches cannot be combined.")
+        if self.time_budget_ms is not None and (self.roster or self.portfolio or self.max_lineups != 1):
+            raise ValueError("A time budget searches the single best plain lineup; drop roster, portfolio and max_lineups.")
+
+    @property
+    def slots(self):
+        return dict(self.positions_needed)
+
+@dataclass(frozen=True)
+class LineupResult:
+    """One optimized lineup: rank (1 = best), objective total, credits and the player rows in C, F, G, HC order."""
+    rank: int
+    objective: str
+    value: float
+    credits: float
+    players: tuple
+    transfers_out: tuple = ()
+    transfers_in: tuple = ()
+    bound: float = None
+
+    @property
+    def gap(self):
+        """Relative distance to the upper bound, when the search reported one."""
+        if self.bound is None or not self.bound:
+            return None
+        return max(0.0, (self.bound - self.value) / abs(self.bound))
+
+    @property
+    def names(self):
+        return [player.Player for player in self.players]
+
+    def to_frame(self):
+        return pd.DataFrame(list(self.players))
+
+@profile_stage()
+def optimize(players, constraints=Constraints()):
+    """Best lineups from a player table (Player, Pos, Team, CR and the objective) under `constraints`.
+
+    Re-entrant and thread-safe: each call builds its own search over a copy
+    of `players` and keeps no state between calls, so one warm process can
+    answer any number of concurrent queries.
+    """
+    if constraints.time_budget_ms is not None:
+        return anytime_lineup(players, constraints)
+    if constraints.roster:
+        search = TransferSearch(players, constraints.roster, constraints.max_transfers, constraints.objective,
+                                constraints.credit_limit, constraints.slots, constraints.max_players_per_team, constraints.rules)
+    else:
+        eligible = None
+        if constraints.prune_dominated and not constraints.portfolio and not constraints.rules:
+            eligible = dominance_mask(players, constraints.objective, constraints.slots, constraints.max_players_per_team,
+                                      constraints.max_lineups)
+            logging.info(f"Dominance pruning kept {eligible.sum()} of {len(eligible)} players.")
+        search = LineupSearch(players, constraints.objective, constraints.credit_limit, constraints.slots,
+                              constraints.max_players_per_team, eligible=eligible, constraints=constraints.rules)
+    if constraints.portfolio:
+        found = portfolio_members(search, constraints.max_lineups, constraints.max_shared_players, constraints.max_exposure)
+    else:
+        found = search.top_k(constraints.max_lineups)
+
+    return lineup_results(search, found, constraints.roster)
+
+def lineup_results(search, found, roster=()):
+    """Ranked LineupResults for the (value, members) pairs a search returned, with transfers from `roster`."""
+    results = []
+    for rank, (value, members) in enumerate(found, start=1):
+        lineup = search.lineup(members)
+        players_out, players_in = describe_transfers(roster, lineup) if roster else ([], [])
+        results.append(LineupResult(rank, search.objective, float(value), float(search.cr[members].sum()) / 10, tuple(lineup),
+                                    tuple(players_out), tuple(players_in)))
+    return results
+
+@profile_stage()
+def anytime_lineup(players, constraints=Constraints(time_budget_ms=500), seed=None):
+    """Best lineup AnytimeSearch finds within constraints.time_budget_ms, with the DP upper bound and gap.
+
+    The budget covers the whole call: setting up the search and computing
+    the bound come out of it, and the annealing gets what is left.
+    """
+    if constraints.roster or constraints.portfolio:
+        raise ValueError("The anytime search handles plain lineup searches only.")
+    started = time.perf_counter()
+    search = AnytimeSearch(players, constraints.objective, constraints.credit_limit, constraints.slots,
+                           constraints.max_players_per_team, constraints.rules, seed)
+    bound = float(search.upper_bound())
+    remaining_ms = max(0.0, constraints.time_budget_ms - (time.perf_counter() - started) * 1000)
+    found = search.run(remaining_ms)
+    if found is None:
+        logging.info("No lineup satisfies the constraints.")
+        return []
+    value, members = found
+    result = LineupResult(1, search.objective, float(value), float(search.cr[members].sum()) / 10,
+                          tuple(search.lineup(members)), bound=bound)
+    gap = f"gap {result.gap:.2%}" if result.gap is not None else "no relative gap"
+    logging.info(f"Anytime lineup {result.objective}={result.value:.2f}, upper bound {result.bound:.2f} ({gap})")
+    return [result]
+
+@profile_stage()
+def lineup_frontier(players, constraints=Constraints(), min_credits=0):
+    """Pareto frontier of lineup value against credits, up to constraints.credit_limit, cheapest first.
+
+    Each LineupResult is the best lineup for every budget from its credits up
+    to the next one's; ranks count from the cheapest breakpoint.
+    """
+    if constraints.roster or constraints.portfolio:
+        raise ValueError("The frontier is computed for plain lineup searches only.")
+    eligible = None
+    if constraints.prune_dominated and not constraints.rules:
+        eligible = dominance_mask(players, constraints.objective, constraints.slots, constraints.max_players_per_team)
+    search = LineupSearch(players, constraints.objective, constraints.credit_limit, constraints.slots,
+                          constraints.max_players_per_team, eligible=eligible, constraints=constraints.rules)
+    frontier = pareto_frontier(search, min_credits)
+    logging.info(f"Frontier from {min_credits} to {constraints.credit_limit} credits has {len(frontier)} breakpoints.")
+    return [LineupResult(rank, search.objective, float(value), credits / 10, tuple(search.lineup(members)))
+            for rank, (value, credits, members) in enumerate(frontier, start=1)]
+
+@profile_stage()
+def best_transfers(pool, roster, max_transfers, objective, credit_limit, k=1, positions_needed=positions_needed,
+                   max_players_per_team=max_players_per_team, constraints=()):
+    """Top-k lineups reachable from `roster` (rows of the current 11 players) within max_transfers swaps."""
+    in_pool = pd.MultiIndex.from_frame(roster[['Player', 'Team']]).isin(pd.MultiIndex.from_frame(pool[['Player', 'Team']]))
+    pool = pd.concat([pool, roster[~in_pool]], ignore_index=True)
+    results = optimize(pool, Constraints(objective, credit_limit, k, positions_needed, max_players_per_team, constraints,
+                                         tuple(zip(roster['Player'], roster['Team'])), max_transfers))
+    current_value = objective_values(roster, objective).sum()
+    for result in results:
+        logging.info(f"Transfers out={list(result.transfers_out)} in={list(result.transfers_in)}: "
+                     f"{result.objective}={result.value:.2f} ({result.value - current_value:+.2f})")
+    return [list(result.players) for result in results]
+
+def build_pool(centers, forwards, guards, head_coaches):
+    return pd.concat([centers, forwards, guards, head_coaches], ignore_index=True)
+
+@profile_stage()
+def create_optimal_fantasy_team(centers, forwards, guards, head_coaches, objective, credit_limit, max_unique_teams=1,
+                                positions_needed=positions_needed, max_players_per_team=max_players_per_team,
+                                constraints=(), roster=None, max_transfers=None, time_budget_ms=None):
+    """Best `max_unique_teams` lineups by `objective`, best first, as lists of player rows.
+
+    With `roster` (the current 11 player rows) only lineups within
+    `max_transfers` swaps of it are considered. With `time_budget_ms` the
+    single best lineup is searched heuristically within that many ms.
+    """
+    pool = build_pool(centers, forwards, guards, head_coaches)
+    if roster is not None:
+        logging.info(f"Searching lineups within {max_transfers} transfers of the current roster...")
+        return best_transfers(pool, roster, max_transfers, objective, credit_limit, max_unique_teams,
+                              positions_needed, max_players_per_team, constraints)
+    logging.info("Starting team selection...")
+    results = optimize(pool, Constraints(objective, credit_limit, max_unique_teams, positions_needed, max_players_per_team, constraints,
+                                         time_budget_ms=time_budget_ms))
+    logging.info(f"Found {len(results)} lineups; best {results[0].objective}={results[0].value:.2f}" if results else "No lineup satisfies the constraints.")
+    return [list(result.players) for result in results]
+
+def portfolio_members(search, n_lineups, max_shared_players=7, max_exposure=1.0):
+    """Yields up to n_lineups (value, members) pairs as they are solved, one exact solve per lineup.
+
+    Each new lineup shares at most `max_shared_players` with every earlier
+    one, and no player appears in more than `max_exposure` (a fraction of
+    n_lineups) of the lineups. The combination tables are built once; each
+    accepted lineup only adds a per-half overlap count vector and updates the
+    exposure mask used by the next solve.
+    """
+    exposure_cap = max(1, int(max_exposure * n_lineups))
+    exposure = np.zeros(len(search.pool), dtype=np.int32)
+    left_overlap = np.empty((0, len(search.left)), dtype=np.int8)
+    right_overlap = np.empty((0, len(search.right)), dtype=np.int8)
+    portfolio = []
+
+    def pair_mask(left_row):
+        return (right_overlap <= (max_shared_players - left_overlap[:, left_row])[:, None]).all(axis=0)
+
+    for _ in range(n_lineups):
+        banned = exposure >= exposure_cap
+        left_mask = search.left.rows_without(banned)
+        right_mask = search.right.rows_without(banned)
+
+        result = search.top_k(1, left_mask=left_mask, right_mask=right_mask, pair_mask=pair_mask)
+        if not result:
+            logging.info(f"No further lineup satisfies the overlap/exposure constraints after {len(portfolio)} lineups.")
+            break
+        value, members = result[0]
+        portfolio.append((value, members))
+        exposure[members] += 1
+
+        in_lineup = np.zeros(len(search.pool), dtype=np.int8)
+        in_lineup[members] = 1
+        left_overlap = np.vstack([left_overlap, in_lineup[search.left.members].sum(axis=1, dtype=np.int8)])
+        right_overlap = np.vstack([right_overlap, in_lineup[search.right.members].sum(axis=1, dtype=np.int8)])
+        logging.info(f"Portfolio lineup {len(portfolio)}: {search.objective}={value:.2f}")
+        yield value, members
+
+def iter_lineup_portfolio(search, n_lineups, max_shared_players=7, max_exposure=1.0):
+    """Yields portfolio lineups (lists of player rows) as they are solved."""
+    for _, members in portfolio_members(search, n_lineups, max_shared_players, max_exposure):
+        yield search.lineup(members)
+
+@profile_stage()
+def create_lineup_portfolio(search, n_lineups, max_shared_players=7, max_exposure=1.0):
+    """List form of iter_lineup_portfolio."""
+    return list(iter_lineup_portfolio(search, n_lineups, max_shared_players, max_exposure))
@@ -0,0 +1,109 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from glob import glob
+import pandas as pd
+
+# Partitioned store: partitions/{competition}/season_{season_id}/week_{week}.pkl (+ average.pkl)
+partitions_dir = "partitions"
+
+# Dunkest stats endpoint per competition
+competition_urls = {
+    'euroleague': "https://www.dunkest.com/en/euroleague/stats/players/table",
+    'eurocup': "https://www.dunkest.com/en/eurocup/stats/players/table",
+}
+
+# Dunkest team ids per (competition, season_id); seasons not listed are fetched without a team filter
+season_teams = {
+    ('euroleague', 17): [31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 47, 48, 60],
+}
+
+@dataclass(frozen=True)
+class Partition:
+    """One season of one competition: where its stats are fetched from and stored."""
+    competition: str = 'euroleague'
+    season_id: int = 17
+
+    @property
+    def base_url(self):
+        return competition_urls[self.competition]
+
+    @property
+    def teams(self):
+        return season_teams.get((self.competition, self.season_id), [])
+
+    @property
+    def path(self):
+        return os.path.join(partitions_dir, self.competition, f"season_{self.season_id}")
+
+    def __str__(self):
+        return f"{self.competition}:{self.season_id}"
+
+current_partition = Partition('euroleague', 17)
+
+def parse_partition(text):
+    """'euroleague:16' (or just '16' for the current competition) -> Partition."""
+    competition, _, season = text.rpartition(':')
+    return Partition(competition or current_partition.competition, int(season))
+
+def week_path(partition, week):
+    return os.path.join(partition.path, f"week_{week}.pkl")
+
+def average_path(partition):
+    return os.path.join(partition.path, "average.pkl")
+
+def save_partition(partition, weekly, average=None):
+    """Stores {week: DataFrame} (and the season average) in the partition, one file per week."""
+    os.makedirs(partition.path, exist_ok=True)
+    for week, df in weekly.items():
+        df.to_pickle(week_path(partition, week))
+    if average is not None:
+        average.to_pickle(average_path(partition))
+    logging.info(f"Saved {len(weekly)} weeks to partition {partition}")
+
+def list_partitions(competitions=None, seasons=None):
+    """Stored partitions, optionally filtered by competition names and season ids."""
+    found = []
+    for path in sorted(glob(os.path.join(partitions_dir, '*', 'season_*'))):
+        competition, season = os.path.basename(os.path.dirname(path)), int(path.rsplit('_', 1)[1])
+        if (competitions is None or competition in competitions) and (seasons is None or season in seasons):
+            found.append(Partition(competition, season))
+    return found
+
+def partition_weeks(partition):
+    return sorted(int(re.search(r'week_(\d+)\.pkl$', path).group(1)) for path in glob(os.path.join(partition.path, 'week_*.pkl')))
+
+def iter_weeks(partitions, weeks=None, columns=None):
+    """Yields (partition, week, DataFrame) one week at a time, keeping only the requested columns."""
+    for partition in partitions:
+        for week in partition_weeks(partition):
+            if weeks is not None and week not in weeks:
+                continue
+            df = pd.read_pickle(week_path(partition, week))
+            if columns is not None:
+                df = df[[col for col in columns if col in df.columns]]
+            yield partition, week, df
+
+def load_season(partition, weeks=None, columns=None):
+    """One partition's weeks as a long table with a 'Week' column."""
+    frames = [df.assign(Week=week) for _, week, df in iter_weeks([partition], weeks, columns)]
+    if not frames:
+        raise FileNotFoundError(f"No stored weeks for partition {partition}.")
+    return pd.concat(frames, ignore_index=True)
+
+def load_average(partition):
+    return pd.read_pickle(average_path(partition)) if os.path.exists(average_path(partition)) else None
+
+def ingest_week_files(partition=current_partition, path="euroleague_data_players_week_*.xlsx",
+                      average_file="euroleague_data_players_average.xlsx"):
+    """Copies the local weekly workbooks (and the season average) into a partition."""
+    weekly = {int(file.split('_')[-1].split('.')[0]): pd.read_excel(file) for file in glob(path)}
+    weekly = {week: df.drop(columns=[col for col in df.columns if col.startswith('Unnamed')]) for week, df in weekly.items()}
+    average = pd.read_excel(average_file, index_col=0) if os.path.exists(average_file) else None
+    save_partition(partition, weekly, average)
+    return weekly
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ingest_week_files()
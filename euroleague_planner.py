@@ -0,0 +1,261 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+from euroleague_availability import availability_index
+from euroleague_defense import load_defense_data
+from euroleague_form import adjustment_base_column, fill_form, form_keys, latest_form, load_form_features
+from euroleague_optimizer import (LineupResult, LineupSearch, TransferSearch, describe_transfers, dominance_mask,
+                                  max_players_per_team, positions_needed)
+from euroleague_profiling import configure_profiling, profile_stage
+from euroleague_reports import LineupWriter
+from euroleague_store import avg_data_file, coach_data_file, data_file, data_mapping, load_player_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# File paths; the schedule is kept by hand (no step fetches it): one row per team and round with
+# columns Round, Team, Opponent, Home_Away ('home'/'away'), so every game appears once for each side
+schedule_file = "euroleague_schedule.xlsx"
+output_file = "euroleague_horizon_plan.xlsx"
+
+# Planning window: rounds first_round .. first_round + horizon - 1
+first_round = 11
+horizon = 3
+
+# Constraints
+credit_limit = 100
+max_transfers = 2
+current_roster = []
+
+# Lineups kept per round (and for the whole horizon) as DP candidates, and refinement passes
+candidates_per_round = 20
+refine_passes = 3
+
+# Points each round's adjustment starts from, as in the adjust script
+base_column = adjustment_base_column
+
+# Same venue factors as adjust_fantasy_points
+home_factor = 1.12
+away_factor = 0.88
+
+# Defense table sheet per position
+position_sheets = {'G': 'Guards', 'F': 'Forwards', 'C': 'Centers'}
+
+def load_schedule(path=schedule_file, first_round=first_round, horizon=horizon):
+    """Fixtures (Round, Team, Opponent, Home_Away) for the planning window, one row per team and round.
+
+    Team names may be full names or abbreviations; both are mapped to the
+    abbreviations used in the player tables.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No schedule at {path}. Create it by hand from the official calendar: one row per team "
+                                f"and round with columns Round, Team, Opponent, Home_Away ('home'/'away').")
+    schedule = pd.read_excel(path)
+    missing = {'Round', 'Team', 'Opponent', 'Home_Away'} - set(schedule.columns)
+    if missing:
+        raise ValueError(f"Schedule {path} lacks columns {sorted(missing)}.")
+    schedule = schedule[schedule['Round'].between(first_round, first_round + horizon - 1)].copy()
+    for col in ['Team', 'Opponent']:
+        schedule[col] = schedule[col].map(data_mapping).fillna(schedule[col])
+    schedule['Home_Away'] = schedule['Home_Away'].str.lower()
+    return schedule
+
+def fixture_matrices(players, schedule, rounds):
+    """(opponents, home_away) arrays of shape players x rounds; NaN where a team has no game."""
+    matrices = []
+    for col in ['Opponent', 'Home_Away']:
+        table = schedule.pivot_table(index='Team', columns='Round', values=col, aggfunc='first').reindex(columns=rounds)
+        matrices.append(table.reindex(players['Team'].to_numpy()).to_numpy(dtype=object))
+    return tuple(matrices)
+
+def horizon_fpt(players, opponents, home_away, defense_data, base_column='FPT'):
+    """Adjusted FPT for every player and round (players x rounds), as adjust_fantasy_points computes it.
+
+    The venue factor and the opponent's defense against the player's
+    position are looked up for the whole matrix at once; rounds without a
+    game score 0.
+    """
+    base = pd.to_numeric(players[base_column], errors='coerce').fillna(0).to_numpy(dtype=float)[:, None]
+    venue = np.where(home_away == 'home', home_factor, away_factor)
+    defense = np.ones(opponents.shape)
+    positions = players['Pos'].to_numpy()
+    for pos, sheet in position_sheets.items():
+        rows = positions == pos
+        if not rows.any():
+            continue
+        allowed = pd.Series(defense_data[sheet]['data'])
+        league_avg = allowed.mean()
+        opponent_allowed = allowed.reindex(opponents[rows].ravel()).fillna(0).to_numpy().reshape(rows.sum(), -1)
+        defense[rows] = 1 + defense_data[sheet]['alpha'] * (opponent_allowed - league_avg) / league_avg
+    plays = pd.notna(opponents)
+    return np.where(plays, np.round(base * venue * defense, 2), 0.0)
+
+class HorizonPlanner:
+    """Lineup sequence over several rounds maximizing total points under a per-round transfer limit.
+
+    Candidate lineups are the top-K of every round and of the whole horizon,
+    each searched among the players undominated for that objective (so the
+    best lineup of every round is exact). A DP over rounds then picks one
+    candidate per round: the best total to reach lineup j in round w is its
+    round-w points plus the best total in round w - 1 over the lineups
+    within max_transfers swaps of j.
+    The plan is refined by adding, for every round, the best lineups within
+    max_transfers of the previous round's planned lineup (TransferSearch)
+    and solving the DP again until the total stops improving.
+    """
+
+    def __init__(self, pool, round_columns, credit_limit, max_transfers, positions_needed=positions_needed,
+                 max_players_per_team=max_players_per_team, roster=(), candidates_per_round=candidates_per_round):
+        self.round_columns = list(round_columns)
+        self.credit_limit = credit_limit
+        self.max_transfers = max_transfers
+        self.positions_needed = positions_needed
+        self.max_players_per_team = max_players_per_team
+        self.roster = list(roster)
+        self.k = candidates_per_round
+        pool = pool.reset_index(drop=True).copy()
+        pool['Horizon_FPT'] = pool[self.round_columns].sum(axis=1)
+        # Only players undominated in some round (or over the horizon), plus the current roster
+        masks = {col: dominance_mask(pool, col, positions_needed, max_players_per_team)
+                 for col in self.round_columns + ['Horizon_FPT']}
+        keep = np.logical_or.reduce([pool['Player'].isin(self.roster).to_numpy()] + list(masks.values()))
+        self.pool = pool[keep].reset_index(drop=True)
+        self.eligible = {col: mask[keep] for col, mask in masks.items()}
+        self.points = self.pool[self.round_columns].to_numpy(dtype=float)
+        self.slots = sum(positions_needed.values())
+        self.candidates = {}
+
+    def add(self, found):
+        for _, members in found:
+            self.candidates.setdefault(tuple(sorted(int(member) for member in members)), None)
+
+    def search(self, objective, roster=None):
+        if roster is None or self.max_transfers >= self.slots:
+            return LineupSearch(self.pool, objective, self.credit_limit, self.positions_needed, self.max_players_per_team,
+                                eligible=self.eligible[objective])
+        names = list(zip(self.pool['Player'].to_numpy()[list(roster)], self.pool['Team'].to_numpy()[list(roster)]))
+        return TransferSearch(self.pool, names, self.max_transfers, objective, self.credit_limit,
+                              self.positions_needed, self.max_players_per_team)
+
+    def roster_members(self):
+        if not self.roster:
+            return None
+        members = np.flatnonzero(self.pool['Player'].isin(self.roster).to_numpy())
+        if len(members) != self.slots:
+            raise ValueError(f"Current roster matches {len(members)} players, expected {self.slots}.")
+        return tuple(int(member) for member in members)
+
+    def solve(self):
+        """DP over rounds on the current candidates; returns (total, lineup per round)."""
+        lineups = list(self.candidates)
+        incidence = np.zeros((len(lineups), len(self.pool)), dtype=np.int32)
+        for row, members in enumerate(lineups):
+            incidence[row, list(members)] = 1
+        points = incidence @ self.points
+        reachable = self.slots - incidence @ incidence.T <= self.max_transfers
+
+        total = points[:, 0].copy()
+        start = self.roster_members()
+        if start is not None:
+            total[self.slots - incidence[:, list(start)].sum(axis=1) > self.max_transfers] = -np.inf
+        previous = []
+        for week in range(1, len(self.round_columns)):
+            options = np.where(reachable, total[:, None], -np.inf)
+            previous.append(options.argmax(axis=0))
+            total = options.max(axis=0) + points[:, week]
+
+        last = int(total.argmax())
+        plan = [last]
+        for back in reversed(previous):
+            plan.append(int(back[plan[-1]]))
+        return float(total[last]), [lineups[row] for row in reversed(plan)]
+
+    def plan(self, refine_passes=refine_passes):
+        start = self.roster_members()
+        if start is not None:
+            self.candidates[tuple(sorted(start))] = None
+        for col in self.round_columns + ['Horizon_FPT']:
+            self.add(self.search(col, start if col == self.round_columns[0] else None).top_k(self.k))
+        best_total, best_plan = self.solve()
+        logging.info(f"Horizon plan from {len(self.candidates)} candidate lineups: total {best_total:.2f}")
+        for _ in range(refine_passes):
+            previous = [start] + best_plan[:-1]
+            for col, roster in zip(self.round_columns, previous):
+                if roster is not None:
+                    self.add(self.search(col, roster).top_k(self.k))
+            total, plan = self.solve()
+            if total <= best_total + 1e-9:
+                break
+            best_total, best_plan = total, plan
+            logging.info(f"Refined horizon plan from {len(self.candidates)} candidate lineups: total {best_total:.2f}")
+        return best_total, best_plan
+
+    def results(self, plan):
+        """One LineupResult per round, with the transfers from the previous round's lineup."""
+        results = []
+        previous = self.roster
+        for week, (col, members) in enumerate(zip(self.round_columns, plan), start=1):
+            lineup = list(self.pool.iloc[list(members)].itertuples(index=False))
+            players_out, players_in = describe_transfers(previous, lineup) if previous else ([], [])
+            results.append(LineupResult(week, col, float(self.points[list(members), week - 1].sum()),
+                                        float(self.pool['CR'].to_numpy()[list(members)].sum()), tuple(lineup),
+                                        tuple(players_out), tuple(players_in)))
+            previous = [player.Player for player in lineup]
+        return results
+
+@profile_stage()
+def plan_horizon(players, schedule, defense_data, rounds, credit_limit=credit_limit, max_transfers=max_transfers,
+                 roster=(), positions_needed=positions_needed, max_players_per_team=max_players_per_team,
+                 base_column='FPT', candidates_per_round=candidates_per_round):
+    """Lineups for `rounds` maximizing total adjusted FPT with at most max_transfers swaps per round.
+
+    Adds one 'Round_<n>' column of adjusted FPT per round to a copy of
+    `players` and returns (pool, LineupResults in round order).
+    """
+    pool = players.reset_index(drop=True).copy()
+    opponents, home_away = fixture_matrices(pool, schedule, rounds)
+    round_columns = [f'Round_{round_number}' for round_number in rounds]
+    pool[round_columns] = horizon_fpt(pool, opponents, home_away, defense_data, base_column)
+    if 'PLAYS' in pool.columns:
+        # Unavailable players score nothing in the first round
+        pool.loc[pool['PLAYS'] == 0, round_columns[0]] = 0.0
+
+    planner = HorizonPlanner(pool, round_columns, credit_limit, max_transfers, positions_needed, max_players_per_team,
+                             roster, candidates_per_round)
+    total, plan = planner.plan()
+    results = planner.results(plan)
+    for result in results:
+        logging.info(f"{result.objective}: {result.value:.2f} FPT, {result.credits:.1f} CR, "
+                     f"out={list(result.transfers_out)} in={list(result.transfers_in)}")
+    logging.info(f"Planned {len(results)} rounds: total {total:.2f} FPT")
+    return planner.pool, results
+
+def main():
+
+    configure_profiling()
+
+    # Read first, so a missing schedule fails before the slower loads
+    schedule = load_schedule(schedule_file, first_round, horizon)
+
+    df = load_player_store(data_file, avg_data_file, coach_data_file)
+
+    df['PLAYS'] = availability_index(df).astype(int)
+
+    df = fill_form(df.join(latest_form(load_form_features()), on=form_keys), fallback_column='FPT')
+
+    defense_data = load_defense_data(df)
+
+    rounds = list(range(first_round, first_round + horizon))
+
+    pool, results = plan_horizon(df, schedule, defense_data, rounds, credit_limit, max_transfers, current_roster,
+                                 base_column=base_column)
+
+    with LineupWriter(output_file, [result.objective for result in results]) as writer:
+        writer.write_all([list(result.players) for result in results])
+
+
+if __name__ == "__main__":
+
+    main()
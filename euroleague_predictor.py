@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+import joblib
+
+from euroleague_defense import load_defense_tables
+from euroleague_form import fill_form, form_columns
+from euroleague_store import data_mapping
+from euroleague_profiling import profile_stage
+
+# File paths and configurations
+model_file = "euroleague_model.pkl"
+scaler_file = "scaler.pkl"
+encoders_file = "label_encoders.pkl"
+model_registry_file = "euroleague_model_registry.json"
+
+features = ['avg_FPT', 'avg_PLUS', 'Position_Defense_Avg', 'Home_Away'] + form_columns
+scaled_features = ['avg_FPT', 'avg_PLUS', 'Position_Defense_Avg'] + form_columns
+
+# Hyperparameters used when the registry has no tuned configuration
+default_model_params = {'n_estimators': 500, 'learning_rate': 0.01, 'max_depth': 5, 'random_state': 42}
+
+position_map = {'G': 'Guards', 'F': 'Forwards', 'C': 'Centers'}
+
+@profile_stage()
+def load_defense_data():
+    logging.info("Loading defense data...")
+    return defense_data_from_tables(load_defense_tables())
+
+def defense_data_from_tables(tables):
+    """{position: {team abbreviation: average allowed}} from defense vs position tables."""
+    defense_data = {}
+    for position in ['Guards', 'Forwards', 'Centers']:
+        df = tables[position].rename(columns={'Team Name': 'Team'})
+        df['Team'] = df['Team'].map(data_mapping)
+        defense_data[position] = df.set_index('Team')['Average'].to_dict()
+    return defense_data
+
+def load_model_params():
+    """Returns the registered GradientBoostingRegressor hyperparameters, or the defaults."""
+    if os.path.exists(model_registry_file):
+        with open(model_registry_file, 'r') as f:
+            registry = json.load(f)
+        logging.info(f"Using registered model parameters (CV RMSE={registry.get('cv_rmse')}): {registry['params']}")
+        return {**default_model_params, **registry['params']}
+    return dict(default_model_params)
+
+def save_model_params(params, cv_rmse, search):
+    registry = {'params': params, 'cv_rmse': cv_rmse, 'search': search, 'features': features}
+    with open(model_registry_file, 'w') as f:
+        json.dump(registry, f, indent=2)
+    logging.info(f"Saved tuned model parameters to {model_registry_file}")
+
+def build_defense_lookup(defense_data):
+    """Flattens {position: {team: average}} into a Series indexed by (Pos, Team)."""
+    inverse_position_map = {name: pos for pos, name in position_map.items()}
+    entries = {
+        (inverse_position_map[position], team): average
+        for position, teams in defense_data.items()
+        for team, average in teams.items()
+        if position in inverse_position_map
+    }
+    return pd.Series(entries, dtype=float)
+
+def lookup_defense(positions, opponents, defense_lookup):
+    """Vectorized equivalent of map_defense_value: 0 for unknown positions or opponents."""
+    keys = pd.MultiIndex.from_arrays([np.asarray(positions), np.asarray(opponents)])
+    return defense_lookup.reindex(keys).fillna(0).to_numpy()
+
+def parse_plus(values):
+    """Converts '+1.3' / '−0.9' strings to floats."""
+    return pd.Series(values).replace({r'\+': '', '−': '-'}, regex=True).astype(float).to_numpy()
+
+def encode_home_away(values):
+    return pd.Series(values).map({'home': 1, 'away': 0, 1: 1, 0: 0}).to_numpy(dtype=float)
+
+class FPTPredictor:
+    """Scores (player, opponent, home/away) scenarios with the trained FPT model.
+
+    The model, scaler, label encoders and defense tables are loaded once, so
+    repeated calls only pay for the vectorized feature build and model.predict.
+    """
+
+    def __init__(self, model, scaler, defense_data, label_encoders=None, players=None):
+        trained = list(getattr(model, 'feature_names_in_', features))
+        if trained != features:
+            raise ValueError(f"The model was trained on {trained}, not {features}; retrain it with euroleague_main_predict.py.")
+        self.model = model
+        self.scaler = scaler
+        self.label_encoders = label_encoders or {}
+        self.defense_lookup = build_defense_lookup(defense_data)
+        self.players = None
+        if players is not None:
+            self.set_players(players)
+
+    @classmethod
+    def from_files(cls, players=None, defense_data=None):
+        logging.info("Loading saved model, scaler and encoders...")
+        model = joblib.load(model_file)
+        scaler = joblib.load(scaler_file)
+        label_encoders = joblib.load(encoders_file) if os.path.exists(encoders_file) else None
+        if defense_data is None:
+            defense_data = load_defense_data()
+        return cls(model, scaler, defense_data, label_encoders=label_encoders, players=players)
+
+    def set_players(self, players):
+        """Keeps the per-player season averages and form used to expand (Player, opponent) scenarios."""
+        players = fill_form(players.dropna(subset=['avg_FPT', 'avg_PLUS']).drop_duplicates('Player', keep='last'))
+        self.players = pd.DataFrame({
+            'Pos': players['Pos'].to_numpy(),
+            'Team': players['Team'].to_numpy(),
+            'avg_FPT': players['avg_FPT'].astype(float).to_numpy(),
+            'avg_PLUS': parse_plus(players['avg_PLUS']),
+            **{col: players[col].to_numpy() for col in form_columns},
+        }, index=pd.Index(players['Player'], name='Player'))
+
+    def known_opponents(self):
+        encoder = self.label_encoders.get('Upcoming_Opponent')
+        return set(encoder.classes_) if encoder is not None else None
+
+    def build_features(self, scenarios):
+        """Builds the model feature matrix for a scenario frame.
+
+        Scenarios need 'Upcoming_Opponent' and 'Home_Away' plus either the
+        player attributes ('Pos', 'avg_FPT', 'avg_PLUS' and optionally the
+        form columns) or a 'Player' column resolvable against the table given
+        to set_players.
+        """
+        if {'Pos', 'avg_FPT', 'avg_PLUS'}.issubset(scenarios.columns):
+            positions = scenarios['Pos'].to_numpy()
+            avg_fpt = scenarios['avg_FPT'].astype(float).to_numpy()
+            avg_plus = parse_plus(scenarios['avg_PLUS'])
+            form = fill_form(scenarios.reset_index(drop=True))[form_columns]
+        else:
+            if self.players is None:
+                raise ValueError("Scenarios without player attributes need set_players() first.")
+            player_rows = self.players.reindex(scenarios['Player'].to_numpy())
+            missing = player_rows['avg_FPT'].isna().to_numpy()
+            if missing.any():
+                raise KeyError(f"Unknown players in scenarios: {sorted(set(scenarios['Player'].to_numpy()[missing]))}")
+            positions = player_rows['Pos'].to_numpy()
+            avg_fpt = player_rows['avg_FPT'].to_numpy()
+            avg_plus = player_rows['avg_PLUS'].to_numpy()
+            form = player_rows[form_columns].reset_index(drop=True)
+
+        opponents = scenarios['Upcoming_Opponent'].to_numpy()
+        known = self.known_opponents()
+        if known is not None:
+            unknown = set(opponents) - known
+            if unknown:
+                logging.warning(f"Opponents not seen in training: {sorted(unknown)}")
+
+        X = pd.DataFrame({
+            'avg_FPT': avg_fpt,
+            'avg_PLUS': avg_plus,
+            'Position_Defense_Avg': lookup_defense(positions, opponents, self.defense_lookup),
+            'Home_Away': encode_home_away(scenarios['Home_Away']),
+            **{col: form[col].to_numpy(dtype=float) for col in form_columns},
+        })
+        X[scaled_features] = self.scaler.transform(X[scaled_features])
+        return X[features]
+
+    @profile_stage('model_predict')
+    def predict(self, scenarios):
+        """Returns predicted FPT for every scenario row in one model call."""
+        if len(scenarios) == 0:
+            return np.empty(0)
+        return self.model.predict(self.build_features(scenarios))
+
+    def predict_matchups(self, players, opponents, home_away):
+        """Scores parallel sequences of player names, opponents and 'home'/'away' flags."""
+        scenarios = pd.DataFrame({'Player': players, 'Upcoming_Opponent': opponents, 'Home_Away': home_away})
+        scenarios['Predicted_FPT'] = self.predict(scenarios)
+        return scenarios
@@ -0,0 +1,159 @@
+import argparse
+import atexit
+import cProfile
+import functools
+import logging
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+# Aggregated measurements per stage name
+stage_stats = {}
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_profiler = None
+_profile_output = None
+
+def count_rows(result):
+    """Rows produced by a stage: DataFrame/array length, summed over the frames of a tuple, list length otherwise."""
+    if hasattr(result, 'shape') and len(result.shape):
+        return result.shape[0]
+    if isinstance(result, tuple):
+        counts = [item.shape[0] for item in result if hasattr(item, 'shape') and len(item.shape)]
+        return sum(counts) if counts else None
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return None
+
+class Stage:
+    """Times one pipeline stage; used through profile_stage() as a decorator or a context manager.
+
+    Wall and CPU time are always recorded. Peak memory (tracemalloc) is
+    recorded while profiling is enabled, and covers nested stages.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.rows = None
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Stage(name) as stage:
+                result = func(*args, **kwargs)
+                stage.rows = count_rows(result)
+            return result
+        return wrapper
+
+    @staticmethod
+    def _stack():
+        """Open stages of the current thread, so stages run from worker threads nest correctly."""
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+        return _local.stack
+
+    def __enter__(self):
+        stack = self._stack()
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].max_memory = max(stack[-1].max_memory, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.max_memory = current
+        stack.append(self)
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        stack = self._stack()
+        stack.pop()
+        peak_mb = None
+        if tracemalloc.is_tracing() and hasattr(self, 'start_memory'):
+            self.max_memory = max(self.max_memory, tracemalloc.get_traced_memory()[1])
+            peak_mb = (self.max_memory - self.start_memory) / 2 ** 20
+            if stack:
+                stack[-1].max_memory = max(stack[-1].max_memory, self.max_memory)
+
+        with _stats_lock:
+            stats = stage_stats.setdefault(self.name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_mb': None, 'rows': None})
+            stats['calls'] += 1
+            stats['wall_s'] += wall
+            stats['cpu_s'] += cpu
+            if peak_mb is not None:
+                stats['peak_mb'] = max(stats['peak_mb'] or 0.0, peak_mb)
+            if self.rows is not None:
+                stats['rows'] = self.rows
+        logging.debug(f"Stage {self.name}: wall={wall:.3f}s cpu={cpu:.3f}s rows={self.rows}")
+
+def profile_stage(name=None):
+    """Decorator / context manager recording wall time, CPU time, peak memory and rows for a stage.
+
+    Usage:
+        @profile_stage()
+        def load_data(): ...
+
+        with profile_stage('model_fit') as stage:
+            model.fit(X, y)
+            stage.rows = len(X)
+    """
+    return Stage(name)
+
+def profile_report():
+    """One row per stage, slowest first."""
+    with _stats_lock:
+        report = pd.DataFrame.from_dict({name: dict(stats) for name, stats in stage_stats.items()}, orient='index').rename_axis('stage').reset_index()
+    if report.empty:
+        return report
+    return report.sort_values('wall_s', ascending=False).reset_index(drop=True)
+
+def log_profile_report():
+    report = profile_report()
+    if report.empty:
+        logging.info("No profiled stages were run.")
+        return
+    logging.info(f"Stage profile:\n{report.to_string(index=False, float_format=lambda value: f'{value:.3f}')}")
+
+def enable_profiling(output_file=None):
+    """Starts memory tracing (and cProfile when output_file is given); the report is logged at exit.
+
+    The cProfile dump opens in snakeviz and converts to a flame graph with
+    flameprof or gprof2dot.
+    """
+    global _profiler, _profile_output
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        atexit.register(finish_profiling)
+    if output_file and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profile_output = output_file
+        _profiler.enable()
+
+def finish_profiling():
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_profile_output)
+        logging.info(f"Saved cProfile stats to {_profile_output}")
+        _profiler = None
+    log_profile_report()
+    tracemalloc.stop()
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help="Log per-stage wall/CPU time, peak memory and rows at exit")
+    parser.add_argument('--profile-output', metavar='FILE', help="Also dump cProfile stats to FILE (implies --profile)")
+    return parser
+
+def configure_profiling(args=None):
+    """Enables profiling from parsed arguments, or from --profile/--profile-output on the command line."""
+    if args is None:
+        args, _ = add_profile_arguments(argparse.ArgumentParser(add_help=False)).parse_known_args()
+    if args.profile or args.profile_output:
+        enable_profiling(args.profile_output)
+    return args
@@ -0,0 +1,83 @@
+import csv
+import logging
+import math
+import os
+from openpyxl import Workbook
+
+# Flat lineup schema: one row per lineup slot, lineup totals repeated on every row
+lineup_columns = [('Lineup', int), ('Slot', int), ('Player', str), ('Pos', str), ('Team', str), ('CR', float), ('FPT', float)]
+
+def lineup_schema(value_columns=()):
+    """Column names and types for lineups scored on `value_columns` (e.g. 'Adjusted_FPT')."""
+    value_columns = [col for col in value_columns if col not in ('CR', 'FPT')]
+    columns = lineup_columns + [(col, float) for col in value_columns]
+    totals = [('Lineup_CR', float), ('Lineup_FPT', float)] + [(f'Lineup_{col}', float) for col in value_columns]
+    return columns + totals
+
+def to_cell(value, column_type):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    try:
+        return column_type(value)
+    except (TypeError, ValueError):
+        return None
+
+class LineupWriter:
+    """Writes lineups to .xlsx (write-only workbook) or .csv one row at a time.
+
+    Nothing but the current lineup is held in memory, so portfolios of any
+    size can be written as the optimizer yields them.
+
+    Usage:
+        with LineupWriter("best_team.xlsx", ['Adjusted_FPT']) as writer:
+            for lineup in lineups:
+                writer.write(lineup)
+    """
+
+    def __init__(self, path, value_columns=(), sheet_name='Lineups'):
+        self.path = path
+        self.schema = lineup_schema(value_columns)
+        self.value_columns = [col for col in value_columns if col not in ('CR', 'FPT')]
+        self.count = 0
+        self.format = os.path.splitext(path)[1].lower()
+        if self.format == '.xlsx':
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet(sheet_name)
+            self._append = self.sheet.append
+        elif self.format == '.csv':
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self._append = csv.writer(self.file).writerow
+        else:
+            raise ValueError(f"Unsupported lineup report format: {path}")
+        self._append([name for name, _ in self.schema])
+
+    def write(self, lineup):
+        """Appends one lineup (a list of player rows with Player/Pos/Team/CR/FPT and the value columns)."""
+        self.count += 1
+        totals = {
+            'Lineup_CR': round(sum(player.CR for player in lineup), 1),
+            'Lineup_FPT': sum(player.FPT for player in lineup),
+            **{f'Lineup_{col}': sum(getattr(player, col) for player in lineup) for col in self.value_columns},
+        }
+        for slot, player in enumerate(lineup, start=1):
+            values = {'Lineup': self.count, 'Slot': slot, **totals}
+            self._append([to_cell(values[name] if name in values else getattr(player, name, None), column_type)
+                          for name, column_type in self.schema])
+
+    def write_all(self, lineups):
+        for lineup in lineups:
+            self.write(lineup)
+        return self.count
+
+    def close(self):
+        if self.format == '.xlsx':
+            self.workbook.save(self.path)
+        else:
+            self.file.close()
+        logging.info(f"Saved {self.count} lineups to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
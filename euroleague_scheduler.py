@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, replace
+from fnmatch import fnmatch
+from glob import glob
+from graphlib import TopologicalSorter
+
+from euroleague_availability import injuries_file
+from euroleague_defense import defense_state_file, derived_defense_file
+from euroleague_form import form_state_file
+from euroleague_planner import output_file as horizon_plan_file, schedule_file
+from euroleague_predictor import encoders_file, model_file, model_registry_file, scaler_file
+from euroleague_store import avg_data_file, coach_data_file, data_file, store_file
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Input stamps each stage last ran successfully with, and the per-stage output logs
+state_file = "euroleague_scheduler_state.json"
+log_dir = "scheduler_logs"
+
+# Watch loop: seconds between checks, stages run at once
+poll_seconds = 30
+max_parallel_stages = 2
+
+player_data_path = "euroleague_data_players_week_*.xlsx"
+adjusted_data_file = "euroleague_data_players_filtered_adjusted_average.xlsx"
+
+# Weeks the scheduled fetch refreshes (euroleague_fetch.py --weeks); extend as the season goes on
+fetch_weeks = "1-10"
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline script, the files (or glob patterns) it reads and the files it writes.
+
+    `optional` inputs are watched like `inputs` but a missing one does not
+    hold the stage back. With `every` (seconds) the stage has no file
+    inputs and runs on that schedule instead, as the fetch does.
+    """
+    name: str
+    script: str
+    inputs: tuple = ()
+    outputs: tuple = ()
+    args: tuple = ()
+    optional: tuple = ()
+    every: float = None
+
+    @property
+    def watched(self):
+        return self.inputs + self.optional
+
+# Every file has one writing stage. The player store, defense state and form state are refreshed by
+# their own stages; the scripts downstream also call the loaders, but run after those stages, find
+# the files current and only read them. The fetch writes the week files (only the changed ones) and
+# the season averages. The schedule the horizon plan reads is kept by hand, so that stage waits
+# until the file exists.
+stages = [
+    Stage('fetch', 'euroleague_fetch.py', outputs=(player_data_path, avg_data_file), args=('--weeks', fetch_weeks),
+          every=60 * 60),
+    Stage('store', 'euroleague_store.py', (data_file, avg_data_file), (store_file,), optional=(coach_data_file,)),
+    Stage('defense', 'euroleague_defense.py', (player_data_path,), (defense_state_file, derived_defense_file)),
+    Stage('form', 'euroleague_form.py', (player_data_path,), (form_state_file,)),
+    Stage('adjust', 'euroleague_main_adjust_fpt.py', (store_file, defense_state_file, form_state_file),
+          (adjusted_data_file,), optional=(injuries_file,)),
+    Stage('model', 'euroleague_main_predict.py', (player_data_path, defense_state_file, form_state_file),
+          (model_file, scaler_file, encoders_file, "euroleague_predictions_week_*.xlsx"), ('--retrain',),
+          optional=(model_registry_file,)),
+    Stage('lineups', 'euroleague_main_best_team.py', (adjusted_data_file,), ("best_team_original_reformatted.xlsx",),
+          optional=(player_data_path,)),
+    Stage('lineups_average', 'euroleague_main_best_team_average.py', (adjusted_data_file,),
+          ("euroleague_best_team_original_average.xlsx",)),
+    Stage('horizon_plan', 'euroleague_planner.py', (schedule_file, store_file, defense_state_file, form_state_file),
+          (horizon_plan_file,), optional=(injuries_file,)),
+]
+
+def matches(output, pattern):
+    """Whether an output and an input name the same files; either side may be a glob pattern."""
+    return fnmatch(output, pattern) or fnmatch(pattern, output)
+
+def dependency_graph(stages):
+    """{stage name: names of the stages writing one of its inputs}.
+
+    Raises ValueError when two stages declare the same output, since they
+    could then run at the same time and write the file concurrently.
+    """
+    for stage in stages:
+        for other in stages:
+            shared = [output for output in stage.outputs for theirs in other.outputs if other is not stage and matches(output, theirs)]
+            if shared:
+                raise ValueError(f"Stages {stage.name} and {other.name} both write {shared}.")
+    return {stage.name: {other.name for other in stages if other is not stage
+                         and any(matches(output, pattern) for output in other.outputs for pattern in stage.watched)}
+            for stage in stages}
+
+def input_stamps(stage):
+    """{path: mtime} of every existing file the stage reads, globs expanded."""
+    paths = sorted({path for pattern in stage.watched for path in glob(pattern)})
+    return {path: os.path.getmtime(path) for path in paths}
+
+def missing_inputs(stage):
+    return [pattern for pattern in stage.inputs if not glob(pattern)]
+
+def outputs_exist(stage):
+    return all(glob(pattern) for pattern in stage.outputs)
+
+def load_state(path=state_file):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_state(state, path=state_file):
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def is_due(stage, state, now=None):
+    """Whether the stage has to run: its inputs changed since its last run, an output is missing, or its schedule came up."""
+    record = state.get(stage.name)
+    if stage.every is not None:
+        return record is None or (now or time.time()) - record.get('finished', 0) >= stage.every
+    if missing_inputs(stage):
+        return False
+    return record is None or record.get('inputs') != input_stamps(stage) or not outputs_exist(stage)
+
+class Scheduler:
+    """Runs the stages whose inputs changed, then everything downstream of them, in dependency order.
+
+    Stages are visited in topological order of the graph their declared
+    inputs and outputs imply, and each one is checked again once its
+    upstream stages have finished, so branches the change does not reach
+    are never run. Independent due stages run concurrently as subprocesses, up to
+    `max_parallel` at a time; a failed stage skips its downstream stages
+    for the pass and is retried on the next one.
+    """
+
+    def __init__(self, stages=stages, max_parallel=max_parallel_stages, state_path=state_file, dry_run=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.graph = dependency_graph(stages)
+        self.max_parallel = max_parallel
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.dry_run = dry_run
+
+    def due_stages(self):
+        return [name for name, stage in self.stages.items() if is_due(stage, self.state)]
+
+    def downstream(self, names):
+        """Names of the given stages and of every stage reading (transitively) from them."""
+        found = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, upstream in self.graph.items():
+                if name not in found and upstream & found:
+                    found.add(name)
+                    changed = True
+        return found
+
+    async def run_stage(self, stage):
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, f"{stage.name}.log")
+        # Stamped before the run, so inputs changing while it runs make it due again
+        stamps = input_stamps(stage)
+        start = time.perf_counter()
+        with open(log_path, 'wb') as log:
+            process = await asyncio.create_subprocess_exec(sys.executable, stage.script, *stage.args, stdout=log, stderr=asyncio.subprocess.STDOUT)
+            returncode = await process.wait()
+        elapsed = time.perf_counter() - start
+        if returncode != 0:
+            logging.error(f"Stage {stage.name} failed (exit {returncode}) after {elapsed:.1f} s; see {log_path}")
+            return False
+        self.state[stage.name] = {'inputs': stamps, 'finished': time.time()}
+        save_state(self.state, self.state_path)
+        logging.info(f"Stage {stage.name} finished in {elapsed:.1f} s")
+        return True
+
+    async def run_pass(self):
+        """One pass over the affected part of the graph; returns {stage name: what happened to it}."""
+        affected = self.downstream(self.due_stages())
+        if not affected:
+            return {}
+        sorter = TopologicalSorter({name: self.graph[name] & affected for name in affected})
+        sorter.prepare()
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        outcome = {}
+        running = {}
+
+        async def visit(name):
+            stage = self.stages[name]
+            if any(outcome.get(upstream) in ('failed', 'skipped after failure') for upstream in self.graph[name]):
+                return 'skipped after failure'
+            # A dry run writes nothing, so stages below one that would run count as due, with its outputs as present
+            planned = [output for upstream in self.graph[name] if outcome.get(upstream) == 'would run'
+                       for output in self.stages[upstream].outputs]
+            if [pattern for pattern in missing_inputs(stage) if not any(matches(output, pattern) for output in planned)]:
+                return 'missing inputs'
+            upstream_would_run = bool(planned)
+            if not is_due(stage, self.state) and not upstream_would_run:
+                return 'up to date'
+            if self.dry_run:
+                logging.info(f"Would run {stage.name}: {stage.script} {' '.join(stage.args)}")
+                return 'would run'
+            async with semaphore:
+                logging.info(f"Running stage {stage.name}...")
+                return 'ran' if await self.run_stage(stage) else 'failed'
+
+        while sorter.is_active():
+            for name in sorter.get_ready():
+                running[asyncio.ensure_future(visit(name))] = name
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                outcome[name] = task.result()
+                sorter.done(name)
+        logging.info("Pass finished: " + ", ".join(f"{name}={result}" for name, result in outcome.items()))
+        return outcome
+
+    async def watch(self, poll_seconds=poll_seconds):
+        """Checks the inputs every poll_seconds and runs a pass once a change has settled for one poll."""
+        logging.info(f"Watching {len(self.stages)} stages every {poll_seconds} s (Ctrl+C to stop)")
+        previous = None
+        while True:
+            snapshot = {name: input_stamps(stage) for name, stage in self.stages.items()}
+            due = self.due_stages()
+            # Files still being written change between polls; wait for them to settle
+            if due and snapshot == previous:
+                await self.run_pass()
+                snapshot = {name: input_stamps(stage) for name, stage in self.stages.items()}
+            previous = snapshot
+            await asyncio.sleep(poll_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run only the pipeline stages whose inputs changed.")
+    parser.add_argument('--once', action='store_true', help="Run one pass and exit instead of watching")
+    parser.add_argument('--dry-run', action='store_true', help="Log which stages would run without running them")
+    parser.add_argument('--poll', type=float, default=poll_seconds, help="Seconds between checks in watch mode")
+    parser.add_argument('--max-parallel', type=int, default=max_parallel_stages, help="Stages run at the same time")
+    parser.add_argument('--fetch-every', type=float, metavar='MINUTES', help="Also fetch the stats tables on this schedule")
+    parser.add_argument('--fetch-weeks', default=fetch_weeks, help="Weeks the scheduled fetch refreshes, e.g. 1-12")
+    parser.add_argument('--graph', action='store_true', help="Print each stage's upstream stages and exit")
+    args = parser.parse_args()
+
+    # The fetch only runs on a schedule, so without --fetch-every it is left out of the graph
+    selected = [replace(stage, every=args.fetch_every * 60, args=('--weeks', args.fetch_weeks)) if stage.name == 'fetch' else stage
+                for stage in stages if stage.name != 'fetch' or args.fetch_every]
+    scheduler = Scheduler(selected, args.max_parallel, dry_run=args.dry_run)
+    if args.graph:
+        for name, upstream in scheduler.graph.items():
+            print(f"{name}: {', '.join(sorted(upstream)) or '-'}")
+        return
+    if args.once or args.dry_run:
+        asyncio.run(scheduler.run_pass())
+        return
+    try:
+        asyncio.run(scheduler.watch(args.poll))
+    except KeyboardInterrupt:
+        logging.info("Stopped watching.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+import argparse
+import dataclasses
+import hashlib
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+
+from euroleague_availability import availability_index, injuries_file
+from euroleague_defense import load_defense_data
+from euroleague_form import adjustment_base_column, fill_form, form_keys, latest_form, load_form_features
+from euroleague_optimizer import (Constraints, OptimizerSession, delta_player, dominance_mask, lineup_results, optimize,
+                                  player_rows)
+from euroleague_planner import horizon_fpt
+from euroleague_predictor import FPTPredictor, encoders_file, model_file, scaler_file
+from euroleague_predictor import load_defense_data as load_model_defense_data
+from euroleague_profiling import add_profile_arguments, configure_profiling, profile_stage
+from euroleague_store import avg_data_file, coach_data_file, data_file, load_player_store, source_stamp
+
+try:
+    from cachetools import LRUCache
+except ImportError:
+    LRUCache = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Local only by default; results cached per (data version, request)
+host = "127.0.0.1"
+port = 8765
+cache_size = 256
+
+# Warm optimizer sessions kept per data version for /optimize requests with 'deltas'
+session_cache_size = 8
+
+# Files whose change makes the service reload; the weekly files feed the defense tables and form
+player_data_path = "euroleague_data_players_week_*.xlsx"
+source_files = [data_file, avg_data_file, coach_data_file, injuries_file, model_file, scaler_file, encoders_file]
+
+# Columns returned per player by /adjust and /optimize
+player_columns = ['Player', 'Pos', 'Team', 'CR', 'FPT', 'Adjusted_FPT', 'Predicted_FPT', 'PLAYS']
+
+# Constraints fields a request may set (rules are callables and cannot come over JSON), and the numeric ones
+request_fields = {field.name for field in dataclasses.fields(Constraints)} - {'rules'}
+numeric_fields = {'credit_limit', 'max_lineups', 'max_players_per_team', 'max_transfers', 'max_shared_players',
+                  'max_exposure', 'time_budget_ms'}
+
+class RequestError(ValueError):
+    """A malformed request; answered with 400."""
+
+class ResultCache:
+    """Thread-safe LRU of computed responses; cachetools.LRUCache when installed, a dict otherwise."""
+
+    def __init__(self, maxsize=cache_size):
+        self.maxsize = maxsize
+        self.entries = LRUCache(maxsize) if LRUCache is not None else {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                value = self.entries.pop(key) if LRUCache is None else self.entries[key]
+                if LRUCache is None:
+                    self.entries[key] = value
+                return value
+            self.misses += 1
+        # Computed outside the lock so slow queries do not block cached ones
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            if LRUCache is None and len(self.entries) > self.maxsize:
+                del self.entries[next(iter(self.entries))]
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def data_version(paths=source_files, player_data_path=player_data_path):
+    """Short hash of the source files' modification times; changes whenever any input changes."""
+    stamps = sorted(source_stamp(list(paths) + sorted(glob(player_data_path))).items())
+    return hashlib.sha1(repr(stamps).encode()).hexdigest()[:12]
+
+def hashable(value):
+    """JSON lists as tuples (nested ones too), so request values can key the cache."""
+    if isinstance(value, list):
+        return tuple(hashable(item) for item in value)
+    if isinstance(value, dict):
+        return {key: hashable(item) for key, item in value.items()}
+    return value
+
+def name_list(payload, key):
+    """payload[key] as a tuple of names (empty when absent); RequestError unless it is a list of strings."""
+    names = payload.get(key, [])
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise RequestError(f"{key} must be a list of player names, not {names!r}.")
+    return tuple(names)
+
+def constraints_from_request(fields, players):
+    """Constraints from the JSON fields of an /optimize request; RequestError for anything optimize() cannot take."""
+    unknown = set(fields) - request_fields
+    if unknown:
+        raise RequestError(f"Unknown constraints {sorted(unknown)}; allowed: {sorted(request_fields)}.")
+    fields = {name: hashable(value) for name, value in fields.items()}
+    for name in numeric_fields & set(fields):
+        if fields[name] is not None and (isinstance(fields[name], bool) or not isinstance(fields[name], (int, float))):
+            raise RequestError(f"{name} must be a number, not {fields[name]!r}.")
+    if 'objective' in fields:
+        # The default objective is the snapshot's own column; only one the client names can be its mistake
+        objective = fields['objective']
+        if not isinstance(objective, str) or objective not in players.columns:
+            raise RequestError(f"Unknown objective {objective!r}.")
+        if not pd.api.types.is_numeric_dtype(players[objective]):
+            raise RequestError(f"Objective {objective} is not a numeric column.")
+    slots = fields.get('positions_needed', Constraints.positions_needed)
+    pairs = tuple(slots.items()) if isinstance(slots, dict) else slots
+    if not isinstance(pairs, tuple) or not all(isinstance(pair, tuple) and len(pair) == 2 and isinstance(pair[0], str)
+                                               and type(pair[1]) is int and pair[1] >= 0 for pair in pairs):
+        raise RequestError(f"positions_needed must be [position, count] pairs, not {slots!r}.")
+    try:
+        constraints = Constraints(**fields)
+    except (TypeError, ValueError) as error:
+        raise RequestError(str(error))
+    if constraints.roster:
+        # The transfer search needs every current player in the table, once, and a full lineup per position
+        try:
+            rows = player_rows(players, constraints.roster)
+        except ValueError as error:
+            raise RequestError(str(error))
+        counts = players['Pos'].iloc[rows].value_counts().to_dict()
+        if counts != {pos: slots for pos, slots in constraints.slots.items() if slots}:
+            raise RequestError(f"Roster has {counts} players per position, expected {constraints.slots}.")
+    return constraints
+
+def deltas_from_request(deltas, constraints):
+    """The 'deltas' of an /optimize request as hashable tuples of (field, value) pairs; RequestError when malformed.
+
+    Each delta names a 'Player' (and 'Team' for a shared name) and sets the
+    objective column and/or 'CR', or 'removed'.
+    """
+    if not isinstance(deltas, list) or not all(isinstance(delta, dict) for delta in deltas):
+        raise RequestError(f"deltas must be a list of objects, not {deltas!r}.")
+    if deltas and (constraints.roster or constraints.portfolio or constraints.rules or constraints.time_budget_ms is not None):
+        raise RequestError("deltas apply to plain lineup searches only.")
+    allowed = {'Player', 'Team', 'CR', 'removed', constraints.objective}
+    for delta in deltas:
+        unknown = set(delta) - allowed
+        if unknown:
+            raise RequestError(f"Unknown delta fields {sorted(unknown)}; allowed: {sorted(allowed)}.")
+        if not isinstance(delta.get('Player'), str) or not isinstance(delta.get('Team', ''), str):
+            raise RequestError(f"A delta needs a 'Player' name (and optionally a 'Team'), not {delta!r}.")
+        for name in ['CR', constraints.objective]:
+            if name in delta and (isinstance(delta[name], bool) or not isinstance(delta[name], (int, float))):
+                raise RequestError(f"{name} must be a number, not {delta[name]!r}.")
+        if not isinstance(delta.get('removed', False), bool):
+            raise RequestError(f"removed must be true or false, not {delta['removed']!r}.")
+    return tuple(tuple(sorted(delta.items())) for delta in deltas)
+
+def records(df):
+    """JSON-ready rows: NaN becomes null and numpy scalars plain Python values."""
+    return json.loads(df.to_json(orient='records'))
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """Everything one data version answers from; replaced as a whole on reload, never mutated."""
+    version: str
+    players: pd.DataFrame
+    defense_data: dict
+    predictor: object
+
+@profile_stage()
+def load_snapshot(version):
+    """Player store with availability, form, Adjusted_FPT and (with a trained model) Predicted_FPT."""
+    players = load_player_store(data_file, avg_data_file, coach_data_file)
+    players['PLAYS'] = availability_index(players).astype(int)
+    players = fill_form(players.join(latest_form(load_form_features()), on=form_keys), fallback_column='FPT')
+    defense_data = load_defense_data(players)
+    players['Adjusted_FPT'] = adjusted_fpt(players, defense_data)
+
+    predictor = None
+    if all(os.path.exists(path) for path in [model_file, scaler_file]):
+        try:
+            predictor = FPTPredictor.from_files(players, load_model_defense_data())
+        except ValueError as error:
+            logging.warning(f"Predictions disabled: {error}")
+    if predictor is not None:
+        scorable = players['Player'].isin(predictor.players.index) & players['Upcoming_Opponent'].notna() & players['Home_Away'].notna()
+        players.loc[scorable, 'Predicted_FPT'] = predictor.predict(players[scorable][['Player', 'Upcoming_Opponent', 'Home_Away']])
+        # The model scores players only; coaches keep their adjusted points so Predicted_FPT lineups stay complete
+        coaches = players['Pos'] == 'HC'
+        players.loc[coaches, 'Predicted_FPT'] = players.loc[coaches, 'Adjusted_FPT']
+    logging.info(f"Loaded data version {version}: {len(players)} players, predictions {'on' if predictor else 'off'}.")
+    return Snapshot(version, players, defense_data, predictor)
+
+def adjusted_fpt(players, defense_data, base_column=adjustment_base_column):
+    """Adjusted FPT against each player's Upcoming_Opponent, vectorized; players without a fixture score 0."""
+    opponents = players['Upcoming_Opponent'].to_numpy(dtype=object)[:, None]
+    home_away = players['Home_Away'].to_numpy(dtype=object)[:, None]
+    return horizon_fpt(players, opponents, home_away, defense_data, base_column)[:, 0]
+
+def optimize_pool(players, constraints, exclude=()):
+    """Available players scored by the objective, minus `exclude`; the current roster stays in even when unavailable."""
+    pool = players[(players['PLAYS'] == 1) & players[constraints.objective].notna() & ~players['Player'].isin(exclude)]
+    if constraints.roster:
+        # Current players stay in the pool even when unavailable, so they can be transferred out
+        roster = players.iloc[player_rows(players, constraints.roster)]
+        pool = pd.concat([pool, roster[~roster.index.isin(pool.index)]])
+    return pool.reset_index(drop=True)
+
+def new_session(pool, constraints):
+    """OptimizerSession over the players dominance pruning keeps for the unchanged pool.
+
+    A query whose deltas make some other player necessary (checked with
+    OptimizerSession.covers) is solved from scratch instead.
+    """
+    eligible = dominance_mask(pool, constraints.objective, constraints.slots, constraints.max_players_per_team,
+                              constraints.max_lineups)
+    return OptimizerSession(pool, constraints.objective, constraints.credit_limit, constraints.max_lineups, constraints.slots,
+                            constraints.max_players_per_team, eligible=eligible)
+
+def pool_with_deltas(pool, deltas, objective):
+    """A copy of the pool with the deltas applied and the removed players dropped; the index is kept."""
+    pool = pool.copy()
+    rows = player_rows(pool, [delta_player(delta) for delta in deltas])
+    for row, delta in zip(rows, deltas):
+        for col in [objective, 'CR']:
+            if delta.get(col) is not None:
+                pool.loc[row, col] = delta[col]
+    return pool.drop(index=[row for row, delta in zip(rows, deltas) if delta.get('removed')])
+
+class LineupService:
+    """Answers adjust/predict/optimize queries from one warm in-memory snapshot.
+
+    Every request checks the source files' modification times; when they
+    changed the snapshot is rebuilt once, and the new data version makes the
+    cached results of the old one unreachable.
+    """
+
+    def __init__(self, cache_size=cache_size):
+        self.cache = ResultCache(cache_size)
+        self.sessions = ResultCache(session_cache_size)
+        self.reload_lock = threading.Lock()
+        self.snapshot = None
+
+    def current(self):
+        version = data_version()
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self.reload_lock:
+            if self.snapshot is None or self.snapshot.version != version:
+                self.snapshot = load_snapshot(version)
+                self.cache.clear()
+                self.sessions.clear()
+            return self.snapshot
+
+    def handle(self, path, payload):
+        """(status, response dict) for one request; the HTTP layer only does the transport."""
+        routes = {'/health': self.health, '/adjust': self.adjust, '/predict': self.predict, '/optimize': self.optimize}
+        if path not in routes:
+            return 404, {'error': f"Unknown endpoint {path}; use one of {sorted(routes)}."}
+        if payload is not None and not isinstance(payload, dict):
+            return 400, {'error': f"The request body must be a JSON object, not {type(payload).__name__}."}
+        start = time.perf_counter()
+        try:
+            response = routes[path](self.current(), payload or {})
+        except RequestError as error:
+            return 400, {'error': str(error)}
+        except Exception as error:
+            # Anything else is a server-side failure; answer it rather than dropping the connection
+            logging.exception(f"Request to {path} failed")
+            return 500, {'error': f"{type(error).__name__}: {error}"}
+        return 200, {**response, 'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    def health(self, snapshot, payload):
+        return {'version': snapshot.version, 'players': len(snapshot.players), 'predictions': snapshot.predictor is not None,
+                'cache': {'size': len(self.cache.entries), 'hits': self.cache.hits, 'misses': self.cache.misses}}
+
+    def adjust(self, snapshot, payload):
+        """Adjusted FPT for every player (or the listed 'players'), from 'base_column' (default the adjust script's)."""
+        base_column = payload.get('base_column', adjustment_base_column)
+        if not isinstance(base_column, str) or base_column not in snapshot.players.columns:
+            raise RequestError(f"Unknown base column {base_column!r}.")
+        if not pd.api.types.is_numeric_dtype(snapshot.players[base_column]):
+            raise RequestError(f"Base column {base_column} is not a numeric column.")
+        names = name_list(payload, 'players')
+
+        def compute():
+            players = snapshot.players
+            if names:
+                players = players[players['Player'].isin(names)]
+            table = players.assign(Adjusted_FPT=adjusted_fpt(players, snapshot.defense_data, base_column))
+            return {'version': snapshot.version, 'players': records(table.reindex(columns=player_columns))}
+        return self.cache.get_or_compute((snapshot.version, 'adjust', base_column, names), compute)
+
+    def predict(self, snapshot, payload):
+        """Predicted FPT for 'scenarios' ([{Player, Upcoming_Opponent, Home_Away}]), or every upcoming fixture."""
+        if snapshot.predictor is None:
+            raise RequestError("No trained model; run euroleague_main_predict.py first.")
+        scenarios = payload.get('scenarios')
+        if scenarios is None:
+            return {'version': snapshot.version, 'players': records(snapshot.players.dropna(subset=['Predicted_FPT'])
+                                                                      [['Player', 'Pos', 'Team', 'Upcoming_Opponent', 'Home_Away', 'Predicted_FPT']])}
+        scenario_keys = ('Player', 'Upcoming_Opponent', 'Home_Away')
+        if not isinstance(scenarios, list) or not all(
+                isinstance(row, dict) and all(isinstance(row.get(name), str) for name in scenario_keys) for row in scenarios):
+            raise RequestError(f"scenarios must be a list of objects with string fields {list(scenario_keys)}.")
+        key = tuple(tuple(row[name] for name in scenario_keys) for row in scenarios)
+        unknown = sorted({player for player, _, _ in key} - set(snapshot.predictor.players.index))
+        if unknown:
+            raise RequestError(f"Unknown players in scenarios: {unknown}")
+
+        def compute():
+            players, opponents, home_away = zip(*key) if key else ((), (), ())
+            return {'version': snapshot.version, 'players': records(snapshot.predictor.predict_matchups(players, opponents, home_away))}
+        return self.cache.get_or_compute((snapshot.version, 'predict', key), compute)
+
+    def optimize(self, snapshot, payload):
+        """Best lineups under the Constraints fields in the payload, among available players.
+
+        'exclude' lists players to leave out and 'deltas' changes players'
+        values, credits or availability for this query only (answered by a
+        warm OptimizerSession); all other keys are Constraints fields
+        (objective, credit_limit, max_lineups, roster, max_transfers, ...).
+        """
+        exclude = tuple(sorted(name_list(payload, 'exclude')))
+        constraints = constraints_from_request({name: value for name, value in payload.items() if name not in ('exclude', 'deltas')},
+                                               snapshot.players)
+        delta_key = deltas_from_request(payload.get('deltas', []), constraints)
+        pool = optimize_pool(snapshot.players, constraints, exclude)
+        deltas = [dict(delta) for delta in delta_key]
+        try:
+            player_rows(pool, [delta_player(delta) for delta in deltas])
+        except ValueError as error:
+            raise RequestError(str(error))
+
+        def compute():
+            if not deltas:
+                results = optimize(pool, constraints)
+            else:
+                changed = pool_with_deltas(pool, deltas, constraints.objective)
+                needed = changed.index[dominance_mask(changed, constraints.objective, constraints.slots,
+                                                      constraints.max_players_per_team, constraints.max_lineups)]
+                session, lock = self.sessions.get_or_compute((snapshot.version, constraints, exclude),
+                                                             lambda: (new_session(pool, constraints), threading.Lock()))
+                if session.covers(needed):
+                    # The session is shared, so a query's deltas are applied and undone under its lock
+                    with lock:
+                        results = lineup_results(session, session.scenario(deltas))
+                else:
+                    results = optimize(changed.reset_index(drop=True), constraints)
+            lineups = []
+            for result in results:
+                lineup = pd.DataFrame([tuple(player) for player in result.players], columns=pool.columns)
+                lineups.append({'rank': result.rank, 'value': result.value, 'credits': result.credits,
+                                'transfers_out': list(result.transfers_out), 'transfers_in': list(result.transfers_in),
+                                'players': records(lineup.reindex(columns=player_columns))})
+            return {'version': snapshot.version, 'lineups': lineups}
+        return self.cache.get_or_compute((snapshot.version, constraints, exclude, delta_key), compute)
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP: GET /health, POST /adjust, /predict and /optimize with a JSON body."""
+    service = None
+
+    def do_GET(self):
+        self.respond(*self.service.handle(self.path, {}))
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as error:
+            self.respond(400, {'error': f"Invalid JSON body: {error}"})
+            return
+        self.respond(*self.service.handle(self.path, payload))
+
+    def respond(self, status, response):
+        body = json.dumps(response, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+def make_server(service, host=host, port=port):
+    handler = type('BoundServiceHandler', (ServiceHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+def request(path, payload=None, host=host, port=port, timeout=600):
+    """Local client: (status, response dict) for one call; POSTs when a payload is given."""
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        if payload is None:
+            connection.request('GET', path)
+        else:
+            connection.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve adjust/predict/optimize queries from warm in-memory data.")
+    parser.add_argument('--host', default=host, help="Address to bind; keep it local")
+    parser.add_argument('--port', type=int, default=port)
+    parser.add_argument('--cache-size', type=int, default=cache_size, help="Responses kept in the LRU cache")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_profiling(args)
+
+    service = LineupService(args.cache_size)
+    service.current()
+    server = make_server(service, args.host, args.port)
+    logging.info(f"Serving on http://{args.host}:{args.port} (GET /health, POST /adjust, /predict, /optimize)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopping the service.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
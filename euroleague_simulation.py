@@ -0,0 +1,104 @@
+import logging
+from glob import glob
+import numpy as np
+import pandas as pd
+
+from euroleague_form import form_keys
+from euroleague_optimizer import player_rows
+from euroleague_profiling import profile_stage
+
+# File paths and configurations
+player_data_path = "euroleague_data_players_week_*.xlsx"
+n_scenarios = 20000
+min_games = 3
+percentiles = [10, 50, 90]
+
+def load_weekly_history(path=player_data_path):
+    """Long-format (Player, Pos, Team, Week, FPT) table from the weekly player files."""
+    logging.info("Loading weekly FPT history...")
+    frames = []
+    for file in glob(path):
+        week = int(file.split('_')[-1].split('.')[0])
+        df = pd.read_excel(file, usecols=['Player', 'Pos', 'Team', 'FPT'])
+        df['Week'] = week
+        frames.append(df)
+    history = pd.concat(frames, ignore_index=True)
+    history['FPT'] = pd.to_numeric(history['FPT'], errors='coerce')
+    return history.dropna(subset=['FPT'])
+
+def fit_player_distributions(history, players, center_column='FPT'):
+    """Fits a normal FPT distribution per player in `players`.
+
+    The mean is the player's point estimate in `center_column` (so the
+    simulation agrees with the optimizer objective); the spread is the
+    player's weekly FPT standard deviation, shrunk towards the position-wide
+    standard deviation when fewer than `min_games` weeks are on record.
+    Histories are keyed by name and team, as the form is, so a traded or
+    same-named player is not pooled with another one's games. Players
+    without history (e.g. coaches) get the pooled standard deviation.
+    """
+    stats = history.groupby(form_keys)['FPT'].agg(['std', 'count'])
+    position_std = history.groupby('Pos')['FPT'].std()
+    pooled_std = history['FPT'].std()
+
+    players = players.drop_duplicates(form_keys).reset_index(drop=True)
+    player_stats = stats.reindex(pd.MultiIndex.from_frame(players[form_keys]))
+    games = player_stats['count'].fillna(0).to_numpy()
+    prior_std = players['Pos'].map(position_std).fillna(pooled_std).to_numpy()
+    own_std = np.nan_to_num(player_stats['std'].to_numpy(), nan=0.0)
+    weight = np.clip(games / min_games, 0, 1)
+    std = weight * own_std + (1 - weight) * prior_std
+
+    return pd.DataFrame({
+        'Player': players['Player'],
+        'Team': players['Team'],
+        'Pos': players['Pos'],
+        'Mean': pd.to_numeric(players[center_column], errors='coerce').to_numpy(),
+        'Std': std,
+        'Games': games.astype(int),
+    })
+
+def sample_outcomes(distributions, n_scenarios=n_scenarios, seed=None):
+    """Draws a (players x scenarios) float32 matrix of FPT outcomes."""
+    rng = np.random.default_rng(seed)
+    means = distributions['Mean'].to_numpy(dtype=np.float32)[:, None]
+    stds = distributions['Std'].to_numpy(dtype=np.float32)[:, None]
+    noise = rng.standard_normal((len(distributions), n_scenarios), dtype=np.float32)
+    return means + stds * noise
+
+def lineup_matrix(lineups, distributions):
+    """Incidence matrix (lineups x players) for lineups given as player rows (matched on Player and Team) or names."""
+    matrix = np.zeros((len(lineups), len(distributions)), dtype=np.float32)
+    for row, lineup in enumerate(lineups):
+        entries = [(player.Player, player.Team) if hasattr(player, 'Team') else getattr(player, 'Player', player)
+                   for player in lineup]
+        matrix[row, player_rows(distributions, entries)] = 1
+    return matrix
+
+def score_lineups(lineups, distributions, outcomes, threshold=None):
+    """Scores every lineup against every scenario at once.
+
+    Returns expected value, standard deviation, percentiles and, when a
+    threshold is given, the probability of beating it.
+    """
+    totals = lineup_matrix(lineups, distributions) @ outcomes
+    result = pd.DataFrame({
+        'Lineup': np.arange(1, len(lineups) + 1),
+        'Expected_FPT': totals.mean(axis=1),
+        'Std_FPT': totals.std(axis=1),
+    })
+    for q, values in zip(percentiles, np.percentile(totals, percentiles, axis=1)):
+        result[f'P{q}_FPT'] = values
+    if threshold is not None:
+        result[f'P_beat_{threshold}'] = (totals > threshold).mean(axis=1)
+    return result
+
+@profile_stage()
+def simulate_lineups(lineups, players, center_column='FPT', threshold=None, n_scenarios=n_scenarios, seed=None, history=None):
+    """Fits distributions, samples scenarios and scores `lineups` in one call."""
+    if history is None:
+        history = load_weekly_history()
+    distributions = fit_player_distributions(history, players, center_column)
+    outcomes = sample_outcomes(distributions, n_scenarios, seed)
+    logging.info(f"Simulating {len(lineups)} lineups over {n_scenarios} scenarios...")
+    return score_lineups(lineups, distributions, outcomes, threshold)
@@ -0,0 +1,124 @@
+import logging
+import os
+import pickle
+import pandas as pd
+
+from euroleague_profiling import profile_stage
+
+# File paths
+data_file = "euroleague_data_players_week_10.xlsx"
+avg_data_file = "euroleague_data_players_average.xlsx"
+coach_data_file = "coach.xlsx"
+store_file = "euroleague_player_store.pkl"
+
+# Team mapping
+data_mapping = {
+    "FC Bayern Munich": "BAY", "FC Barcelona": "BAR", "Zalgiris Kaunas": "ZAL",
+    "Panathinaikos AKTOR Athens": "PAO", "Real Madrid": "RMB", "ALBA Berlin": "BER",
+    "EA7 Emporio Armani Milan": "EA7", "Maccabi Playtika Tel Aviv": "MTA",
+    "Olympiacos Piraeus": "OLY", "Baskonia Vitoria-Gasteiz": "BKN",
+    "Crvena Zvezda Meridianbet Belgrade": "CZV", "Partizan Mozzart Bet Belgrade": "PAR",
+    "AS Monaco": "ASM", "LDLC ASVEL Villeurbanne": "ASV", "Anadolu Efes Istanbul": "EFS",
+    "Paris Basketball": "PBB", "Virtus Segafredo Bologna": "VIR", "Fenerbahce Beko Istanbul": "FBB"
+}
+
+# coach.xlsx column names in the player schema
+coach_columns = {'coach_name': 'Player', 'team_name': 'Team', 'fantasy_pts': 'FPT', 'quotation': 'CR', 'avg_fpt': 'avg_FPT'}
+
+# Player schema shared by players and coaches; extra source columns are kept after these
+store_columns = ['Player', 'Pos', 'Team', 'FPT', 'CR', 'PLUS', 'Upcoming_Opponent', 'Home_Away',
+                 'avg_FPT', 'avg_PLUS', 'avg_CR', 'PLAYS']
+numeric_columns = ['FPT', 'CR', 'avg_FPT', 'avg_CR']
+average_columns = {'FPT': 'avg_FPT', 'CR': 'avg_CR', 'PLUS': 'avg_PLUS'}
+
+def read_coaches(path=coach_data_file):
+    """Coach rows renamed to the player schema, as position 'HC'."""
+    coach_df = pd.read_excel(path).rename(columns=coach_columns)
+    coach_df['Pos'] = 'HC'
+    return coach_df
+
+def merge_averages(df, avg_df):
+    """Adds avg_FPT/avg_CR/avg_PLUS from the season averages table.
+
+    Weekly files may already carry avg_* columns; values from the averages
+    table take precedence and the existing ones fill its gaps, so the merge
+    never produces avg_FPT_x/avg_FPT_y duplicates.
+    """
+    avg_df = avg_df.rename(columns=average_columns)
+    avg_df = avg_df[['Player', 'Pos', 'Team'] + [col for col in average_columns.values() if col in avg_df.columns]]
+    avg_df = avg_df.drop_duplicates(subset=['Player', 'Pos', 'Team'])
+    merged = df.merge(avg_df, on=['Player', 'Pos', 'Team'], how='left', suffixes=('_old', ''))
+    for col in average_columns.values():
+        if f'{col}_old' in merged.columns:
+            merged[col] = merged[col].combine_first(merged.pop(f'{col}_old'))
+    return merged
+
+def fill_coach_fixtures(df):
+    """Coaches take the upcoming opponent and venue of their team's players."""
+    is_coach = df['Pos'] == 'HC'
+    fixtures = df.loc[~is_coach, ['Team', 'Upcoming_Opponent', 'Home_Away']].dropna().drop_duplicates('Team').set_index('Team')
+    for col in ['Upcoming_Opponent', 'Home_Away']:
+        df.loc[is_coach, col] = df.loc[is_coach, col].fillna(df.loc[is_coach, 'Team'].map(fixtures[col]))
+    return df
+
+def type_store(df):
+    """Applies the shared schema: team abbreviations, float credits/points and an int PLAYS flag."""
+    df = df.reindex(columns=store_columns + [col for col in df.columns if col not in store_columns])
+    df['Team'] = df['Team'].map(data_mapping).fillna(df['Team'])
+    for col in numeric_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    df['PLAYS'] = pd.to_numeric(df['PLAYS'], errors='coerce').fillna(1).astype('int64')
+    for col in ['Player', 'Pos', 'Team', 'PLUS', 'Upcoming_Opponent', 'Home_Away', 'avg_PLUS']:
+        df[col] = df[col].astype(object)
+    return df
+
+@profile_stage()
+def build_player_store(data_file=data_file, avg_data_file=avg_data_file, coach_data_file=coach_data_file):
+    """Reads players, season averages and coaches into one typed table."""
+    if not os.path.exists(data_file):
+        raise FileNotFoundError("Player data file is missing.")
+    df = pd.read_excel(data_file)
+    frames = [df]
+    if os.path.exists(coach_data_file):
+        frames.append(read_coaches(coach_data_file))
+        logging.info("Coach data added to player data.")
+    df = type_store(pd.concat(frames, ignore_index=True))
+    if avg_data_file and os.path.exists(avg_data_file):
+        avg_df = pd.read_excel(avg_data_file)
+        avg_df['Team'] = avg_df['Team'].map(data_mapping).fillna(avg_df['Team'])
+        df = type_store(merge_averages(df, avg_df))
+    return fill_coach_fixtures(df)
+
+def save_pickle(obj, path):
+    """Pickles to a temporary file first, so a reader never sees a half-written file."""
+    with open(f"{path}.tmp", 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(f"{path}.tmp", path)
+
+def source_stamp(paths):
+    return {path: os.path.getmtime(path) for path in paths if path and os.path.exists(path)}
+
+def load_player_store(data_file=data_file, avg_data_file=avg_data_file, coach_data_file=coach_data_file, path=store_file):
+    """The typed player + coach table, rebuilt only when one of its source files changed.
+
+    The store keeps one entry per combination of source files, so scripts
+    reading different inputs do not invalidate each other.
+    """
+    key = (data_file, avg_data_file, coach_data_file)
+    stamp = source_stamp(key)
+    entries = {}
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            entries = pickle.load(f)
+        if key in entries and entries[key]['sources'] == stamp:
+            logging.info(f"Loaded player store from {path} ({len(entries[key]['players'])} rows).")
+            return entries[key]['players']
+    df = build_player_store(data_file, avg_data_file, coach_data_file)
+    entries[key] = {'sources': stamp, 'players': df}
+    save_pickle(entries, path)
+    logging.info(f"Built player store with {len(df)} rows ({(df['Pos'] == 'HC').sum()} coaches) and saved it to {path}.")
+    return df
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_player_store()
@@ -0,0 +1,105 @@
+import logging
+import concurrent.futures
+from itertools import product
+import numpy as np
+import pandas as pd
+
+from euroleague_availability import apply_availability
+from euroleague_optimizer import LineupSearch, TableCache, positions_needed
+from euroleague_profiling import configure_profiling, profile_stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# File paths
+data_file = "euroleague_data_players_filtered_adjusted_average.xlsx"
+output_file = "euroleague_sweep_results.xlsx"
+
+# Objective and the columns the filters key on
+objective = 'Adjusted_FPT'
+ratio_column = 'Adj_FPT/CR'
+
+# Parameter grids
+sweep_grid = {
+    'min_fpt': [8, 10, 12],
+    'player_ratio_threshold': [0.5, 0.8],
+    'coach_ratio_threshold': [0.2, 0.3],
+    'top_n_per_position': [8, 10, 12],
+    'credit_limit': [97.5, 100, 103.6],
+}
+top_n_per_position_coach = 5
+max_players_per_team = 11
+
+@profile_stage()
+def load_data():
+    """Loads and scores the player table once for every grid point."""
+    df = pd.read_excel(data_file)
+    df = apply_availability(df)
+    df['CR'] = pd.to_numeric(df['CR'], errors='coerce')
+    df[objective] = pd.to_numeric(df[objective], errors='coerce')
+    df[ratio_column] = df[objective] / df['CR']
+    return df.dropna(subset=['CR', objective]).reset_index(drop=True)
+
+def selection_mask(df, min_fpt, player_ratio_threshold, coach_ratio_threshold, top_n_per_position):
+    """Same filters as filter_players + select_top_players, as a row mask over the shared table."""
+    is_coach = df['Pos'] == 'HC'
+    passes = (df[objective] >= min_fpt) & (df['CR'] >= 4) & (
+        (~is_coach & (df[ratio_column] > player_ratio_threshold)) | (is_coach & (df[ratio_column] > coach_ratio_threshold)))
+    selected = np.zeros(len(df), dtype=bool)
+    for pos in positions_needed:
+        top_n = top_n_per_position_coach if pos == 'HC' else top_n_per_position
+        candidates = df[passes & (df['Pos'] == pos)].nlargest(top_n, ratio_column)
+        selected[candidates.index] = True
+    return selected
+
+def solve_pool(df, selected, credit_limits, table_cache):
+    """One search per distinct pool; every credit limit reuses its tables."""
+    search = LineupSearch(df, objective, max(credit_limits), positions_needed, max_players_per_team,
+                          eligible=selected, table_cache=table_cache)
+    results = {}
+    for credit_limit in credit_limits:
+        best = search.top_k(1, budget=credit_limit)
+        results[credit_limit] = best[0] if best else None
+    return results
+
+@profile_stage()
+def run_sweep(df, grid=sweep_grid, max_workers=None):
+    """Solves every grid point and returns one comparison row per setting."""
+    filter_keys = [key for key in grid if key != 'credit_limit']
+    credit_limits = list(grid['credit_limit'])
+
+    # Grid points that select the same players share one search
+    pools = {}
+    for values in product(*(grid[key] for key in filter_keys)):
+        settings = dict(zip(filter_keys, values))
+        selected = selection_mask(df, **settings)
+        pools.setdefault(tuple(np.flatnonzero(selected)), (selected, []))[1].append(settings)
+    logging.info(f"Sweeping {len(pools)} distinct pools x {len(credit_limits)} credit limits...")
+
+    # Pools that share a position or half are solved on different threads; the cache builds each table once
+    table_cache = TableCache()
+    rows = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(solve_pool, df, selected, credit_limits, table_cache): settings_list
+            for selected, settings_list in pools.values()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            for credit_limit, best in future.result().items():
+                for settings in futures[future]:
+                    row = {**settings, 'credit_limit': credit_limit, f'Total {objective}': np.nan, 'Total CR': np.nan, 'Lineup': ''}
+                    if best is not None:
+                        value, members = best
+                        row[f'Total {objective}'] = round(value, 2)
+                        row['Total CR'] = round(df['CR'].to_numpy()[members].sum(), 1)
+                        row['Lineup'] = ', '.join(df['Player'].to_numpy()[members])
+                    rows.append(row)
+    return pd.DataFrame(rows).sort_values(filter_keys + ['credit_limit']).reset_index(drop=True)
+
+if __name__ == "__main__":
+    configure_profiling()
+    df = load_data()
+    results = run_sweep(df)
+    logging.info(f"Saving sweep comparison table to {output_file}")
+    results.to_excel(output_file, index=False)
+    logging.info(f"\n{results.drop(columns=['Lineup']).to_string(index=False)}")
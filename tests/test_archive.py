@@ -0,0 +1,94 @@
+import pandas as pd
+from selenium.common.exceptions import StaleElementReferenceException
+
+import euroleague_data_load
+from euroleague_archive import save_page
+from euroleague_fetch import parse_archive
+from euroleague_fetch_mock import render_stats_page
+from euroleague_partitions import Partition
+
+class FakeElement:
+    """Just enough of a WebElement for scrape(): text, child lookups, clicks and staleness."""
+
+    def __init__(self, driver, text='', cells=None):
+        self.driver = driver
+        self.page = driver.page
+        self.text = text
+        self.cells = cells or {}
+
+    def find_element(self, by, selector):
+        return FakeElement(self.driver, self.cells[selector])
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        if self.page != self.driver.page:
+            raise StaleElementReferenceException("page changed")
+        return True
+
+    def click(self):
+        self.driver.page += 1
+
+class FakeDriver:
+    """Serves a table as rendered pages of rows, the way the stats iframe paginates it."""
+
+    def __init__(self, df, rows_per_page):
+        self.df = df
+        self.rows_per_page = rows_per_page
+        self.page = 0
+
+    @property
+    def number_of_pages(self):
+        return -(-len(self.df) // self.rows_per_page)
+
+    @property
+    def page_source(self):
+        return render_stats_page(self.df, self.page + 1, self.rows_per_page)
+
+    def get(self, url):
+        self.page = 0
+
+    def find_element(self, by, selector):
+        return FakeElement(self, str(self.number_of_pages))
+
+    def find_elements(self, by, selector):
+        rows = self.df.iloc[self.page * self.rows_per_page:(self.page + 1) * self.rows_per_page]
+        return [FakeElement(self, cells={
+            ".table__col--player-link": row.Player, "td[data-sort-by='position']": row.Pos,
+            "td[data-sort-by='team']": row.Team, "td[data-sort-by='pdk']": str(row.FPT),
+            "td[data-sort-by='cr']": str(row.CR), "td[data-sort-by='plus']": row.PLUS,
+        }) for row in rows.itertuples(index=False)]
+
+def test_scraped_pages_round_trip_as_weekly_tables(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    partition = Partition('euroleague', 99)
+    monkeypatch.setattr(euroleague_data_load, 'partition', partition)
+    week = pd.DataFrame({
+        'Player': [f'Player {i}' for i in range(7)], 'Pos': ['G', 'F', 'C', 'G', 'F', 'C', 'G'],
+        'Team': ['BAR'] * 4 + ['OLY'] * 3, 'FPT': [10.5, 3.0, 22.1, 0.0, 7.2, 15.0, 9.9],
+        'CR': [12.0, 6.5, 14.0, 4.0, 8.0, 11.5, 9.0], 'PLUS': ['+1.2', '-0.5', '+2.0', '0', '+0.1', '-1.1', '+0.4'],
+    })
+
+    euroleague_data_load.scrape(FakeDriver(week, rows_per_page=3), 4)
+    weekly, average = parse_archive(partition, max_workers=1)
+
+    assert list(weekly) == [4]
+    assert average is None
+    parsed = weekly[4]
+    assert parsed['Player'].tolist() == week['Player'].tolist()
+    assert parsed['FPT'].astype(float).tolist() == week['FPT'].tolist()
+    assert parsed['PLUS'].tolist() == week['PLUS'].tolist()
+
+def test_season_average_is_not_taken_from_a_single_week(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    partition = Partition('euroleague', 98)
+    table = pd.DataFrame({'Player': ['A'], 'Pos': ['G'], 'Team': ['BAR'], 'FPT': [5.0], 'CR': [5.0], 'PLUS': ['+0']})
+    for week in [1, 2]:
+        save_page(render_stats_page(table.assign(FPT=float(week)), 1), partition, [week], 'avg', 1)
+    save_page(render_stats_page(table.assign(FPT=1.5), 1), partition, [1, 2], 'avg', 1)
+
+    weekly, average = parse_archive(partition, max_workers=1)
+
+    assert sorted(weekly) == [1, 2]
+    assert average['FPT'].astype(float).tolist() == [1.5]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from euroleague_defense import add_week, defense_tables_from_state, empty_state, refresh_defense_state, team_names
+
+teams = ['BAR', 'OLY', 'RMB', 'PAO']
+
+def make_weeks(n_weeks=8, seed=0):
+    """Weekly tables with DNP rows (0 FPT), rotating fixtures and a player missing from some weeks."""
+    rng = np.random.default_rng(seed)
+    weeks = {}
+    for week in range(1, n_weeks + 1):
+        shift = week % (len(teams) - 1) + 1
+        opponents = {team: teams[(i + shift) % len(teams)] for i, team in enumerate(teams)}
+        rows = [(f'{team} {pos}{i}', pos, team, round(float(rng.gamma(3.0, 4.0)), 1) if rng.random() > 0.2 else 0.0, opponents[team])
+                for team in teams for pos in ['G', 'F', 'C'] for i in range(2) if rng.random() > 0.1]
+        weeks[week] = pd.DataFrame(rows, columns=['Player', 'Pos', 'Team', 'FPT', 'Upcoming_Opponent'])
+    return weeks
+
+def batch_averages(weeks):
+    """Average FPT allowed per (team name, position) over the whole season in one groupby."""
+    history = pd.concat([df.assign(Week=week) for week, df in weeks.items()], ignore_index=True)
+    fixtures = history.drop_duplicates(['Week', 'Team'])[['Week', 'Team', 'Upcoming_Opponent']].assign(Week=lambda df: df['Week'] + 1)
+    played = history[history['FPT'] != 0].drop(columns='Upcoming_Opponent').merge(fixtures, on=['Week', 'Team'])
+    averages = played.groupby(['Upcoming_Opponent', 'Pos'])['FPT'].mean().round(1)
+    return {(team_names.get(team, team), pos): value for (team, pos), value in averages.items()}
+
+def table_averages(tables):
+    positions = {'Guards': 'G', 'Forwards': 'F', 'Centers': 'C'}
+    return {(team, positions[sheet]): value for sheet, table in tables.items() for team, value in zip(table['Team Name'], table['Average'])}
+
+def write_weeks(directory, weeks):
+    for week, df in weeks.items():
+        df.to_excel(directory / f'euroleague_data_players_week_{week}.xlsx', index=False)
+
+def test_incremental_weeks_match_a_batch_rebuild(tmp_path):
+    weeks = make_weeks()
+    pattern, state_file = str(tmp_path / 'euroleague_data_players_week_*.xlsx'), str(tmp_path / 'defense.pkl')
+    write_weeks(tmp_path, {week: df for week, df in weeks.items() if week <= 5})
+    refresh_defense_state(pattern, state_file)
+    write_weeks(tmp_path, {week: df for week, df in weeks.items() if week > 5})
+    incremental = refresh_defense_state(pattern, state_file)
+
+    assert sorted(incremental['sources']) == list(weeks)
+    assert table_averages(defense_tables_from_state(incremental)) == pytest.approx(batch_averages(weeks))
+
+def test_add_week_matches_the_batch_averages_in_memory():
+    weeks = make_weeks(seed=1)
+    state = empty_state()
+    for week, df in weeks.items():
+        state = add_week(state, week, df)
+    assert table_averages(defense_tables_from_state(state)) == pytest.approx(batch_averages(weeks))
+    assert state['totals']['Count'].sum() == sum((df['FPT'] != 0).sum() for week, df in weeks.items() if week > 1)
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import pandas as pd
+import pytest
+
+import euroleague_fetch
+from euroleague_archive import page_file_name
+from euroleague_fetch import fetch_season
+from euroleague_fetch_mock import MockDunkestServer, render_stats_page, rows_per_page
+
+def make_table(n, fpt_offset=0.0):
+    return pd.DataFrame({
+        'Player': [f'Player {i}' for i in range(n)], 'Pos': [['G', 'F', 'C'][i % 3] for i in range(n)],
+        'Team': [['BAR', 'OLY', 'RMB'][i % 3] for i in range(n)], 'FPT': [fpt_offset + i / 2 for i in range(n)],
+        'CR': [4.0 + i % 20 for i in range(n)], 'PLUS': [f'+{i % 4}.0' for i in range(n)],
+    })
+
+def record(pages_dir, df, stats_type, weeks):
+    """Writes the table as the recorded pages the mock serves; returns the page count."""
+    number_of_pages = -(-len(df) // rows_per_page)
+    for page in range(1, number_of_pages + 1):
+        with open(os.path.join(pages_dir, page_file_name(stats_type, weeks, page)), 'w', encoding='utf-8') as f:
+            f.write(render_stats_page(df, page))
+    return number_of_pages
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(euroleague_fetch, 'backoff_base', 0.001)
+
+def assert_same_table(parsed, expected):
+    assert parsed['Player'].tolist() == expected['Player'].tolist()
+    assert parsed['FPT'].tolist() == expected['FPT'].tolist()
+    assert parsed['CR'].tolist() == expected['CR'].tolist()
+    assert parsed['PLUS'].tolist() == expected['PLUS'].tolist()
+    assert parsed['FPT'].dtype == 'float64' and parsed['CR'].dtype == 'float64'
+
+def test_injected_failures_are_retried(tmp_path):
+    table = make_table(10)
+    pages = record(tmp_path, table, 'tot', [1])
+
+    with MockDunkestServer(str(tmp_path), failures=2) as server:
+        weekly, average = asyncio.run(fetch_season([1], include_average=False, base_url=server.url, archive=False))
+
+    assert average is None
+    assert_same_table(weekly[1], table)
+    assert server.request_count == pages + 2
+
+def test_every_page_is_fetched_in_order(tmp_path):
+    table = make_table(2 * rows_per_page + 7)
+    pages = record(tmp_path, table, 'tot', [3])
+
+    with MockDunkestServer(str(tmp_path)) as server:
+        weekly, _ = asyncio.run(fetch_season([3], include_average=False, base_url=server.url, archive=False))
+
+    assert pages == 3
+    assert_same_table(weekly[3], table)
+    assert server.request_count == pages
+
+def test_weekly_and_average_tables_come_from_one_session(tmp_path):
+    weeks = {1: make_table(30), 2: make_table(30, fpt_offset=1.0)}
+    requests = sum(record(tmp_path, df, 'tot', [week]) for week, df in weeks.items())
+    average = make_table(30, fpt_offset=0.5)
+    requests += record(tmp_path, average, 'avg', [1, 2])
+
+    with MockDunkestServer(str(tmp_path), failures=1) as server:
+        weekly, parsed_average = asyncio.run(fetch_season([1, 2], base_url=server.url, archive=False))
+
+    assert sorted(weekly) == [1, 2]
+    for week, df in weeks.items():
+        assert_same_table(weekly[week], df)
+    assert_same_table(parsed_average, average)
+    assert server.request_count == requests + 1
+
+def test_unrecorded_weeks_are_rendered_from_the_week_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    table = make_table(12)
+    table.to_excel('euroleague_data_players_week_5.xlsx', index=False)
+
+    with MockDunkestServer(str(tmp_path / 'missing')) as server:
+        weekly, _ = asyncio.run(fetch_season([5], include_average=False, base_url=server.url, archive=False))
+
+    # PLUS does not survive the Excel round trip as text, so only the typed columns are compared
+    assert_same_table(weekly[5], table.assign(PLUS=weekly[5]['PLUS']))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import euroleague_form
+from euroleague_form import add_week, empty_state, form_columns, form_keys, load_form_features, rolling_form
+
+original_read = euroleague_form.read_week
+
+def make_weeks(n_weeks=8, seed=0):
+    """Weekly tables with DNP weeks (0 FPT), players missing from some weeks and one name on two teams."""
+    rng = np.random.default_rng(seed)
+    players = [(f'Player {i}', ['BAR', 'OLY', 'RMB'][i % 3]) for i in range(12)] + [('Player 0', 'PAO')]
+    weeks = {}
+    for week in range(1, n_weeks + 1):
+        rows = [(name, team, round(float(rng.gamma(3.0, 4.0)), 1) if rng.random() > 0.2 else 0.0)
+                for name, team in players if rng.random() > 0.15]
+        weeks[week] = pd.DataFrame(rows, columns=['Player', 'Team', 'FPT']).assign(Pos='G')
+    return weeks
+
+def write_weeks(directory, weeks):
+    for week, df in weeks.items():
+        df.to_excel(directory / f'euroleague_data_players_week_{week}.xlsx', index=False)
+
+def sorted_form(form):
+    return form.sort_values(form_keys + ['Week']).reset_index(drop=True)[form_keys + ['Week', 'Games'] + form_columns]
+
+def test_incremental_weeks_match_a_batch_rebuild(tmp_path, monkeypatch):
+    weeks = make_weeks()
+    write_weeks(tmp_path, {week: df for week, df in weeks.items() if week <= 5})
+    pattern, state_file = str(tmp_path / 'euroleague_data_players_week_*.xlsx'), str(tmp_path / 'form.pkl')
+    load_form_features(pattern, state_file)
+    write_weeks(tmp_path, {week: df for week, df in weeks.items() if week > 5})
+    read = []
+    monkeypatch.setattr(euroleague_form, 'read_week', lambda path, week: read.append(week) or original_read(path, week))
+    incremental = load_form_features(pattern, state_file)
+
+    played = pd.concat([df.assign(Week=week) for week, df in weeks.items()], ignore_index=True)
+    batch = rolling_form(played[played['FPT'] != 0])
+    assert read == [6, 7, 8]
+    pd.testing.assert_frame_equal(sorted_form(incremental), sorted_form(batch), check_dtype=False)
+
+def test_did_not_play_weeks_do_not_count_as_games(tmp_path):
+    weeks = {1: pd.DataFrame({'Player': ['A'], 'Team': ['BAR'], 'FPT': [10.0], 'Pos': ['G']}),
+             2: pd.DataFrame({'Player': ['A'], 'Team': ['BAR'], 'FPT': [0.0], 'Pos': ['G']}),
+             3: pd.DataFrame({'Player': ['A'], 'Team': ['BAR'], 'FPT': [20.0], 'Pos': ['G']})}
+    write_weeks(tmp_path, weeks)
+    form = load_form_features(str(tmp_path / 'euroleague_data_players_week_*.xlsx'), str(tmp_path / 'form.pkl'))
+    assert form['Week'].tolist() == [1, 3]
+    assert form['FPT_last3'].iloc[-1] == 15.0
+
+def test_add_week_matches_rolling_form_in_memory():
+    weeks = make_weeks(seed=1)
+    state = empty_state()
+    for week, df in weeks.items():
+        state = add_week(state, df[df['FPT'] != 0].drop_duplicates(form_keys).assign(Week=week))
+    played = pd.concat([df.assign(Week=week) for week, df in weeks.items()], ignore_index=True)
+    batch = rolling_form(played[played['FPT'] != 0])
+    pd.testing.assert_frame_equal(sorted_form(state['form']), sorted_form(batch), check_dtype=False)
+
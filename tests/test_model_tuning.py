@@ -0,0 +1,25 @@
+import numpy as np
+
+from euroleague_model_tuning import week_folds
+
+def test_two_season_folds_never_train_on_a_later_season():
+    seasons = np.array([16] * 6 + [17] * 6)
+    weeks = np.array([1, 1, 2, 2, 3, 3] * 2)
+
+    folds = week_folds(weeks, min_train_weeks=2, seasons=seasons)
+
+    assert len(folds) == 4
+    for train_idx, test_idx in folds:
+        test_time = set(zip(seasons[test_idx], weeks[test_idx]))
+        assert len(test_time) == 1
+        assert all(point < min(test_time) for point in zip(seasons[train_idx], weeks[train_idx]))
+    # Week 1 of season 17 trains on the whole of season 16 and nothing else
+    train_idx, test_idx = folds[1]
+    assert set(seasons[test_idx]) == {17} and set(weeks[test_idx]) == {1}
+    assert sorted(train_idx) == list(range(6))
+
+def test_single_season_folds_follow_the_weeks():
+    weeks = np.array([1, 2, 3, 4, 4])
+    folds = week_folds(weeks, min_train_weeks=2)
+    assert [list(test) for _, test in folds] == [[2], [3, 4]]
+    assert list(folds[-1][0]) == [0, 1, 2]
@@ -0,0 +1,145 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, combinations, product
+import numpy as np
+import pandas as pd
+import pytest
+
+from euroleague_optimizer import (Constraints, LineupSearch, OptimizerSession, TableCache, TransferSearch, anytime_lineup, dominance_mask,
+                                  pareto_frontier)
+
+def test_anytime_lineup_logs_a_zero_bound():
+    players = pd.DataFrame({
+        'Player': [f'P{i}' for i in range(11)], 'Pos': ['C'] * 2 + ['F'] * 4 + ['G'] * 4 + ['HC'],
+        'Team': ['BAR', 'OLY'] * 5 + ['RMB'], 'CR': [5.0] * 11, 'Adjusted_FPT': [0.0] * 11,
+    })
+    results = anytime_lineup(players, Constraints(credit_limit=100, time_budget_ms=50), seed=1)
+    assert len(results) == 1
+    assert results[0].gap is None
+
+def random_pool(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Player': [f'P{i}' for i in range(n)], 'Pos': rng.choice(['C', 'F', 'G', 'HC'], n, p=[0.2, 0.35, 0.35, 0.1]),
+        'Team': rng.choice(['BAR', 'OLY', 'RMB', 'PAO', 'MTA', 'FBB'], n), 'CR': rng.integers(40, 200, n) / 10,
+        'Adjusted_FPT': rng.gamma(3.0, 4.0, n).round(2),
+    })
+
+@pytest.mark.parametrize('budget_ms', [50, 200])
+def test_anytime_lineup_keeps_to_the_time_budget(budget_ms):
+    players = random_pool(400)
+    start = time.perf_counter()
+    results = anytime_lineup(players, Constraints(credit_limit=100, time_budget_ms=budget_ms), seed=1)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert results and results[0].value <= results[0].bound + 1e-9
+    assert elapsed_ms < budget_ms + 40
+
+@pytest.mark.parametrize('fields', [{'max_lineups': 3}, {'portfolio': True}, {'roster': ('P0',), 'max_transfers': 1}])
+def test_time_budget_rejects_searches_it_cannot_run(fields):
+    with pytest.raises(ValueError):
+        Constraints(time_budget_ms=100, **fields)
+
+def shared_name_pool():
+    """A pool where 'P0' plays for two teams."""
+    players = random_pool(40, seed=3)
+    players.loc[1, 'Player'] = 'P0'
+    players.loc[[0, 1], 'Team'] = ['BAR', 'OLY']
+    return players
+
+def lineup_sets(found):
+    return [(round(value, 6), frozenset(int(member) for member in members)) for value, members in found]
+
+def test_session_updates_the_named_player_of_a_shared_name():
+    players = shared_name_pool()
+    session = OptimizerSession(players, 'Adjusted_FPT', 100, k=3)
+    with pytest.raises(KeyError):
+        session.update_player('P0', 100.0)
+    session.apply([{'Player': 'P0', 'Team': 'OLY', 'Adjusted_FPT': 100.0, 'CR': 4.0}, {'Player': 'P5', 'removed': True}])
+
+    expected = players.copy()
+    expected.loc[1, ['Adjusted_FPT', 'CR']] = [100.0, 4.0]
+    fresh = LineupSearch(expected.drop(index=5), 'Adjusted_FPT', 100).top_k(3)
+    assert [value for value, _ in session._results] == pytest.approx([value for value, _ in fresh])
+    assert session.value[0] == players.loc[0, 'Adjusted_FPT']
+    assert all(1 in members for _, members in session._results)
+
+def test_session_scenario_leaves_the_session_unchanged():
+    players = shared_name_pool()
+    session = OptimizerSession(players, 'Adjusted_FPT', 100, k=2)
+    before = lineup_sets(session.top_k(2))
+    value, cr = session.value.copy(), session.cr.copy()
+
+    found = session.scenario([{'Player': 'P0', 'Team': 'BAR', 'Adjusted_FPT': 200.0}])
+
+    assert all(0 in members for _, members in found)
+    assert lineup_sets(session.top_k(2)) == before
+    assert session.value == pytest.approx(value) and (session.cr == cr).all()
+
+def test_transfer_roster_matches_players_by_team():
+    players = shared_name_pool()
+    lineup = LineupSearch(players, 'Adjusted_FPT', 100).top_k(1)[0][1]
+    roster = list(zip(players['Player'].to_numpy()[lineup], players['Team'].to_numpy()[lineup]))
+    search = TransferSearch(players, roster, 0, 'Adjusted_FPT', 100)
+    assert lineup_sets(search.top_k(1)) == lineup_sets([(search.value[lineup].sum(), lineup)])
+    with pytest.raises(ValueError):
+        TransferSearch(players, ['P0'] + roster[1:], 1, 'Adjusted_FPT', 100)
+
+small_slots = {'C': 1, 'F': 2, 'G': 2, 'HC': 1}
+
+def small_pool(seed):
+    """Few players per position, with tied values and credits, so brute force is cheap."""
+    rng = np.random.default_rng(seed)
+    positions = ['C'] * 6 + ['F'] * 10 + ['G'] * 10 + ['HC'] * 4
+    return pd.DataFrame({
+        'Player': [f'P{i}' for i in range(len(positions))], 'Pos': positions,
+        'Team': rng.choice(['BAR', 'OLY', 'RMB', 'PAO'], len(positions)), 'CR': rng.integers(8, 16, len(positions)) / 2,
+        'Adjusted_FPT': rng.integers(5, 25, len(positions)).astype(float),
+    })
+
+def brute_force_values(players, credit_limit, max_per_team, k):
+    """The k best lineup values over every combination of the pool."""
+    per_position = [list(combinations(np.flatnonzero(players['Pos'].to_numpy() == pos), slots)) for pos, slots in small_slots.items()]
+    value, cr, teams = players['Adjusted_FPT'].to_numpy(), players['CR'].to_numpy(), players['Team'].to_numpy()
+    values = []
+    for parts in product(*per_position):
+        members = list(chain(*parts))
+        if cr[members].sum() <= credit_limit + 1e-9 and max(Counter(teams[members]).values()) <= max_per_team:
+            values.append(value[members].sum())
+    return sorted(values, reverse=True)[:k]
+
+@pytest.mark.parametrize('seed', range(3))
+def test_dominance_pruning_keeps_the_exact_optimum(seed):
+    players, k = small_pool(seed), 2
+    keep = dominance_mask(players, 'Adjusted_FPT', small_slots, max_players_per_team=3, k=k)
+    assert not keep.all()
+    expected = brute_force_values(players, 60, 3, k)
+    assert brute_force_values(players[keep].reset_index(drop=True), 60, 3, k) == pytest.approx(expected)
+    found = LineupSearch(players, 'Adjusted_FPT', 60, small_slots, 3, eligible=keep).top_k(k)
+    assert [value for value, _ in found] == pytest.approx(expected)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_frontier_matches_a_search_per_budget(seed):
+    search = LineupSearch(small_pool(seed), 'Adjusted_FPT', 70, small_slots, 2)
+    frontier = pareto_frontier(search)
+    assert [credits for _, credits, _ in frontier] == sorted({credits for _, credits, _ in frontier})
+    for budget in range(0, 701, 5):
+        best = search.top_k(1, budget=budget / 10)
+        reachable = [value for value, credits, _ in frontier if credits <= budget]
+        assert (max(reachable) if reachable else None) == (pytest.approx(best[0][0]) if best else None)
+
+def test_shared_table_cache_builds_each_table_once_across_threads():
+    players = random_pool(60, seed=4)
+    masks = [np.ones(len(players), dtype=bool)] * 4 + [np.arange(len(players)) % 3 != 0] * 4
+    cache, builds = TableCache(), Counter()
+    original_get = cache.get
+
+    def counting_get(key, build):
+        return original_get(key, lambda: builds.update([key]) or build())
+
+    cache.get = counting_get
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = list(executor.map(lambda mask: LineupSearch(players, 'Adjusted_FPT', 100, eligible=mask, table_cache=cache).top_k(1), masks))
+    assert set(builds.values()) == {1}
+    for mask, result in zip(masks, found):
+        assert lineup_sets(result) == lineup_sets(LineupSearch(players, 'Adjusted_FPT', 100, eligible=mask).top_k(1))
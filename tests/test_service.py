@@ -0,0 +1,116 @@
+import threading
+import pandas as pd
+import pytest
+
+import euroleague_service
+from euroleague_service import LineupService, Snapshot
+
+def make_players():
+    rows = []
+    for pos, count in [('C', 3), ('F', 5), ('G', 5), ('HC', 2)]:
+        for i in range(count):
+            rows.append({'Player': f'{pos} {i}', 'Pos': pos, 'Team': ['BAR', 'OLY', 'RMB'][i % 3], 'CR': 5.0 + i,
+                         'FPT': 10.0 + 2 * i, 'Adjusted_FPT': 11.0 + 2 * i, 'PLAYS': 1,
+                         'Upcoming_Opponent': 'PAO', 'Home_Away': 'home'})
+    return pd.DataFrame(rows)
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(euroleague_service, 'data_version', lambda: 'test')
+    service = LineupService()
+    service.snapshot = Snapshot('test', make_players(), {}, None)
+    return service
+
+def test_optimize_returns_a_full_lineup(service):
+    status, response = service.handle('/optimize', {'credit_limit': 200})
+    assert status == 200
+    assert len(response['lineups'][0]['players']) == 11
+
+def test_list_valued_constraints_are_accepted_and_cached(service):
+    payload = {'credit_limit': 200, 'positions_needed': [['C', 2], ['F', 4], ['G', 4], ['HC', 1]]}
+    assert service.handle('/optimize', payload)[0] == 200
+    assert service.handle('/optimize', payload)[0] == 200
+    assert service.cache.hits == 1
+
+@pytest.mark.parametrize('payload', [
+    {'roster': ['C 0'], 'max_transfers': 1},
+    {'roster': ['Nobody'], 'max_transfers': 1},
+    {'exclude': 'C 0'},
+    {'positions_needed': [['C', 'two']]},
+    {'credit_limit': 'abc'},
+    {'objective': ['FPT']},
+    {'objective': 'Player'},
+    {'objective': 'Missing'},
+    {'bogus': 1},
+])
+def test_bad_optimize_requests_get_400(service, payload):
+    status, response = service.handle('/optimize', payload)
+    assert status == 400
+    assert response['error']
+
+def test_deltas_answer_a_what_if_query_without_changing_the_data(service):
+    plain = service.handle('/optimize', {'credit_limit': 200})[1]['lineups'][0]
+    assert 'C 0' not in [player['Player'] for player in plain['players']]
+    payload = {'credit_limit': 200, 'deltas': [{'Player': 'C 0', 'Adjusted_FPT': 100.0}, {'Player': 'G 4', 'removed': True}]}
+    status, response = service.handle('/optimize', payload)
+    names = [player['Player'] for player in response['lineups'][0]['players']]
+    assert status == 200
+    assert 'C 0' in names and 'G 4' not in names
+    service.cache.clear()
+    assert service.handle('/optimize', {'credit_limit': 200})[1]['lineups'][0]['value'] == plain['value']
+
+def test_deltas_within_the_pruned_pool_are_answered_by_the_session(service):
+    plain = service.handle('/optimize', {'credit_limit': 200})[1]['lineups'][0]
+    member = plain['players'][0]
+    payload = {'credit_limit': 200, 'deltas': [{'Player': member['Player'], 'Team': member['Team'], 'Adjusted_FPT': 50.0}]}
+    status, response = service.handle('/optimize', payload)
+    assert status == 200
+    assert response['lineups'][0]['value'] == pytest.approx(plain['value'] + 50.0 - member['Adjusted_FPT'])
+    assert len(service.sessions.entries) == 1
+
+@pytest.mark.parametrize('deltas', [
+    {'Player': 'C 2'},
+    [{'Player': 'Nobody', 'CR': 5}],
+    [{'Player': 'C 2', 'CR': 'cheap'}],
+    [{'Player': 'C 2', 'Bogus': 1}],
+])
+def test_bad_deltas_get_400(service, deltas):
+    assert service.handle('/optimize', {'credit_limit': 200, 'deltas': deltas})[0] == 400
+
+@pytest.mark.parametrize('payload', [[1], "x", 3])
+def test_non_object_bodies_get_400(service, payload):
+    status, response = service.handle('/optimize', payload)
+    assert status == 400
+    assert 'JSON object' in response['error']
+
+def test_bad_adjust_and_predict_requests_get_400(service):
+    assert service.handle('/adjust', {'players': 'C 0'})[0] == 400
+    assert service.handle('/adjust', {'base_column': 'Player'})[0] == 400
+    assert service.handle('/predict', {'scenarios': [{'Player': 'C 0'}]})[0] == 400
+
+def test_server_failures_get_500(service, monkeypatch):
+    def out_of_memory(players, constraints):
+        raise MemoryError()
+    monkeypatch.setattr(euroleague_service, 'optimize', out_of_memory)
+    status, response = service.handle('/optimize', {'credit_limit': 200})
+    assert status == 500
+    assert 'MemoryError' in response['error']
+
+def test_stale_snapshot_is_a_server_error(service):
+    service.snapshot = Snapshot('test', make_players().drop(columns='Adjusted_FPT'), {}, None)
+    assert service.handle('/optimize', {'credit_limit': 200})[0] == 500
+
+def test_bad_requests_are_answered_over_http(service):
+    server = euroleague_service.make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        assert euroleague_service.request('/optimize', {'credit_limit': 'abc'}, port=port)[0] == 400
+        assert euroleague_service.request('/optimize', {'roster': ['C 0'], 'max_transfers': 1}, port=port)[0] == 400
+        assert euroleague_service.request('/optimize', [1], port=port)[0] == 400
+        assert euroleague_service.request('/optimize', "x", port=port)[0] == 400
+        assert euroleague_service.request('/health', port=port)[0] == 200
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,35 @@
+from collections import namedtuple
+import pandas as pd
+import pytest
+
+from euroleague_simulation import fit_player_distributions, sample_outcomes, score_lineups
+
+Player = namedtuple('Player', ['Player', 'Team'])
+
+def make_history():
+    """'D. Hall' on two teams: a steady one at BAR and a volatile one at OLY."""
+    rows = [('D. Hall', 'G', 'BAR', week, 10.0 + (week % 2)) for week in range(1, 7)]
+    rows += [('D. Hall', 'G', 'OLY', week, 30.0 * (week % 2)) for week in range(1, 7)]
+    rows += [('A. Other', 'G', 'BAR', week, 12.0) for week in range(1, 7)]
+    return pd.DataFrame(rows, columns=['Player', 'Pos', 'Team', 'Week', 'FPT'])
+
+def test_same_named_players_get_their_own_spread():
+    history = make_history()
+    players = pd.DataFrame({'Player': ['D. Hall', 'D. Hall'], 'Pos': ['G', 'G'], 'Team': ['BAR', 'OLY'], 'FPT': [10.5, 15.0]})
+    distributions = fit_player_distributions(history, players).set_index('Team')
+    assert distributions.loc['BAR', 'Std'] == pytest.approx(history[history['Team'] == 'BAR'].head(6)['FPT'].std())
+    assert distributions.loc['OLY', 'Std'] == pytest.approx(history[history['Team'] == 'OLY']['FPT'].std())
+    assert distributions['Games'].tolist() == [6, 6]
+
+def test_lineups_are_scored_with_the_matching_player():
+    history = make_history()
+    players = pd.DataFrame({'Player': ['D. Hall', 'D. Hall', 'A. Other'], 'Pos': ['G'] * 3, 'Team': ['BAR', 'OLY', 'BAR'],
+                            'FPT': [10.5, 15.0, 12.0]})
+    distributions = fit_player_distributions(history, players)
+    outcomes = sample_outcomes(distributions, 5000, seed=0)
+    lineups = [[Player('D. Hall', 'BAR'), Player('A. Other', 'BAR')], [Player('D. Hall', 'OLY'), Player('A. Other', 'BAR')]]
+    scores = score_lineups(lineups, distributions, outcomes)
+    assert scores['Expected_FPT'].tolist() == pytest.approx([22.5, 27.0], abs=0.5)
+    assert scores['Std_FPT'].iloc[0] < scores['Std_FPT'].iloc[1]
+    with pytest.raises(ValueError):
+        score_lineups([['D. Hall', 'A. Other']], distributions, outcomes)